@@ -0,0 +1,155 @@
+"""glb_arrays.py — numpy views of GLB accessors for the stdlib GLB tools.
+
+Thin layer over glb_merge_anims.py (read_glb / write_glb / compact_bin):
+decode any accessor to an ndarray (byteStride, normalized ints and sparse
+accessors handled) and write arrays back as new tightly packed bufferViews.
+Passes replace accessors in place and call compact_bin() once at the end,
+which drops the orphaned data.
+
+    gltf, binc = read_glb(path)
+    pos = read_accessor(gltf, binc, prim["attributes"]["POSITION"])
+    replace_accessor(gltf, binc, idx, new_pos)
+    write_glb(out, gltf, compact_bin(gltf, binc))
+"""
+import numpy as np
+
+from glb_merge_anims import MESHOPT, TYPE_COUNT
+
+DTYPE = {5120: np.int8, 5121: np.uint8, 5122: np.int16, 5123: np.uint16,
+         5125: np.uint32, 5126: np.float32}
+COMPONENT_TYPE = {np.dtype(v): k for k, v in DTYPE.items()}
+TYPE_BY_COUNT = {1: "SCALAR", 2: "VEC2", 3: "VEC3", 4: "VEC4", 16: "MAT4"}
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+
+def _view_array(gltf, binc, view_idx, offset, dtype, count, ncomp):
+    bv = gltf["bufferViews"][view_idx]
+    if MESHOPT in bv.get("extensions", {}):
+        # the view's bytes are in the fallback buffer, not in the BIN
+        raise SystemExit(f"bufferView[{view_idx}] is {MESHOPT} compressed — run "
+                         "this pass before glb_meshopt.py")
+    start = bv.get("byteOffset", 0) + offset
+    item = np.dtype(dtype).itemsize * ncomp
+    stride = bv.get("byteStride") or item
+    if stride == item:
+        arr = np.frombuffer(binc, dtype, count * ncomp, start)
+        return arr.reshape(count, ncomp)
+    rows = np.frombuffer(binc, np.uint8, stride * (count - 1) + item, start)
+    rows = np.lib.stride_tricks.as_strided(rows, (count, item), (stride, 1))
+    return np.ascontiguousarray(rows).view(dtype).reshape(count, ncomp)
+
+
+def read_accessor(gltf, binc, idx, normalize=False):
+    """Accessor -> ndarray (count,) for SCALAR, else (count, ncomp).
+
+    Returns stored values; with normalize=True, normalized integer
+    accessors are converted to float32 per the glTF spec.
+    """
+    acc = gltf["accessors"][idx]
+    dtype = DTYPE[acc["componentType"]]
+    ncomp = TYPE_COUNT[acc["type"]]
+    count = acc["count"]
+    if "bufferView" in acc:
+        arr = _view_array(gltf, binc, acc["bufferView"], acc.get("byteOffset", 0),
+                          dtype, count, ncomp).copy()
+    else:
+        arr = np.zeros((count, ncomp), dtype)
+    sparse = acc.get("sparse")
+    if sparse:
+        si, sv = sparse["indices"], sparse["values"]
+        where = _view_array(gltf, binc, si["bufferView"], si.get("byteOffset", 0),
+                            DTYPE[si["componentType"]], sparse["count"], 1)[:, 0]
+        arr[where.astype(np.int64)] = _view_array(
+            gltf, binc, sv["bufferView"], sv.get("byteOffset", 0),
+            dtype, sparse["count"], ncomp)
+    if normalize and acc.get("normalized"):
+        info = np.iinfo(dtype)
+        arr = arr.astype(np.float32) / info.max
+        if info.min < 0:
+            arr = np.maximum(arr, -1.0)
+    return arr[:, 0] if ncomp == 1 else arr
+
+
+def append_view(gltf, binc, raw, target=None, stride=None):
+    """Append raw bytes as a new 4-byte aligned bufferView; returns its index."""
+    while len(binc) % 4:
+        binc.append(0)
+    bv = {"buffer": 0, "byteOffset": len(binc), "byteLength": len(raw)}
+    if stride:
+        bv["byteStride"] = stride
+    if target:
+        bv["target"] = target
+    binc.extend(raw)
+    gltf.setdefault("bufferViews", []).append(bv)
+    return len(gltf["bufferViews"]) - 1
+
+
+def _accessor_json(arr, target, normalized, minmax):
+    arr = np.ascontiguousarray(arr)
+    ncomp = 1 if arr.ndim == 1 else arr.shape[1]
+    acc = {"componentType": COMPONENT_TYPE[arr.dtype], "count": int(arr.shape[0]),
+           "type": TYPE_BY_COUNT[ncomp]}
+    if normalized:
+        acc["normalized"] = True
+    if minmax and len(arr):
+        flat = arr.reshape(len(arr), ncomp)
+        cast = float if arr.dtype.kind == "f" else int
+        acc["min"] = [cast(v) for v in flat.min(0)]
+        acc["max"] = [cast(v) for v in flat.max(0)]
+    item = arr.dtype.itemsize * ncomp
+    # vertex attributes must keep a 4-byte aligned stride
+    stride = None
+    if target == ARRAY_BUFFER and item % 4:
+        pad = 4 - item % 4
+        rows = np.zeros((len(arr), item + pad), np.uint8)
+        rows[:, :item] = arr.reshape(len(arr), -1).view(np.uint8).reshape(len(arr), item)
+        raw, stride = rows.tobytes(), item + pad
+    else:
+        raw = arr.tobytes()
+    return acc, raw, stride
+
+
+def add_accessor(gltf, binc, arr, target=None, normalized=False, minmax=False):
+    """Append ndarray as a new accessor (+bufferView); returns its index."""
+    acc, raw, stride = _accessor_json(arr, target, normalized, minmax)
+    acc["bufferView"] = append_view(gltf, binc, raw, target, stride)
+    gltf.setdefault("accessors", []).append(acc)
+    return len(gltf["accessors"]) - 1
+
+
+def replace_accessor(gltf, binc, idx, arr, target=None, normalized=False,
+                     minmax=None):
+    """Rewrite accessor idx with new data, keeping its index (and name).
+
+    minmax=None keeps min/max only if the old accessor had them (POSITION
+    and animation inputs require them); the values are recomputed.
+    """
+    old = gltf["accessors"][idx]
+    if minmax is None:
+        minmax = "min" in old
+    acc, raw, stride = _accessor_json(arr, target, normalized, minmax)
+    acc["bufferView"] = append_view(gltf, binc, raw, target, stride)
+    for k in ("name", "extras"):
+        if k in old:
+            acc[k] = old[k]
+    gltf["accessors"][idx] = acc
+    return idx
+
+
+def triangles(gltf, binc, prim):
+    """(T, 3) int64 triangle list of a TRIANGLES primitive, or None."""
+    if prim.get("mode", 4) != 4:
+        return None
+    if "indices" in prim:
+        idx = read_accessor(gltf, binc, prim["indices"]).astype(np.int64)
+    else:
+        n = gltf["accessors"][prim["attributes"]["POSITION"]]["count"]
+        idx = np.arange(n - n % 3, dtype=np.int64)
+    return idx.reshape(-1, 3)
+
+
+def index_array(tris, vertex_count):
+    """Flatten triangles to the smallest valid glTF index type."""
+    flat = np.ascontiguousarray(tris).reshape(-1)
+    return flat.astype(np.uint16 if vertex_count <= 0xFFFF else np.uint32)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""glb_bake_moves.py — bake proc_anim_dragon.py-style MOVES tables straight
+into a rigged GLB (numpy + stdlib, no Blender).
+
+proc_anim_dragon.py needs a Blender launch, one keyframe_insert per key and
+an export + post-patch round trip for what is pure math. This tool reads the
+same tables from the script (or any copy with other creatures' recipes):
+every UPPERCASE dict NAME that has a NAME_SECONDS becomes clip "name", with
+    bone -> [(channel, axis, amplitude, phase, offset), ...]
+    value(t) = offset + amplitude * sin(2*pi*t + phase), t = cycle phase
+channel "rot" (Euler XYZ radians), "loc" (bone units) or "scale" (factor,
+offset 1 = rest). All bones x channels x frames are evaluated in one
+broadcast; entries on the same bone/channel/axis add up. Rotations become
+quaternions on top of the bone's rest rotation, exactly like Blender's
+pose basis on export: rotation = rest * qz*qy*qx, translation = rest_t +
+rest_r * (rest_s * loc). Every frame is sampled (no Bezier in-between), and
+the last key is a copy of the first, so loops close exactly.
+
+Clips are appended as LINEAR samplers to the GLB (same-named clips are
+replaced, so an exported dragon_anim.glb can be re-baked in place).
+
+Usage:
+    python3 glb_bake_moves.py rigged.glb out.glb [--moves proc_anim_dragon.py]
+        [--clips idle,fly] [--fps 24]
+"""
+import argparse
+import ast
+import math
+from pathlib import Path
+
+import numpy as np
+
+from glb_arrays import add_accessor
+from glb_merge_anims import compact_bin, node_names, read_glb, write_glb
+from glb_pose import quat_mul
+
+CHANNELS = {"rot": "rotation", "loc": "translation", "scale": "scale"}
+
+
+def load_moves(path):
+    """Execute only the constants and helper defs of a Blender anim script.
+
+    Returns (clips {name: (moves, seconds)}, fps from the script or None).
+    """
+    tree = ast.parse(Path(path).read_text(), str(path))
+    keep = [s for s in tree.body
+            if isinstance(s, ast.FunctionDef)
+            or (isinstance(s, ast.Assign)
+                and all(isinstance(t, ast.Name) and t.id.isupper() for t in s.targets))]
+    ns = {"math": math}
+    exec(compile(ast.Module(keep, []), str(path), "exec"), ns)
+    clips = {}
+    for name, value in ns.items():
+        if name.isupper() and isinstance(value, dict) and f"{name}_SECONDS" in ns:
+            clips[name.lower()] = (value, float(ns[f"{name}_SECONDS"]))
+    return clips, ns.get("FPS")
+
+
+def euler_xyz_to_quat(e):
+    """(..., 3) Blender XYZ Euler -> (..., 4) xyzw, R = Rz @ Ry @ Rx."""
+    h = e / 2
+    c, s = np.cos(h), np.sin(h)
+    zero = np.zeros_like(h[..., 0])
+    qx = np.stack([s[..., 0], zero, zero, c[..., 0]], -1)
+    qy = np.stack([zero, s[..., 1], zero, c[..., 1]], -1)
+    qz = np.stack([zero, zero, s[..., 2], c[..., 2]], -1)
+    return quat_mul(qz, quat_mul(qy, qx))
+
+
+def quat_rotate(q, v):
+    """Rotate (..., 3) vectors by (..., 4) xyzw quaternions."""
+    u, w = q[..., :3], q[..., 3:]
+    t = 2 * np.cross(u, v)
+    return v + w * t + np.cross(u, t)
+
+
+def evaluate(moves, bones, frames):
+    """All channels of all bones at once -> {channel: (F+1, B, 3)} values."""
+    t = np.arange(frames + 1) / frames
+    rows = [(bones.index(b), ch, axis, amp, phase, off)
+            for b, entries in moves.items() if b in bones
+            for ch, axis, amp, phase, off in entries]
+    out = {}
+    for ch in CHANNELS:
+        sel = [r for r in rows if r[1] == ch]
+        if not sel:
+            continue
+        bi, _, axis, amp, phase, off = (np.array(c) for c in zip(*sel))
+        vals = off + amp * np.sin(2 * np.pi * t[:, None] + phase)  # (F+1, E)
+        grid = np.full((frames + 1, len(bones), 3), 1.0 if ch == "scale" else 0.0)
+        if ch == "scale":
+            grid[:, bi, axis] = 0.0
+        np.add.at(grid, (slice(None), bi, axis.astype(int)), vals)
+        grid[-1] = grid[0]  # close the loop exactly
+        out[ch] = grid
+    return out
+
+
+def bake_clip(gltf, binc, name, moves, seconds, fps):
+    index = node_names(gltf)
+    missing = [b for b in moves if b not in index]
+    for b in missing:
+        print(f"  (skip missing bone '{b}')")
+    bones = [b for b in moves if b in index]
+    frames = max(1, int(round(seconds * fps)))
+    vals = evaluate(moves, bones, frames)
+    times = add_accessor(gltf, binc, (np.arange(frames + 1) / fps).astype(np.float32),
+                         minmax=True)
+    anim = {"name": name, "channels": [], "samplers": []}
+    for bi, bone in enumerate(bones):
+        node = gltf["nodes"][index[bone]]
+        rest_t = np.array(node.get("translation", [0, 0, 0]), np.float64)
+        rest_r = np.array(node.get("rotation", [0, 0, 0, 1]), np.float64)
+        rest_s = np.array(node.get("scale", [1, 1, 1]), np.float64)
+        used = {ch for ch, *_ in moves[bone]}
+        for ch in CHANNELS:
+            if ch not in used:
+                continue
+            v = vals[ch][:, bi]
+            if ch == "rot":
+                q = quat_mul(np.broadcast_to(rest_r, (len(v), 4)), euler_xyz_to_quat(v))
+                # keep consecutive keys in one hemisphere for slerp
+                flip = np.cumprod(np.sign((q[1:] * q[:-1]).sum(1) + 1e-12))
+                q[1:] *= flip[:, None]
+                out = q / np.linalg.norm(q, axis=1, keepdims=True)
+            elif ch == "loc":
+                out = rest_t + quat_rotate(np.broadcast_to(rest_r, (len(v), 4)), rest_s * v)
+            else:
+                out = rest_s * v
+            anim["samplers"].append({
+                "input": times, "interpolation": "LINEAR",
+                "output": add_accessor(gltf, binc, out.astype(np.float32))})
+            anim["channels"].append({
+                "sampler": len(anim["samplers"]) - 1,
+                "target": {"node": index[bone], "path": CHANNELS[ch]}})
+    return anim, frames
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("input", help="rigged GLB (bone names = node names)")
+    p.add_argument("output")
+    p.add_argument("--moves", default=str(Path(__file__).with_name("proc_anim_dragon.py")),
+                   help="script holding the MOVES tables (default proc_anim_dragon.py)")
+    p.add_argument("--clips", help="comma list of clip names (default: all tables)")
+    p.add_argument("--fps", type=float, help="sample rate (default: the script's FPS or 24)")
+    a = p.parse_args()
+    clips, script_fps = load_moves(a.moves)
+    fps = a.fps or script_fps or 24
+    names = a.clips.split(",") if a.clips else sorted(clips)
+    unknown = [n for n in names if n not in clips]
+    if unknown:
+        raise SystemExit(f"no tables for {unknown} in {a.moves} (have {sorted(clips)})")
+    gltf, binc = read_glb(a.input)
+    anims = [an for an in gltf.get("animations", []) if an.get("name") not in names]
+    replaced = len(gltf.get("animations", [])) - len(anims)
+    for name in names:
+        moves, seconds = clips[name]
+        anim, frames = bake_clip(gltf, binc, name, moves, seconds, fps)
+        anims.append(anim)
+        print(f"baked '{name}': {frames} frames ({seconds}s @ {fps:g}fps), "
+              f"{len(anim['channels'])} channels")
+    gltf["animations"] = anims
+    write_glb(a.output, gltf, compact_bin(gltf, binc))
+    if replaced:
+        print(f"  replaced {replaced} existing clip(s) of the same name")
+    print(f"done: {a.output}")
+
+
+if __name__ == "__main__":
+    main()
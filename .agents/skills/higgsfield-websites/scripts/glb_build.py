@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""glb_build.py — declarative, incremental asset build graph for the GLB tools
+(stdlib; the numpy passes it calls need numpy, Blender steps need Blender).
+
+One character means chaining fbx2glb.py / rig_transfer.py, glb_merge_anims.py,
+glb_patch.py, the ship passes and glb_inspect.py by hand, each one rereading
+and rewriting the whole GLB. A recipe (JSON, or YAML when PyYAML is
+installed) names the assets and their step chains instead:
+
+    {"out": "build",
+     "assets": {
+       "knight": {"input": "src/knight.fbx",
+                  "steps": ["fbx2glb",
+                            {"tool": "merge_anims", "clips": {"Walk": "src/walk.glb"}},
+                            "patch", "weld", "optimize", {"tool": "quantize", "bits": 14},
+                            {"tool": "inspect", "budget": true}]},
+       "knight_lod": {"input": "@knight", "steps": ["simplify", "meshopt"]}}}
+
+Paths are relative to the recipe; "@name" is another asset's output (the
+asset waits for it). Each asset writes <out>/<name>.glb (or "output").
+
+Step kinds:
+  * in-memory (numpy / stdlib): merge_anims (clips), patch, weld, normals,
+    optimize, quantize, simplify, textures, prune_joints, flatten, inspect
+    (budget / limit). Extra keys are the pass function's keyword arguments.
+    Consecutive in-memory steps form ONE segment: the GLB is read once,
+    handed from pass to pass in memory and written once, in a worker
+    process (--jobs);
+  * Blender: fbx2glb, rig_transfer (donor), or {"tool": "blender", "script",
+    "args"} with {in}/{out} placeholders — `blender -b -P` subprocesses in a
+    separate pool (--blender-jobs, default 1: Blender is memory-hungry);
+  * any other glb_<tool>.py CLI (meshopt, instance, bvh, ...) with "args":
+    run as `python3 glb_<tool>.py IN OUT args...` in the Python pool, or
+    with exactly "args" when they contain {in} (check-only tools such as
+    {"tool": "validate", "args": ["{in}"]}: the GLB passes on unchanged).
+
+Every segment gets a key: sha256 over the previous segment's key, the steps
+and their parameters, the tools' source (with their glb_* imports) and the
+content of every input file (hashes cached by size + mtime). A segment whose
+output exists with the same key is skipped, so changing one clip of one
+character rebuilds only that character from the merge on. State lives in
+<out>/.glb_build.json; intermediates between segments in <out>/.work/.
+
+Usage:
+    python3 glb_build.py recipe.json [--jobs N] [--blender-jobs 1]
+        [--blender blender] [--only knight ...] [--force] [--dry-run]
+"""
+import argparse
+import contextlib
+import hashlib
+import importlib
+import io
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STATE_NAME = ".glb_build.json"
+STATE_VERSION = 1
+
+# tool -> (module, function, default keyword arguments); called as
+# function(gltf, binc, **kwargs) and mutating both in place
+PASSES = {
+    "weld": ("glb_weld", "weld", {}),
+    "normals": ("glb_normals", "repair_all", {}),
+    "optimize": ("glb_optimize", "optimize", {}),
+    "quantize": ("glb_quantize", "quantize", {"bits": 16}),
+    "simplify": ("glb_simplify", "build_lods",
+                 {"ratios": [1, 0.5, 0.2, 0.05], "screen_height": 1080, "pixels_error": 1.0}),
+    "textures": ("glb_textures", "process",
+                 {"fmt": "webp", "max_size": 1024, "quality": 85, "fallback": True,
+                  "workers": 1}),
+    "prune_joints": ("glb_prune_joints", "prune", {}),
+    "flatten": ("glb_flatten", "flatten", {}),
+}
+IN_MEMORY = set(PASSES) | {"merge_anims", "patch", "inspect"}
+MODULES = {"merge_anims": "glb_merge_anims", "patch": "glb_patch", "inspect": "glb_inspect"}
+BLENDER = {"fbx2glb": "fbx2glb.py", "rig_transfer": "rig_transfer.py"}
+
+
+class BuildError(Exception):
+    pass
+
+
+def load_recipe(path):
+    with open(path) as f:
+        text = f.read()
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise SystemExit(f"{path}: PyYAML is not installed — pip install pyyaml "
+                             "or write the recipe as JSON")
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+
+def normalize_steps(asset, name):
+    steps = []
+    for step in asset.get("steps", []):
+        step = {"tool": step} if isinstance(step, str) else dict(step)
+        tool = step.get("tool")
+        if tool not in IN_MEMORY and tool not in BLENDER and tool != "blender" \
+                and not os.path.exists(os.path.join(HERE, f"glb_{tool}.py")):
+            raise SystemExit(f"asset '{name}': unknown tool '{tool}'")
+        steps.append(step)
+    if not steps:
+        raise SystemExit(f"asset '{name}': no steps")
+    return steps
+
+
+def segments(steps):
+    """Split a chain into in-memory runs and single subprocess steps."""
+    out = []
+    for step in steps:
+        if step["tool"] in IN_MEMORY and out and out[-1][0] == "python":
+            out[-1][1].append(step)
+        else:
+            kind = "python" if step["tool"] in IN_MEMORY else (
+                "blender" if step["tool"] in BLENDER or step["tool"] == "blender" else "cli")
+            out.append((kind, [step]))
+    return out
+
+
+# ---------------- hashing ----------------
+
+class Digests:
+    """sha256 of files, memoized by (size, mtime_ns) across runs."""
+
+    def __init__(self, known):
+        self.known = known
+        self.lock = threading.Lock()
+
+    def file(self, path):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self.lock:
+            hit = self.known.get(path)
+        if hit and hit[0] == st.st_size and hit[1] == st.st_mtime_ns:
+            return hit[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        with self.lock:
+            self.known[path] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        return h.hexdigest()
+
+
+_SOURCE = {}
+_SOURCE_LOCK = threading.Lock()
+
+
+def source_digest(script):
+    """Hash of a script and every glb_* module it (transitively) imports."""
+    with _SOURCE_LOCK:
+        if script not in _SOURCE:
+            h, todo, seen = hashlib.sha256(), [script], set()
+            while todo:
+                name = todo.pop()
+                if name in seen:
+                    continue
+                seen.add(name)
+                with open(os.path.join(HERE, name), "rb") as f:
+                    src = f.read()
+                todo += [m.decode() + ".py"
+                         for m in re.findall(rb"^\s*(?:from|import) (glb_\w+)", src, re.M)]
+            for name in sorted(seen):
+                with open(os.path.join(HERE, name), "rb") as f:
+                    h.update(name.encode() + b"\0" + f.read())
+            _SOURCE[script] = h.hexdigest()
+        return _SOURCE[script]
+
+
+def step_script(step):
+    tool = step["tool"]
+    if tool in PASSES:
+        return PASSES[tool][0] + ".py"
+    if tool in MODULES:
+        return MODULES[tool] + ".py"
+    if tool in BLENDER:
+        return BLENDER[tool]
+    if tool == "blender":
+        return None
+    return f"glb_{tool}.py"
+
+
+def step_files(step):
+    """Input files a step reads besides the chain's GLB."""
+    files = []
+    if step["tool"] == "merge_anims":
+        files += list(step.get("clips", {}).values())
+    for key in ("donor", "script", "budget"):
+        if isinstance(step.get(key), str) and step[key] != "default":
+            files.append(step[key])
+    files += step.get("files", [])
+    return files
+
+
+# ---------------- workers ----------------
+
+def run_segment(src, dst, steps):
+    """Worker process: read once, run the in-memory passes, write once."""
+    sys.path.insert(0, HERE)
+    from glb_merge_anims import compact_bin, merge, read_glb, write_glb
+    log = io.StringIO()
+    tool = "read"
+    try:
+        with contextlib.redirect_stdout(log):
+            gltf, binc = read_glb(src)
+            for step in steps:
+                t0 = time.perf_counter()
+                params = {k: v for k, v in step.items() if k not in ("tool", "files")}
+                tool = step["tool"]
+                if tool == "merge_anims":
+                    merge(gltf, binc, [(p, n) for n, p in params.get("clips", {}).items()])
+                elif tool == "patch":
+                    from glb_patch import patch_materials
+                    patch_materials(gltf)
+                elif tool == "inspect":
+                    binc = compact_bin(gltf, binc)
+                    check(gltf, binc, params, dst)
+                else:
+                    module, func, defaults = PASSES[tool]
+                    fn = getattr(importlib.import_module(module), func)
+                    fn(gltf, binc, **{**defaults, **params})
+                print(f"step {tool}: {time.perf_counter() - t0:.2f}s")
+            tool = "write"
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            write_glb(dst, gltf, compact_bin(gltf, binc))
+    except SystemExit as e:  # the tools' error path (bad input, refused data)
+        raise BuildError(f"{tool}: {e}") from None
+    return log.getvalue()
+
+
+def check(gltf, binc, params, dst):
+    """In-memory glb_inspect: report + optional budget; raises on failure."""
+    from glb_inspect import inspect, load_limits, print_budget, print_report
+    report = inspect(gltf, bytes(binc))
+    print_report(dst, report)
+    problems = [w["message"] for w in report["warnings"] if w["kind"] == "rootScale"]
+    if params.get("budget") or params.get("limit"):
+        budget = params.get("budget")
+        limits = load_limits(budget if isinstance(budget, str) else None,
+                             [f"{k}={v}" for k, v in params.get("limit", {}).items()])
+        size = 28 + len(json.dumps(gltf, separators=(",", ":"))) + len(binc) + 8
+        problems += [f"OVER BUDGET {label} {value:.6g} > {limit}"
+                     for label, value, limit in print_budget(report, size, limits)]
+    if problems:
+        raise BuildError("; ".join(problems))
+
+
+def run_command(cmd):
+    try:
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    except (OSError, SystemExit) as e:  # missing executable
+        raise BuildError(f"{cmd[0]}: {e}") from None
+    if proc.returncode:
+        raise BuildError(f"{' '.join(cmd)} failed ({proc.returncode}):\n{proc.stdout[-2000:]}")
+    return proc.stdout
+
+
+# ---------------- graph ----------------
+
+class Builder:
+    def __init__(self, recipe_path, args):
+        self.root = os.path.dirname(os.path.abspath(recipe_path))
+        recipe = load_recipe(recipe_path)
+        self.out = self.path(recipe.get("out", "build"))
+        self.blender = args.blender or recipe.get("blender") or os.environ.get("BLENDER", "blender")
+        self.force, self.dry = args.force, args.dry_run
+        self.assets = {}
+        for name, asset in recipe.get("assets", {}).items():
+            self.assets[name] = {
+                "input": asset.get("input"),
+                "steps": normalize_steps(asset, name),
+                "output": self.path(asset.get("output", os.path.join(self.out, name + ".glb")))}
+        self.state = {"version": STATE_VERSION, "files": {}, "outputs": {}}
+        state_path = os.path.join(self.out, STATE_NAME)
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                stored = json.load(f)
+            if stored.get("version") == STATE_VERSION:
+                self.state = stored
+        self.digests = Digests(self.state["files"])
+        self.lock = threading.Lock()
+        # workers start from coordinator threads: fork() there can deadlock
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() \
+            else "spawn"
+        self.py_pool = ProcessPoolExecutor(args.jobs,
+                                           mp_context=multiprocessing.get_context(method))
+        self.blender_pool = ThreadPoolExecutor(args.blender_jobs)
+        self.done = {}
+        self.counts = {"built": 0, "skipped": 0}
+
+    def path(self, p):
+        return p if os.path.isabs(p) else os.path.normpath(os.path.join(self.root, p))
+
+    def resolve(self, value):
+        """Recipe value -> absolute path ("@asset" -> that asset's output)."""
+        if isinstance(value, str) and value.startswith("@"):
+            return self.assets[value[1:]]["output"]
+        return self.path(value)
+
+    def deps(self, name):
+        asset = self.assets[name]
+        refs = [asset["input"]] + [f for s in asset["steps"] for f in step_files(s)]
+        return {r[1:] for r in refs if isinstance(r, str) and r.startswith("@")}
+
+    def order(self, only):
+        """Topological order of the requested assets and their dependencies."""
+        seen, out = {}, []
+
+        def visit(name, trail):
+            if name not in self.assets:
+                raise SystemExit(f"unknown asset '@{name}'")
+            if seen.get(name) == "open":
+                raise SystemExit(f"dependency cycle: {' -> '.join(trail + [name])}")
+            if name not in seen:
+                seen[name] = "open"
+                for dep in sorted(self.deps(name)):
+                    visit(dep, trail + [name])
+                seen[name] = "done"
+                out.append(name)
+
+        for name in only or self.assets:
+            visit(name, [])
+        return out
+
+    def key(self, prev, steps, inputs):
+        h = hashlib.sha256(prev.encode())
+        for step in steps:
+            resolved = dict(step)
+            if step["tool"] == "merge_anims":
+                resolved["clips"] = {n: self.resolve(p) for n, p in step.get("clips", {}).items()}
+            h.update(json.dumps(resolved, sort_keys=True).encode())
+            script = step_script(step)
+            if script:
+                h.update(source_digest(script).encode())
+            for f in step_files(step):
+                h.update(self.digests.file(self.resolve(f)).encode())
+        for f in inputs:
+            h.update(self.digests.file(f).encode())
+        return h.hexdigest()
+
+    def command(self, step, src, dst):
+        tool = step["tool"]
+        args = [str(a).replace("{in}", src).replace("{out}", dst) for a in step.get("args", [])]
+        if tool == "fbx2glb":
+            return [self.blender, "-b", "-P", os.path.join(HERE, BLENDER[tool]), "--", src, dst]
+        if tool == "rig_transfer":
+            return [self.blender, "-b", "-P", os.path.join(HERE, BLENDER[tool]), "--",
+                    src, self.resolve(step["donor"]), dst]
+        if tool == "blender":
+            return [self.blender, "-b", "-P", self.resolve(step["script"]), "--"] + args
+        script = [sys.executable, os.path.join(HERE, f"glb_{tool}.py")]
+        if any("{in}" in str(a) for a in step.get("args", [])):
+            return script + args
+        return script + [src, dst] + args
+
+    def build(self, name):
+        for dep in self.deps(name):
+            self.done[dep].result()
+        asset = self.assets[name]
+        src = self.resolve(asset["input"])
+        prev = ""
+        segs = segments(asset["steps"])
+        for i, (kind, steps) in enumerate(segs):
+            last = i == len(segs) - 1
+            dst = asset["output"] if last else os.path.join(self.out, ".work", f"{name}.{i}.glb")
+            if i == 0 and not os.path.exists(src):
+                raise BuildError(f"input {src} does not exist")
+            # later segments read an intermediate: covered by the previous key
+            key = self.key(prev, steps, [src] if i == 0 else [])
+            tools = "+".join(s["tool"] for s in steps)
+            with self.lock:
+                fresh = self.state["outputs"].get(dst) == key and os.path.exists(dst)
+            if fresh and not self.force:
+                print(f"[{name}] {tools}: up to date")
+                with self.lock:
+                    self.counts["skipped"] += 1
+            elif self.dry:
+                print(f"[{name}] {tools}: would run")
+            else:
+                t0 = time.perf_counter()
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                if kind == "python":
+                    steps = [self.resolve_step(s) for s in steps]
+                    log = self.py_pool.submit(run_segment, src, dst, steps).result()
+                else:
+                    if os.path.exists(dst):
+                        os.remove(dst)
+                    pool = self.blender_pool if kind == "blender" else self.py_pool
+                    log = pool.submit(run_command, self.command(steps[0], src, dst)).result()
+                    if not os.path.exists(dst):  # check-only tool: pass the GLB on
+                        shutil.copyfile(src, dst)
+                for line in log.splitlines():
+                    print(f"[{name}]   {line}")
+                print(f"[{name}] {tools}: built in {time.perf_counter() - t0:.2f}s")
+                with self.lock:
+                    self.state["outputs"][dst] = key
+                    self.counts["built"] += 1
+            prev, src = key, dst
+
+    def resolve_step(self, step):
+        step = dict(step)
+        if step["tool"] == "merge_anims":
+            step["clips"] = {n: self.resolve(p) for n, p in step.get("clips", {}).items()}
+        if isinstance(step.get("budget"), str) and step["budget"] != "default":
+            step["budget"] = self.resolve(step["budget"])
+        return step
+
+    def run(self, only):
+        names = self.order(only)
+        failed = []
+        try:
+            with ThreadPoolExecutor(max(1, len(names))) as coordinators:
+                for name in names:
+                    self.done[name] = coordinators.submit(self.build, name)
+                for name in names:
+                    try:
+                        self.done[name].result()
+                    except (BuildError, SystemExit) as e:
+                        failed.append(name)
+                        print(f"[{name}] FAILED: {e}")
+                    except Exception as e:  # a dependency failed, or a pass raised
+                        failed.append(name)
+                        print(f"[{name}] FAILED: {type(e).__name__}: {e}")
+        finally:
+            self.py_pool.shutdown()
+            self.blender_pool.shutdown()
+            # keep what did build, even when interrupted
+            if not self.dry:
+                os.makedirs(self.out, exist_ok=True)
+                with open(os.path.join(self.out, STATE_NAME), "w") as f:
+                    json.dump(self.state, f, indent=1)
+        return names, failed
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("recipe")
+    p.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                   help="worker processes for numpy / stdlib steps")
+    p.add_argument("--blender-jobs", type=int, default=1,
+                   help="concurrent Blender subprocesses (default 1)")
+    p.add_argument("--blender", help="Blender executable (default $BLENDER or 'blender')")
+    p.add_argument("--only", nargs="+", metavar="ASSET",
+                   help="build these assets (and what they depend on)")
+    p.add_argument("--force", action="store_true", help="ignore the state, rebuild everything")
+    p.add_argument("--dry-run", action="store_true", help="print what would run")
+    a = p.parse_args()
+    t0 = time.perf_counter()
+    builder = Builder(a.recipe, a)
+    names, failed = builder.run(a.only)
+    c = builder.counts
+    print(f"done: {len(names)} assets, {c['built']} segments built, {c['skipped']} up to date"
+          f"{', FAILED: ' + ', '.join(failed) if failed else ''} "
+          f"({time.perf_counter() - t0:.2f}s)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
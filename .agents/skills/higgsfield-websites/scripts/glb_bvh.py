@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""glb_bvh.py — precomputed raycast BVH per primitive and per-clip bounds
+(numpy + stdlib, no Blender).
+
+three-mesh-bvh / Box3.setFromObject on load cost hundreds of ms per
+character on mobile, and a skinned mesh's rest-pose box is wrong as soon
+as a clip moves it. This pass stores both offline:
+
+primitive.extras.bvh — SAH BVH over the primitive's triangles:
+    {"bufferView": v, "nodeCount": n, "maxLeafSize": k,
+     "layout": "three-mesh-bvh-packed"}
+  The primitive's index buffer is REORDERED so every leaf is a contiguous
+  triangle range. The bufferView holds n nodes x 32 bytes, depth first,
+  left child directly after its parent:
+    float32[0..5]  bounds min xyz, max xyz (rounded outward)
+    leaf:     uint32[6] first triangle, uint16[14] triangle count,
+              uint16[15] = 0xFFFF
+    interior: uint32[6] right child offset in uint32 words (node * 8),
+              uint32[7] split axis (0/1/2)
+  i.e. one root of MeshBVH.serialize(); in three.js:
+    const buf = await parser.getDependency('bufferView', bvh.bufferView);
+    geometry.boundsTree = MeshBVH.deserialize(
+        {roots: [buf], index: geometry.index.array}, geometry,
+        {setIndex: false});
+
+animation.extras.bounds — {"min": [x,y,z], "max": [x,y,z]} in glTF scene
+  space, the union over all mesh vertices (skinned with LBS) sampled at
+  --fps; the rest-pose box goes on the default scene's extras.bounds.
+
+Run it last: any later pass that reorders indices or moves positions
+(glb_optimize / glb_simplify / glb_quantize) invalidates the BVH.
+
+Usage:
+    python3 glb_bvh.py in.glb out.glb [--leaf-size 10] [--fps 30]
+"""
+import argparse
+
+import numpy as np
+
+from glb_arrays import (ELEMENT_ARRAY_BUFFER, add_accessor, append_view,
+                        index_array, read_accessor, replace_accessor, triangles)
+from glb_merge_anims import compact_bin, read_glb, write_glb
+from glb_pose import frame_times, skinned_frames, world_poses
+from glb_split_anims import clip_duration
+
+LEAF_FLAG = 0xFFFF0000
+TRAVERSAL_COST = 1.0
+
+
+def half_area(lo, hi):
+    d = np.maximum(hi - lo, 0)
+    return d[..., 0] * d[..., 1] + d[..., 1] * d[..., 2] + d[..., 2] * d[..., 0]
+
+
+def build_bvh(tri_lo, tri_hi, max_leaf):
+    """Full-sweep SAH on the longest centroid axis.
+
+    Returns (order of triangles, list of nodes (lo, hi, is_leaf, a, b)).
+    """
+    centroid = (tri_lo + tri_hi) / 2
+    order = np.arange(len(tri_lo))
+    nodes = []
+    stack = [(0, len(order), None)]
+    while stack:
+        start, end, right_of = stack.pop()
+        n = len(nodes)
+        if right_of is not None:
+            nodes[right_of][3] = n
+        idx = order[start:end]
+        lo, hi = tri_lo[idx].min(0), tri_hi[idx].max(0)
+        count = end - start
+        c = centroid[idx]
+        extent = c.max(0) - c.min(0)
+        axis = int(np.argmax(extent))
+        if (count <= max_leaf or extent[axis] <= 0) and count <= 0xFFFF:
+            nodes.append([lo, hi, True, start, count])
+            continue
+        s = idx[np.argsort(c[:, axis], kind="stable")]
+        lcost = half_area(np.minimum.accumulate(tri_lo[s]),
+                          np.maximum.accumulate(tri_hi[s]))[:-1] * np.arange(1, count)
+        rcost = (half_area(np.minimum.accumulate(tri_lo[s][::-1]),
+                           np.maximum.accumulate(tri_hi[s][::-1]))[::-1][1:]
+                 * np.arange(count - 1, 0, -1))
+        cost = lcost + rcost
+        best = int(np.argmin(cost))
+        area = max(half_area(lo, hi), 1e-30)
+        split_cost = TRAVERSAL_COST + cost[best] / area
+        if split_cost >= count and count <= 4 * max_leaf:
+            nodes.append([lo, hi, True, start, count])
+            continue
+        if extent[axis] <= 0:  # > 65535 coincident centroids: halve blindly
+            best = count // 2 - 1
+        order[start:end] = s
+        mid = start + best + 1
+        nodes.append([lo, hi, False, None, axis])
+        stack.append((mid, end, n))
+        stack.append((start, mid, None))
+    return order, nodes
+
+
+def pack_nodes(nodes):
+    words = np.zeros((len(nodes), 8), np.uint32)
+    bounds = words[:, :6].view(np.float32)
+    lo = np.array([n[0] for n in nodes], np.float32)
+    hi = np.array([n[1] for n in nodes], np.float32)
+    bounds[:, :3] = np.nextafter(lo, np.float32(-np.inf))
+    bounds[:, 3:] = np.nextafter(hi, np.float32(np.inf))
+    for i, (_, _, leaf, a, b) in enumerate(nodes):
+        if leaf:
+            words[i, 6] = a
+            words[i, 7] = LEAF_FLAG | b
+        else:
+            words[i, 6] = a * 8
+            words[i, 7] = b
+    return words.tobytes()
+
+
+def bvh_primitives(gltf, binc, max_leaf):
+    done = {}   # (POSITION, indices) -> bvh extras, already reordered
+    owner = {}  # indices accessor -> POSITION accessor it was reordered for
+    report = []
+    for mi, mesh in enumerate(gltf.get("meshes", [])):
+        for pi, prim in enumerate(mesh["primitives"]):
+            tris = triangles(gltf, binc, prim)
+            if tris is None or not len(tris):
+                continue
+            pa = prim["attributes"]["POSITION"]
+            key = (pa, prim.get("indices"))
+            if key in done:
+                prim.setdefault("extras", {})["bvh"] = dict(done[key])
+                continue
+            pos = read_accessor(gltf, binc, pa, normalize=True).astype(np.float64)
+            corners = pos[tris]
+            order, nodes = build_bvh(corners.min(1), corners.max(1), max_leaf)
+            flat = index_array(tris[order], len(pos))
+            idx = prim.get("indices")
+            if idx is not None and owner.get(idx, pa) == pa:
+                replace_accessor(gltf, binc, idx, flat, target=ELEMENT_ARRAY_BUFFER)
+            else:
+                prim["indices"] = add_accessor(gltf, binc, flat,
+                                               target=ELEMENT_ARRAY_BUFFER)
+            owner[prim["indices"]] = pa
+            bvh = {"bufferView": append_view(gltf, binc, pack_nodes(nodes)),
+                   "nodeCount": len(nodes), "maxLeafSize": max_leaf,
+                   "layout": "three-mesh-bvh-packed"}
+            prim.setdefault("extras", {})["bvh"] = bvh
+            done[(pa, prim["indices"])] = bvh
+            report.append((mesh.get("name", f"mesh_{mi}"), pi, len(tris), len(nodes)))
+    return report
+
+
+def scene_mesh_nodes(gltf):
+    nodes = gltf.get("nodes", [])
+    if gltf.get("scenes"):
+        stack = list(gltf["scenes"][gltf.get("scene", 0)].get("nodes", []))
+    else:
+        stack = list(range(len(nodes)))
+    out = []
+    while stack:
+        i = stack.pop()
+        stack.extend(nodes[i].get("children", []))
+        if "mesh" in nodes[i]:
+            out.append(i)
+    return out
+
+
+def pose_bounds(gltf, binc, mesh_nodes, world):
+    lo, hi = np.full(3, np.inf), np.full(3, -np.inf)
+    for ni in mesh_nodes:
+        node = gltf["nodes"][ni]
+        for pi, prim in enumerate(gltf["meshes"][node["mesh"]]["primitives"]):
+            if "POSITION" not in prim["attributes"]:
+                continue
+            if "skin" in node:
+                for p in skinned_frames(gltf, binc, ni, world, pi):
+                    lo, hi = np.minimum(lo, p.min(0)), np.maximum(hi, p.max(0))
+                continue
+            acc = gltf["accessors"][prim["attributes"]["POSITION"]]
+            if "min" in acc and "max" in acc and not acc.get("normalized"):
+                box = np.array([acc["min"], acc["max"]], np.float64)
+            else:
+                p = read_accessor(gltf, binc, prim["attributes"]["POSITION"],
+                                  normalize=True)
+                box = np.array([p.min(0), p.max(0)], np.float64)
+            corners = np.array([[box[i, 0], box[j, 1], box[k, 2], 1.0]
+                                for i in (0, 1) for j in (0, 1) for k in (0, 1)])
+            pts = corners @ world[:, ni, :3].transpose(0, 2, 1)
+            lo = np.minimum(lo, pts.reshape(-1, 3).min(0))
+            hi = np.maximum(hi, pts.reshape(-1, 3).max(0))
+    return {"min": [round(float(v), 6) for v in lo],
+            "max": [round(float(v), 6) for v in hi]}
+
+
+def clip_bounds(gltf, binc, fps):
+    mesh_nodes = scene_mesh_nodes(gltf)
+    if not mesh_nodes:
+        return []
+    rest = pose_bounds(gltf, binc, mesh_nodes, world_poses(gltf, binc, None, [0.0]))
+    if gltf.get("scenes"):
+        gltf["scenes"][gltf.get("scene", 0)].setdefault("extras", {})["bounds"] = rest
+    report = [("(rest)", rest)]
+    for ai, anim in enumerate(gltf.get("animations", [])):
+        times = frame_times(clip_duration(gltf, binc, anim), fps)
+        b = pose_bounds(gltf, binc, mesh_nodes, world_poses(gltf, binc, anim, times))
+        anim.setdefault("extras", {})["bounds"] = b
+        report.append((anim.get("name", f"anim_{ai}"), b))
+    return report
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--leaf-size", type=int, default=10,
+                   help="max triangles per leaf (default 10)")
+    p.add_argument("--fps", type=float, default=30,
+                   help="pose sampling rate for clip bounds (default 30)")
+    a = p.parse_args()
+    gltf, binc = read_glb(a.input)
+    for name, pi, ntris, nnodes in bvh_primitives(gltf, binc, a.leaf_size):
+        print(f"  bvh '{name}'[{pi}]: {ntris} triangles -> {nnodes} nodes "
+              f"({nnodes * 32} bytes)")
+    for name, b in clip_bounds(gltf, binc, a.fps):
+        size = [round(hi - lo, 3) for lo, hi in zip(b["min"], b["max"])]
+        print(f"  bounds {name}: min {b['min']} max {b['max']} size {size}")
+    write_glb(a.output, gltf, compact_bin(gltf, binc))
+    print(f"done: {a.output}")
+
+
+if __name__ == "__main__":
+    main()
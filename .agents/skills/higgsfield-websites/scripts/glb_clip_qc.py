@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""glb_clip_qc.py — per-clip motion QC by linear blend skinning
+(numpy + stdlib, no Blender).
+
+glb_inspect.py checks static facts; foot sliding, ground penetration,
+exploding vertices from bad proc_weights.py weights or limbs flying off
+only show up in a render. This tool skins every mesh vertex for all sample
+times of every clip in batched matrix math (glb_pose.py), streaming frame
+chunks so memory stays proportional to one frame, and reports, in
+glTF scene space (Y up, metres):
+  ground      lowest vertex height over the clip vs the ground plane
+              (rest-pose lowest vertex, or --ground); negative = penetration
+  slide       horizontal speed of vertices in ground contact (within
+              --contact of the ground in two consecutive samples): max and
+              median of the per-sample maxima, m/s — planted feet should be ~0
+  stretch     max edge length / rest edge length over the clip (and the
+              min, compression); > --max-stretch means weights tear the mesh
+  bbox        min / max / size of the skinned mesh over the clip
+WARN lines are printed for penetration, sliding above --max-slide and
+stretch outside the limits. --json writes the metrics per clip.
+
+Usage:
+    python3 glb_clip_qc.py model.glb [--fps 30] [--contact 0.02]
+        [--ground Y] [--json qc.json]
+"""
+import argparse
+import json
+
+import numpy as np
+
+from glb_arrays import triangles
+from glb_bvh import scene_mesh_nodes
+from glb_merge_anims import read_glb
+from glb_pose import frame_times, skinned_frames, world_poses
+from glb_split_anims import clip_duration
+
+CHUNK_BYTES = 64 << 20  # blend-matrix batch per primitive (frames x V x 12 doubles)
+
+
+def mesh_edges(tris):
+    e = np.concatenate([tris[:, [0, 1]], tris[:, [1, 2]], tris[:, [2, 0]]])
+    return np.unique(np.sort(e, 1), axis=0)
+
+
+def mesh_parts(gltf, binc):
+    """[(node, primitive, vertex count)] of the default scene + (E, 2) edges."""
+    parts, edges, base = [], [], 0
+    for ni in scene_mesh_nodes(gltf):
+        for pi, prim in enumerate(gltf["meshes"][gltf["nodes"][ni]["mesh"]]["primitives"]):
+            tris = triangles(gltf, binc, prim)
+            if tris is None or "POSITION" not in prim["attributes"]:
+                continue
+            nv = gltf["accessors"][prim["attributes"]["POSITION"]]["count"]
+            parts.append((ni, pi, nv))
+            edges.append(mesh_edges(tris) + base)
+            base += nv
+    if not parts:
+        raise SystemExit("no triangle meshes in the default scene")
+    return parts, np.concatenate(edges)
+
+
+def scene_frames(gltf, binc, parts, world):
+    """Yield (V, 3) positions of every part, one frame at a time.
+
+    skinned_frames batches only as many frames as fit CHUNK_BYTES of
+    blend matrices, so memory stays O(V) however long the clip is.
+    """
+    streams = [skinned_frames(gltf, binc, ni, world, pi,
+                              chunk=max(1, CHUNK_BYTES // (nv * 12 * 8 or 1)))
+               for ni, pi, nv in parts]
+    for frame in zip(*streams):
+        yield np.concatenate(frame)
+
+
+def clip_metrics(frames, times, edges, rest_len, ground, contact):
+    """Accumulate the metrics over a stream of (V, 3) frames."""
+    valid = rest_len > 1e-9
+    lo = hi = None
+    ymin, rmax, rmin = np.inf, -np.inf, np.inf
+    steps, prev, prev_touch = [], None, None
+    for f, pos in enumerate(frames):
+        lo = pos.min(0) if lo is None else np.minimum(lo, pos.min(0))
+        hi = pos.max(0) if hi is None else np.maximum(hi, pos.max(0))
+        ymin = min(ymin, float(pos[:, 1].min()))
+        ratio = np.linalg.norm(pos[edges[valid, 0]] - pos[edges[valid, 1]], axis=-1) \
+            / rest_len[valid]
+        if ratio.size:
+            rmax, rmin = max(rmax, float(ratio.max())), min(rmin, float(ratio.min()))
+        touch = (pos[:, 1] - ground) < contact
+        if prev is not None:
+            both = touch & prev_touch
+            if both.any():
+                dt = max(times[f] - times[f - 1], 1e-9)
+                speed = np.linalg.norm(pos[both][:, [0, 2]] - prev[both][:, [0, 2]], axis=-1) / dt
+                steps.append(float(speed.max()))
+        prev, prev_touch = pos, touch
+    steps = np.array(steps)
+    return {
+        "samples": len(times),
+        "groundMin": round(ymin - ground, 5),
+        "slideMax": round(float(steps.max()) if steps.size else 0.0, 4),
+        "slideMedian": round(float(np.median(steps)) if steps.size else 0.0, 4),
+        "stretchMax": round(rmax if np.isfinite(rmax) else 1.0, 4),
+        "stretchMin": round(rmin if np.isfinite(rmin) else 1.0, 4),
+        "bboxMin": [round(float(v), 4) for v in lo],
+        "bboxMax": [round(float(v), 4) for v in hi],
+        "bboxSize": [round(float(v), 4) for v in hi - lo],
+    }
+
+
+def warnings(m, contact, max_slide, max_stretch):
+    out = []
+    if m["groundMin"] < -contact:
+        out.append(f"penetrates the ground by {-m['groundMin']:.3f}")
+    if m["slideMax"] > max_slide:
+        out.append(f"contact vertices slide at {m['slideMax']:.3f} m/s")
+    if m["stretchMax"] > max_stretch or m["stretchMin"] < 1 / max_stretch:
+        out.append(f"edges stretch x{m['stretchMax']:.2f} / compress x{m['stretchMin']:.2f}")
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("input")
+    p.add_argument("--fps", type=float, default=30)
+    p.add_argument("--contact", type=float, default=0.02,
+                   help="ground-contact band height (scene units, default 0.02)")
+    p.add_argument("--ground", type=float,
+                   help="ground height (default: rest-pose lowest vertex)")
+    p.add_argument("--max-slide", type=float, default=0.1,
+                   help="WARN above this contact speed, m/s (default 0.1)")
+    p.add_argument("--max-stretch", type=float, default=1.5,
+                   help="WARN above this edge stretch ratio (default 1.5)")
+    p.add_argument("--json", help="write per-clip metrics here")
+    a = p.parse_args()
+    gltf, binc = read_glb(a.input)
+    parts, edges = mesh_parts(gltf, binc)
+    rest = next(scene_frames(gltf, binc, parts, world_poses(gltf, binc, None, [0.0])))
+    rest_len = np.linalg.norm(rest[edges[:, 0]] - rest[edges[:, 1]], axis=-1)
+    ground = a.ground if a.ground is not None else float(rest[:, 1].min())
+    print(f"{len(rest)} vertices, {len(edges)} edges; ground y = {ground:.4f}")
+    report = {}
+    for ai, anim in enumerate(gltf.get("animations", [])):
+        name = anim.get("name", f"anim_{ai}")
+        times = frame_times(clip_duration(gltf, binc, anim), a.fps)
+        frames = scene_frames(gltf, binc, parts, world_poses(gltf, binc, anim, times))
+        m = clip_metrics(frames, times, edges, rest_len, ground, a.contact)
+        report[name] = m
+        print(f"  {name}: ground {m['groundMin']:+.4f}  slide max {m['slideMax']:.3f} "
+              f"med {m['slideMedian']:.3f} m/s  stretch {m['stretchMin']:.2f}.."
+              f"{m['stretchMax']:.2f}  bbox {m['bboxSize']}")
+        for w in warnings(m, a.contact, a.max_slide, a.max_stretch):
+            print(f"  WARNING: '{name}' {w}")
+    if not report:
+        print("no animations")
+    if a.json:
+        with open(a.json, "w") as f:
+            json.dump({"ground": ground, "clips": report}, f, indent=1)
+        print(f"done: {a.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""glb_flatten.py — collapse static transform chains in the GLB scene graph
+(numpy + stdlib, no Blender).
+
+FBX-derived exports (fbx2glb.py, rig_transfer.py) arrive wrapped in chains
+of empty nodes: "RootNode", "Armature" containers, the 0.01 unit-conversion
+node, Blender's Y-up correction. three.js walks and updates every one of
+them every frame. This pass removes each node that
+  * has children (leaf empties are kept: they are usually sockets),
+  * is not a skin joint / skin.skeleton and is not targeted by any channel,
+  * carries no mesh, camera, skin, extensions or extras and is not --keep,
+by baking its local matrix into its children (child' = parent @ child) and
+splicing the children into its place (parent's child list or scene roots).
+Nodes are visited top-down, so a whole chain folds into its first real node.
+
+Every kept node keeps its exact world matrix, so inverse bind matrices stay
+valid as they are. Animated children and joints must keep TRS form: their
+parent is folded only when its matrix is rotation + translation + UNIFORM
+scale, and their translation / rotation / scale channel values (cubic
+tangents included) are rewritten by the same transform. Static children
+that would end up sheared get a matrix instead. Node indices are renumbered
+in children, scenes, skins and animations; nodes removed are reported.
+
+Usage:
+    python3 glb_flatten.py in.glb out.glb [--keep Armature ...]
+"""
+import argparse
+import collections
+
+import numpy as np
+
+from glb_arrays import add_accessor, read_accessor
+from glb_instance import decompose, local_matrix
+from glb_merge_anims import compact_bin, drop_channels, read_glb, remove_nodes, write_glb
+from glb_pose import quat_mul, quat_to_matrix
+
+EPS = 1e-9
+
+
+def similarity(m):
+    """4x4 -> (t, q, s) if it is rotation + translation + uniform scale."""
+    trs = decompose(m)
+    if trs is None:
+        return None
+    t, q, s = trs
+    if s[0] <= 0 or np.abs(s - s[0]).max() > 1e-6 * s[0]:
+        return None
+    return t, q, float(s[0])
+
+
+def set_local(node, m, trs_only):
+    """Store m on the node as TRS (default components omitted) or matrix."""
+    for k in ("matrix", "translation", "rotation", "scale"):
+        node.pop(k, None)
+    trs = decompose(m)
+    if trs is None:
+        if trs_only:
+            raise SystemExit("internal error: animated node would need a matrix")
+        if np.abs(m - np.eye(4)).max() > EPS:
+            node["matrix"] = [float(v) for v in m.T.reshape(-1)]
+        return
+    t, q, s = trs
+    if q[3] < 0:
+        q = -q
+    if np.abs(t).max() > EPS:
+        node["translation"] = [float(v) for v in t]
+    if np.abs(q - [0, 0, 0, 1]).max() > EPS:
+        node["rotation"] = [float(v) for v in q]
+    if np.abs(s - 1).max() > EPS:
+        node["scale"] = [float(v) for v in s]
+
+
+def bake_channels(gltf, binc, child, trs):
+    """Rewrite the child's channel outputs as if parented under trs; returns count."""
+    t, q, s = trs
+    r = quat_to_matrix(q)
+    done = 0
+    for anim in gltf.get("animations", []):
+        for ch in anim.get("channels", []):
+            path = ch["target"]["path"]
+            if ch["target"].get("node") != child or path not in ("translation", "rotation", "scale"):
+                continue
+            smp = dict(anim["samplers"][ch["sampler"]])
+            vals = read_accessor(gltf, binc, smp["output"], normalize=True).astype(np.float64)
+            cubic = smp.get("interpolation") == "CUBICSPLINE"
+            # cubic tangents transform linearly: no translation offset
+            value = np.ones(len(vals), bool)
+            if cubic:
+                value[0::3] = value[2::3] = False
+            if path == "translation":
+                vals = vals @ r.T * s + np.where(value[:, None], t, 0.0)
+            elif path == "rotation":
+                vals = quat_mul(np.broadcast_to(q, vals.shape), vals)
+            else:
+                vals = vals * s
+            smp["output"] = add_accessor(gltf, binc, vals.astype(np.float32))
+            # own sampler: the old one may drive other channels
+            anim["samplers"].append(smp)
+            ch["sampler"] = len(anim["samplers"]) - 1
+            done += 1
+        drop_channels(anim, lambda ch: False)
+    return done
+
+
+def collapsible(node, ni, keep, pinned):
+    if ni in pinned or node.get("name") in keep or not node.get("children"):
+        return False
+    return not any(k in node for k in ("mesh", "camera", "skin", "extensions", "extras"))
+
+
+def flatten(gltf, binc, keep=()):
+    """Returns (removed node names, channels rewritten)."""
+    nodes = gltf.get("nodes", [])
+    animated = {ch["target"]["node"] for anim in gltf.get("animations", [])
+                for ch in anim.get("channels", []) if "node" in ch["target"]}
+    joints = {j for skin in gltf.get("skins", []) for j in skin["joints"]}
+    joints |= {skin["skeleton"] for skin in gltf.get("skins", []) if "skeleton" in skin}
+    pinned = animated | joints
+    parent = {c: i for i, n in enumerate(nodes) for c in n.get("children", [])}
+    roots = [n for scene in gltf.get("scenes", []) for n in scene.get("nodes", [])]
+    order = collections.deque(dict.fromkeys(roots + list(range(len(nodes)))))
+    seen, drop, rewritten = set(), set(), 0
+    while order:
+        ni = order.popleft()
+        if ni in seen:
+            continue
+        seen.add(ni)
+        node = nodes[ni]
+        kids = node.get("children", [])
+        order.extendleft(reversed(kids))
+        if not collapsible(node, ni, set(keep), pinned):
+            continue
+        m = local_matrix(node)
+        trs = similarity(m)
+        if trs is None and any(c in pinned for c in kids):
+            continue
+        for c in kids:
+            if c in animated:
+                rewritten += bake_channels(gltf, binc, c, trs)
+            set_local(nodes[c], m @ local_matrix(nodes[c]), c in pinned)
+            if ni in parent:
+                parent[c] = parent[ni]
+            else:
+                parent.pop(c, None)
+        # splice the children into the node's slot
+        if ni in parent:
+            siblings = nodes[parent[ni]]["children"]
+            at = siblings.index(ni)
+            siblings[at:at + 1] = kids
+        for scene in gltf.get("scenes", []):
+            if ni in scene.get("nodes", []):
+                at = scene["nodes"].index(ni)
+                scene["nodes"][at:at + 1] = kids
+        node["children"] = []
+        drop.add(ni)
+    names = [nodes[i].get("name", f"node_{i}") for i in sorted(drop)]
+    remove_nodes(gltf, drop)
+    return names, rewritten
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--keep", nargs="+", default=[], metavar="NAME",
+                   help="node names never collapsed (looked up by name at runtime)")
+    a = p.parse_args()
+    gltf, binc = read_glb(a.input)
+    before = len(gltf.get("nodes", []))
+    names, rewritten = flatten(gltf, binc, a.keep)
+    for name in names:
+        print(f"  collapsed '{name}'")
+    if rewritten:
+        print(f"  {rewritten} channels rebased onto the new parents")
+    write_glb(a.output, gltf, compact_bin(gltf, binc))
+    print(f"done: {a.output} — {before} -> {len(gltf.get('nodes', []))} nodes "
+          f"({len(names)} removed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,12 +10,34 @@ A correct character GLB: skins >= 1, expected clip count, all alphaMode
 OPAQUE, every clip's root scale ~= 1.0. If clips == 1 and the name contains
 "T-Pose", the NLA-tracks export step was skipped.
 
+Directory mode audits a whole asset tree: every *.glb below DIR is
+inspected in a process pool into a JSON report (materials, alpha modes,
+clips, skins, BIN bytes per category, warnings). Reports are cached in
+DIR/.glb_inspect_cache.json keyed by (path, size, mtime, sha1) — unchanged
+files are not re-read, touched-but-identical files are not re-parsed — and
+an aggregate summary is printed. A file that cannot be parsed is reported
+as an error entry (never cached) without stopping the audit. Exit code 1 if
+any file could not be read, else 2 if any root-scale warning.
+
+--budget adds the mobile budget gate: BIN bytes per bufferView and category,
+decoded texture GPU memory (RGBA8, or 1 B/px for KTX2, + 1/3 for mips),
+draw calls (primitives on mesh nodes — one per primitive/material pair),
+triangles, joints per skin and keyframes per clip, each compared against
+DEFAULT_BUDGET (override with a JSON file and/or --limit key=value).
+Exit code 3 on any violation (2 still wins for root-scale warnings).
+
 Usage:
-    python3 glb_inspect.py model.glb
+    python3 glb_inspect.py model.glb [--json] [--budget [limits.json]]
+    python3 glb_inspect.py assets/ [--jobs 8] [--json report.json] [--no-cache]
+        [--budget [limits.json]] [--limit drawCalls=32 ...]
 """
+import argparse
+import hashlib
 import json
+import os
 import struct
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
 MAGIC = 0x46546C67
 CHUNK_JSON = 0x4E4F534A
@@ -23,11 +45,30 @@ CHUNK_BIN = 0x004E4942
 
 COMPONENT_FMT = {5120: "b", 5121: "B", 5122: "h", 5123: "H", 5125: "I", 5126: "f"}
 TYPE_COUNT = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT4": 16}
+CACHE_NAME = ".glb_inspect_cache.json"
+CACHE_VERSION = 2
+DEFAULT_BUDGET = {
+    "fileMiB": 16,           # whole GLB
+    "geometryMiB": 6,        # vertex + index + morph data
+    "animationMiB": 4,       # sampler inputs + outputs
+    "textureGpuMiB": 64,     # decoded textures incl. mips
+    "textureSize": 2048,     # longest side of any texture
+    "drawCalls": 64,
+    "triangles": 150000,
+    "jointsPerSkin": 128,
+    "keyframesPerClip": 20000,  # sum of sampler key counts in one clip
+}
 
 
-def read_glb(path):
-    with open(path, "rb") as f:
-        data = f.read()
+def parse_glb(data, path):
+    try:
+        return _parse_glb(data, path)
+    except (struct.error, UnicodeDecodeError, ValueError) as e:
+        raise SystemExit(f"{path}: truncated or corrupt GLB ({e}); "
+                         "run glb_validate.py for details")
+
+
+def _parse_glb(data, path):
     magic, version, _ = struct.unpack_from("<III", data, 0)
     if magic != MAGIC or version != 2:
         raise SystemExit(f"{path}: not a GLB v2 file")
@@ -35,6 +76,9 @@ def read_glb(path):
     off = 12
     while off < len(data):
         clen, ctype = struct.unpack_from("<II", data, off)
+        if off + 8 + clen > len(data):
+            raise struct.error(f"chunk at byte {off} needs {clen} bytes, "
+                               f"{len(data) - off - 8} left")
         payload = data[off + 8: off + 8 + clen]
         if ctype == CHUNK_JSON:
             gltf = json.loads(payload.decode("utf-8"))
@@ -44,11 +88,18 @@ def read_glb(path):
     return gltf, binchunk
 
 
+def read_glb(path):
+    with open(path, "rb") as f:
+        return parse_glb(f.read(), path)
+
+
 def accessor_values(gltf, binchunk, idx):
     acc = gltf["accessors"][idx]
     if "min" in acc and "max" in acc:
         return acc["min"], acc["max"], None
     bv = gltf["bufferViews"][acc["bufferView"]]
+    if bv.get("buffer", 0) != 0:  # external or EXT_meshopt_compression fallback
+        return None, None, None
     fmt = COMPONENT_FMT[acc["componentType"]]
     ncomp = TYPE_COUNT[acc["type"]]
     base = bv.get("byteOffset", 0) + acc.get("byteOffset", 0)
@@ -73,49 +124,428 @@ def find_skeleton_roots(gltf):
     return {j for j in joints if parented.get(j) not in joints}
 
 
-def main():
-    if len(sys.argv) != 2:
-        raise SystemExit(__doc__)
-    gltf, binchunk = read_glb(sys.argv[1])
-    anims = gltf.get("animations", [])
-    print(f"file:       {sys.argv[1]}")
-    print(f"meshes:     {len(gltf.get('meshes', []))}")
-    print(f"skins:      {len(gltf.get('skins', []))}")
-    print(f"images:     {len(gltf.get('images', []))}")
-    print(f"materials:  {len(gltf.get('materials', []))}")
-    for i, mat in enumerate(gltf.get("materials", [])):
-        mode = mat.get("alphaMode", "OPAQUE")
-        ds = mat.get("doubleSided", False)
-        flag = "" if mode == "OPAQUE" else "   <-- WARNING: not OPAQUE (three.js depth-sorting artifacts)"
-        print(f"  material[{i}] '{mat.get('name', '?')}': alphaMode={mode} doubleSided={ds}{flag}")
-    print(f"animations: {len(anims)}")
+def view_categories(gltf):
+    """bufferView index -> geometry / skin / animation / images."""
+    cat = {}
+
+    def mark(acc_idx, kind):
+        acc = gltf["accessors"][acc_idx]
+        views = [acc.get("bufferView")]
+        sparse = acc.get("sparse")
+        if sparse:
+            views += [sparse["indices"]["bufferView"], sparse["values"]["bufferView"]]
+        for v in views:
+            if v is not None:
+                cat.setdefault(v, kind)
+
+    for mesh in gltf.get("meshes", []):
+        for prim in mesh.get("primitives", []):
+            if "indices" in prim:
+                mark(prim["indices"], "geometry")
+            for a in prim.get("attributes", {}).values():
+                mark(a, "geometry")
+            for tgt in prim.get("targets", []):
+                for a in tgt.values():
+                    mark(a, "geometry")
+    for skin in gltf.get("skins", []):
+        if "inverseBindMatrices" in skin:
+            mark(skin["inverseBindMatrices"], "skin")
+    for anim in gltf.get("animations", []):
+        for smp in anim.get("samplers", []):
+            mark(smp["input"], "animation")
+            mark(smp["output"], "animation")
+    for img in gltf.get("images", []):
+        if "bufferView" in img:
+            cat.setdefault(img["bufferView"], "images")
+    return cat
+
+
+def byte_budget(gltf):
+    cat = view_categories(gltf)
+    out = {"geometry": 0, "skin": 0, "animation": 0, "images": 0, "other": 0}
+    for i, bv in enumerate(gltf.get("bufferViews", [])):
+        out[cat.get(i, "other")] += bv["byteLength"]
+    return out
+
+
+def image_size(data):
+    """(width, height, bytes per pixel on the GPU) from a PNG/JPEG/WebP/KTX2 header."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        w, h = struct.unpack_from(">II", data, 16)
+        return w, h, 4
+    if data[:2] == b"\xff\xd8":
+        off = 2
+        while off + 9 < len(data):
+            if data[off] != 0xFF:
+                off += 1
+                continue
+            marker = data[off + 1]
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                h, w = struct.unpack_from(">HH", data, off + 5)
+                return w, h, 4
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                off += 2
+                continue
+            off += 2 + struct.unpack_from(">H", data, off + 2)[0]
+        return None
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        kind = data[12:16]
+        if kind == b"VP8 ":
+            w, h = struct.unpack_from("<HH", data, 26)
+            return w & 0x3FFF, h & 0x3FFF, 4
+        if kind == b"VP8L":
+            bits = struct.unpack_from("<I", data, 21)[0]
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, 4
+        if kind == b"VP8X":
+            return (1 + int.from_bytes(data[24:27], "little"),
+                    1 + int.from_bytes(data[27:30], "little"), 4)
+    if data[:12] == b"\xabKTX 20\xbb\r\n\x1a\n":
+        w, h = struct.unpack_from("<II", data, 20)
+        return w, h, 1  # BC7 / ASTC 4x4 after transcoding
+    return None
+
+
+def budget_stats(gltf, binchunk):
+    """Numbers the --budget gate checks (thresholds are applied later)."""
+    cat = view_categories(gltf)
+    views = [{"index": i, "bytes": bv["byteLength"], "category": cat.get(i, "other")}
+             for i, bv in enumerate(gltf.get("bufferViews", []))]
+    textures = []
+    for i, img in enumerate(gltf.get("images", [])):
+        if "bufferView" not in img:
+            continue
+        bv = gltf["bufferViews"][img["bufferView"]]
+        start = bv.get("byteOffset", 0)
+        size = image_size(binchunk[start: start + bv["byteLength"]])
+        if size:
+            w, h, bpp = size
+            textures.append({"image": i, "name": img.get("name", ""), "width": w,
+                             "height": h, "gpuBytes": w * h * bpp * 4 // 3})
+    draw_calls = triangles = 0
+    for node in gltf.get("nodes", []):
+        if "mesh" not in node:
+            continue
+        for prim in gltf["meshes"][node["mesh"]].get("primitives", []):
+            draw_calls += 1
+            if prim.get("mode", 4) != 4:
+                continue
+            acc = prim.get("indices", prim.get("attributes", {}).get("POSITION"))
+            if acc is not None:
+                triangles += gltf["accessors"][acc]["count"] // 3
+    clips = []
+    for a in gltf.get("animations", []):
+        keys = [gltf["accessors"][smp["input"]]["count"] for smp in a.get("samplers", [])]
+        clips.append({"name": a.get("name", "?"), "keyframes": sum(keys),
+                      "maxKeys": max(keys, default=0)})
+    return {
+        "views": views,
+        "textures": textures,
+        "textureGpuBytes": sum(t["gpuBytes"] for t in textures),
+        "drawCalls": draw_calls,
+        "triangles": triangles,
+        "jointsPerSkin": [len(s.get("joints", [])) for s in gltf.get("skins", [])],
+        "clips": clips,
+    }
+
+
+def budget_violations(report, size, limits):
+    st, b = report["stats"], report["bytes"]
+    mib = 1048576
+    checks = [
+        ("fileMiB", size / mib, "file"),
+        ("geometryMiB", b["geometry"] / mib, "geometry bytes"),
+        ("animationMiB", b["animation"] / mib, "animation bytes"),
+        ("textureGpuMiB", st["textureGpuBytes"] / mib, "texture GPU memory"),
+        ("drawCalls", st["drawCalls"], "draw calls"),
+        ("triangles", st["triangles"], "triangles"),
+    ]
+    checks += [("textureSize", max(t["width"], t["height"]),
+                f"texture '{t['name'] or t['image']}' size") for t in st["textures"]]
+    checks += [("jointsPerSkin", n, f"skin[{i}] joints")
+               for i, n in enumerate(st["jointsPerSkin"])]
+    checks += [("keyframesPerClip", c["keyframes"], f"clip '{c['name']}' keyframes")
+               for c in st["clips"]]
+    return [(label, value, limits[key]) for key, value, label in checks
+            if value > limits[key]]
+
 
+def print_budget(report, size, limits):
+    st, b = report["stats"], report["bytes"]
+    mib = 1048576
+    print("budget:")
+    print(f"  file            {size / mib:8.2f} MiB")
+    for k, v in b.items():
+        print(f"  {k:<15} {v / mib:8.2f} MiB")
+    top = sorted(st["views"], key=lambda v: -v["bytes"])[:8]
+    for v in top:
+        print(f"    bufferView[{v['index']}] {v['category']:<9} {v['bytes'] / 1024:10.1f} KiB")
+    for t in st["textures"]:
+        print(f"  texture image[{t['image']}] {t['width']}x{t['height']}: "
+              f"{t['gpuBytes'] / mib:.1f} MiB on GPU")
+    print(f"  texture GPU     {st['textureGpuBytes'] / mib:8.2f} MiB")
+    print(f"  draw calls      {st['drawCalls']:8d}")
+    print(f"  triangles       {st['triangles']:8d}")
+    if st["jointsPerSkin"]:
+        print(f"  joints/skin     {st['jointsPerSkin']}")
+    for c in st["clips"]:
+        print(f"  clip '{c['name']}': {c['keyframes']} keyframes (longest sampler {c['maxKeys']})")
+    bad = budget_violations(report, size, limits)
+    for label, value, limit in bad:
+        print(f"  OVER BUDGET: {label} {value:.6g} > {limit}")
+    if not bad:
+        print("  within budget")
+    return bad
+
+
+def load_limits(budget_file, overrides):
+    limits = dict(DEFAULT_BUDGET)
+    if budget_file and budget_file != "default":
+        with open(budget_file) as f:
+            limits.update(json.load(f))
+    for spec in overrides:
+        key, _, value = spec.partition("=")
+        if key not in DEFAULT_BUDGET:
+            raise SystemExit(f"--limit {spec}: unknown key (have {sorted(DEFAULT_BUDGET)})")
+        limits[key] = float(value)
+    return limits
+
+
+def inspect(gltf, binchunk):
+    """Structured report: counts, materials, clips, byte budget, warnings."""
+    anims = gltf.get("animations", [])
+    report = {
+        "meshes": len(gltf.get("meshes", [])),
+        "skins": len(gltf.get("skins", [])),
+        "images": len(gltf.get("images", [])),
+        "materials": [{"name": m.get("name", "?"),
+                       "alphaMode": m.get("alphaMode", "OPAQUE"),
+                       "doubleSided": m.get("doubleSided", False)}
+                      for m in gltf.get("materials", [])],
+        "clips": [],
+        "bytes": byte_budget(gltf),
+        "stats": budget_stats(gltf, binchunk),
+        "warnings": [],
+    }
+    warn = report["warnings"]
+    for mat in report["materials"]:
+        if mat["alphaMode"] != "OPAQUE":
+            warn.append({"kind": "alphaMode",
+                         "message": f"material '{mat['name']}' alphaMode={mat['alphaMode']}"})
     roots = find_skeleton_roots(gltf)
-    warnings = []
     for a in anims:
-        name = a.get("name", "?")
-        scale_note = ""
+        clip = {"name": a.get("name", "?"), "channels": len(a.get("channels", []))}
         for ch in a.get("channels", []):
             tgt = ch.get("target", {})
             if tgt.get("path") != "scale" or tgt.get("node") not in roots:
                 continue
             sampler = a["samplers"][ch["sampler"]]
             mins, maxs, _ = accessor_values(gltf, binchunk, sampler["output"])
+            if mins is None:
+                continue
             lo, hi = min(mins), max(maxs)
             if abs(lo - 1.0) > 1e-3 or abs(hi - 1.0) > 1e-3:
                 node_name = gltf["nodes"][tgt["node"]].get("name", tgt["node"])
-                scale_note = (f"   <-- WARNING: root '{node_name}' scale in "
-                              f"[{lo:.4f}, {hi:.4f}] != 1.0 (Meshy baked-scale bug; "
-                              f"re-run merge_anim_glbs.py or fix manually)")
-                warnings.append(name)
-        print(f"  clip: {name}{scale_note}")
-
+                clip["rootScale"] = {"node": node_name, "min": lo, "max": hi}
+                warn.append({"kind": "rootScale",
+                             "message": f"clip '{clip['name']}' root '{node_name}' "
+                                        f"scale in [{lo:.4f}, {hi:.4f}]"})
+        report["clips"].append(clip)
     if len(anims) == 1 and "t-pose" in anims[0].get("name", "").lower().replace("_", "-"):
-        print("WARNING: single clip named like T-Pose — NLA-tracks export step was skipped")
+        warn.append({"kind": "tpose", "message": "single clip named like T-Pose"})
     if not gltf.get("skins"):
+        warn.append({"kind": "noSkins", "message": "skins == 0"})
+    return report
+
+
+def print_report(path, report):
+    print(f"file:       {path}")
+    print(f"meshes:     {report['meshes']}")
+    print(f"skins:      {report['skins']}")
+    print(f"images:     {report['images']}")
+    print(f"materials:  {len(report['materials'])}")
+    for i, mat in enumerate(report["materials"]):
+        mode = mat["alphaMode"]
+        flag = "" if mode == "OPAQUE" else "   <-- WARNING: not OPAQUE (three.js depth-sorting artifacts)"
+        print(f"  material[{i}] '{mat['name']}': alphaMode={mode} "
+              f"doubleSided={mat['doubleSided']}{flag}")
+    print(f"animations: {len(report['clips'])}")
+    for clip in report["clips"]:
+        rs = clip.get("rootScale")
+        scale_note = "" if not rs else (
+            f"   <-- WARNING: root '{rs['node']}' scale in "
+            f"[{rs['min']:.4f}, {rs['max']:.4f}] != 1.0 (Meshy baked-scale bug; "
+            f"re-run merge_anim_glbs.py or fix manually)")
+        print(f"  clip: {clip['name']}{scale_note}")
+    kinds = {w["kind"] for w in report["warnings"]}
+    if "tpose" in kinds:
+        print("WARNING: single clip named like T-Pose — NLA-tracks export step was skipped")
+    if "noSkins" in kinds:
         print("WARNING: skins == 0 — weight transfer failed (check data_transfer direction: source must be ACTIVE)")
-    if warnings:
+
+
+def inspect_file(path):
+    """Worker: -> (path, sha1, report, error); one bad file must not stop the audit."""
+    with open(path, "rb") as f:
+        data = f.read()
+    sha1 = hashlib.sha1(data).hexdigest()
+    try:
+        gltf, binchunk = parse_glb(data, path)
+        if gltf is None:
+            raise SystemExit(f"{path}: no JSON chunk")
+        return path, sha1, inspect(gltf, binchunk), None
+    except SystemExit as e:
+        return path, sha1, None, str(e)
+    except Exception as e:  # malformed JSON content
+        return path, sha1, None, f"{path}: {type(e).__name__}: {e}"
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def scan(root, jobs, use_cache):
+    cache_path = os.path.join(root, CACHE_NAME)
+    cache = {}
+    if use_cache and os.path.exists(cache_path):
+        with open(cache_path) as f:
+            stored = json.load(f)
+        if stored.get("version") == CACHE_VERSION:
+            cache = stored["files"]
+    paths = sorted(os.path.join(d, n) for d, _, files in os.walk(root)
+                   for n in files if n.lower().endswith(".glb"))
+    entries, todo, hits = {}, [], 0
+    for path in paths:
+        rel = os.path.relpath(path, root)
+        st = os.stat(path)
+        old = cache.get(rel)
+        if old and old["size"] == st.st_size and old["mtime"] == st.st_mtime_ns:
+            entries[rel] = old
+            hits += 1
+            continue
+        if old and old["size"] == st.st_size and old["sha1"] == file_sha1(path):
+            entries[rel] = dict(old, mtime=st.st_mtime_ns)
+            hits += 1
+            continue
+        todo.append((rel, path, st))
+    if todo:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = pool.map(inspect_file, [p for _, p, _ in todo], chunksize=4)
+            for (rel, _, st), (_, sha1, report, error) in zip(todo, results):
+                entries[rel] = {"size": st.st_size, "mtime": st.st_mtime_ns,
+                                "sha1": sha1, "report": report}
+                if error:
+                    entries[rel]["error"] = error
+    if use_cache:
+        # failed files are retried next run
+        with open(cache_path, "w") as f:
+            json.dump({"version": CACHE_VERSION,
+                       "files": {k: e for k, e in entries.items() if "error" not in e}}, f)
+    return entries, hits, len(todo)
+
+
+def summarize(entries):
+    total = {"files": len(entries), "bytes": 0, "clips": 0, "warnings": {}, "errors": 0}
+    cats = {}
+    for e in entries.values():
+        if "error" in e:
+            total["errors"] += 1
+            continue
+        r = e["report"]
+        total["bytes"] += e["size"]
+        total["clips"] += len(r["clips"])
+        for k, v in r["bytes"].items():
+            cats[k] = cats.get(k, 0) + v
+        for w in r["warnings"]:
+            total["warnings"][w["kind"]] = total["warnings"].get(w["kind"], 0) + 1
+    total["binBytes"] = cats
+    return total
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("path", help="a .glb file or a directory to audit recursively")
+    p.add_argument("--json", nargs="?", const="-", metavar="OUT",
+                   help="print (file) or write (directory) the JSON report")
+    p.add_argument("--jobs", type=int, default=os.cpu_count(),
+                   help="directory mode: worker processes")
+    p.add_argument("--no-cache", action="store_true",
+                   help="directory mode: ignore and do not write the cache")
+    p.add_argument("--budget", nargs="?", const="default", metavar="LIMITS_JSON",
+                   help="check the budget (DEFAULT_BUDGET, updated from the JSON file)")
+    p.add_argument("--limit", nargs="*", default=[], metavar="KEY=VALUE",
+                   help="override single budget limits, e.g. drawCalls=32")
+    a = p.parse_args()
+    limits = load_limits(a.budget, a.limit) if a.budget or a.limit else None
+
+    if not os.path.isdir(a.path):
+        gltf, binchunk = read_glb(a.path)
+        report = inspect(gltf, binchunk)
+        size = os.path.getsize(a.path)
+        if a.json:
+            if limits:
+                report["budget"] = {"limits": limits, "violations": [
+                    {"what": l, "value": v, "limit": m}
+                    for l, v, m in budget_violations(report, size, limits)]}
+            print(json.dumps(report, indent=1))
+            bad = limits and report["budget"]["violations"]
+        else:
+            print_report(a.path, report)
+            bad = limits and print_budget(report, size, limits)
+        if any(w["kind"] == "rootScale" for w in report["warnings"]):
+            sys.exit(2)
+        if bad:
+            sys.exit(3)
+        return
+
+    entries, hits, parsed = scan(a.path, a.jobs, not a.no_cache)
+    summary = summarize(entries)
+    over = {}
+    for rel, e in sorted(entries.items()):
+        if "error" in e:
+            print(f"  {rel}: ERROR {e['error']}")
+            continue
+        for w in e["report"]["warnings"]:
+            print(f"  {rel}: WARNING {w['message']}")
+        if limits:
+            over[rel] = budget_violations(e["report"], e["size"], limits)
+            for label, value, limit in over[rel]:
+                print(f"  {rel}: OVER BUDGET {label} {value:.6g} > {limit}")
+    mib = summary["bytes"] / 1048576
+    print(f"{summary['files']} GLBs ({parsed} inspected, {hits} cached), "
+          f"{mib:.1f} MiB, {summary['clips']} clips")
+    print("BIN bytes: " + ", ".join(f"{k} {v / 1048576:.1f} MiB"
+                                   for k, v in summary["binBytes"].items()))
+    if summary["errors"]:
+        print(f"errors: {summary['errors']} GLBs could not be read (not cached)")
+    if summary["warnings"]:
+        print("warnings: " + ", ".join(f"{k} x{v}" for k, v in sorted(summary["warnings"].items())))
+    if limits:
+        print(f"budget: {sum(1 for v in over.values() if v)} of {len(over)} GLBs over")
+    if a.json:
+        out = {"summary": summary,
+               "assets": {rel: dict(e["report"] or {"error": e.get("error")},
+                                    size=e["size"], sha1=e["sha1"])
+                          for rel, e in sorted(entries.items())}}
+        if limits:
+            out["budget"] = {"limits": limits, "violations": {
+                rel: [{"what": l, "value": v, "limit": m} for l, v, m in bad]
+                for rel, bad in over.items() if bad}}
+        if a.json == "-":
+            print(json.dumps(out, indent=1))
+        else:
+            with open(a.json, "w") as f:
+                json.dump(out, f, indent=1)
+            print(f"done: {a.json}")
+    if summary["errors"]:
+        sys.exit(1)
+    if summary["warnings"].get("rootScale"):
         sys.exit(2)
+    if any(over.values()):
+        sys.exit(3)
 
 
 if __name__ == "__main__":
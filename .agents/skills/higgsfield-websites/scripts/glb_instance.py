@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""glb_instance.py — automatic GPU instancing of duplicated meshes via
+EXT_mesh_gpu_instancing (numpy + stdlib, no Blender).
+
+Scenes assembled from generated props (fences, rocks, crates) hold many
+nodes whose meshes are the same bytes under different indices; each one is
+a separate draw call. This pass:
+  1. hashes every mesh by content (accessor payloads + material content,
+     not indices) and points all duplicates at one canonical mesh — the
+     duplicate buffers are dropped when the BIN chunk is compacted;
+  2. collects static, unskinned mesh nodes per canonical mesh and, for
+     groups of >= --min-count, moves the mesh onto ONE new root node with
+     EXT_mesh_gpu_instancing TRANSLATION / ROTATION / SCALE accessors
+     holding each original node's world transform. The original nodes stay
+     (children, names, picking) without their mesh.
+Nodes that are animated (or under an animated parent), joints, morphing,
+or whose world matrix has shear are left alone. The extension is declared
+required (three.js GLTFLoader turns it into an InstancedMesh).
+
+Usage:
+    python3 glb_instance.py in.glb out.glb [--min-count 2]
+"""
+import argparse
+import hashlib
+import json
+
+import numpy as np
+
+from glb_arrays import add_accessor, read_accessor
+from glb_merge_anims import compact_bin, read_glb, write_glb
+
+EXT = "EXT_mesh_gpu_instancing"
+
+
+def accessor_digest(gltf, binc, idx, cache):
+    if idx not in cache:
+        acc = gltf["accessors"][idx]
+        h = hashlib.sha1(json.dumps([acc["componentType"], acc["type"],
+                                     acc.get("normalized", False)]).encode())
+        h.update(np.ascontiguousarray(read_accessor(gltf, binc, idx)).tobytes())
+        cache[idx] = h.hexdigest()
+    return cache[idx]
+
+
+def material_digest(gltf, mi):
+    if mi is None:
+        return None
+    mat = dict(gltf["materials"][mi])
+    mat.pop("name", None)
+    return hashlib.sha1(json.dumps(mat, sort_keys=True).encode()).hexdigest()
+
+
+def mesh_digest(gltf, binc, mesh, cache):
+    parts = []
+    for prim in mesh["primitives"]:
+        parts.append([
+            prim.get("mode", 4),
+            sorted((k, accessor_digest(gltf, binc, a, cache))
+                   for k, a in prim["attributes"].items()),
+            accessor_digest(gltf, binc, prim["indices"], cache) if "indices" in prim else None,
+            [sorted((k, accessor_digest(gltf, binc, a, cache)) for k, a in t.items())
+             for t in prim.get("targets", [])],
+            material_digest(gltf, prim.get("material")),
+            prim.get("extensions")])
+    parts.append(mesh.get("weights"))
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def local_matrix(node):
+    if "matrix" in node:
+        return np.array(node["matrix"], np.float64).reshape(4, 4).T
+    t = np.array(node.get("translation", [0, 0, 0]), np.float64)
+    x, y, z, w = node.get("rotation", [0, 0, 0, 1])
+    s = np.array(node.get("scale", [1, 1, 1]), np.float64)
+    r = np.array([[1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+                  [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+                  [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)]])
+    m = np.eye(4)
+    m[:3, :3] = r * s[None, :]
+    m[:3, 3] = t
+    return m
+
+
+def world_matrices(gltf):
+    """node -> world matrix, node -> parent (scene roots have none)."""
+    nodes = gltf.get("nodes", [])
+    parent = {c: i for i, n in enumerate(nodes) for c in n.get("children", [])}
+    world = {}
+
+    def get(i):
+        if i not in world:
+            m = local_matrix(nodes[i])
+            world[i] = get(parent[i]) @ m if i in parent else m
+        return world[i]
+
+    for i in range(len(nodes)):
+        get(i)
+    return world, parent
+
+
+def decompose(m):
+    """4x4 -> (t, quat xyzw, s) or None if the matrix has shear."""
+    t = m[:3, 3].copy()
+    a = m[:3, :3]
+    s = np.linalg.norm(a, axis=0)
+    if (s < 1e-12).any():
+        return None
+    r = a / s
+    if np.linalg.det(r) < 0:
+        s[0], r[:, 0] = -s[0], -r[:, 0]
+    if np.abs(r.T @ r - np.eye(3)).max() > 1e-4:
+        return None
+    tr = np.trace(r)
+    if tr > 0:
+        k = np.sqrt(tr + 1.0) * 2
+        q = [(r[2, 1] - r[1, 2]) / k, (r[0, 2] - r[2, 0]) / k,
+             (r[1, 0] - r[0, 1]) / k, 0.25 * k]
+    elif r[0, 0] > r[1, 1] and r[0, 0] > r[2, 2]:
+        k = np.sqrt(1.0 + r[0, 0] - r[1, 1] - r[2, 2]) * 2
+        q = [0.25 * k, (r[0, 1] + r[1, 0]) / k, (r[0, 2] + r[2, 0]) / k,
+             (r[2, 1] - r[1, 2]) / k]
+    elif r[1, 1] > r[2, 2]:
+        k = np.sqrt(1.0 + r[1, 1] - r[0, 0] - r[2, 2]) * 2
+        q = [(r[0, 1] + r[1, 0]) / k, 0.25 * k, (r[1, 2] + r[2, 1]) / k,
+             (r[0, 2] - r[2, 0]) / k]
+    else:
+        k = np.sqrt(1.0 + r[2, 2] - r[0, 0] - r[1, 1]) * 2
+        q = [(r[0, 2] + r[2, 0]) / k, (r[1, 2] + r[2, 1]) / k, 0.25 * k,
+             (r[1, 0] - r[0, 1]) / k]
+    q = np.array(q)
+    return t, q / np.linalg.norm(q), s
+
+
+def draw_calls(gltf):
+    total = 0
+    for node in gltf.get("nodes", []):
+        if "mesh" in node:
+            total += len(gltf["meshes"][node["mesh"]]["primitives"])
+    return total
+
+
+def instance(gltf, binc, min_count):
+    nodes = gltf.get("nodes", [])
+    cache, canon, remap = {}, {}, {}
+    for mi, mesh in enumerate(gltf.get("meshes", [])):
+        d = mesh_digest(gltf, binc, mesh, cache)
+        remap[mi] = canon.setdefault(d, mi)
+    deduped = sum(1 for k, v in remap.items() if k != v)
+    for node in nodes:
+        if "mesh" in node:
+            node["mesh"] = remap[node["mesh"]]
+
+    world, parent = world_matrices(gltf)
+    animated = {ch["target"]["node"] for a in gltf.get("animations", [])
+                for ch in a["channels"] if "node" in ch["target"]}
+    joints = {j for s in gltf.get("skins", []) for j in s["joints"]}
+
+    def static(i):
+        while True:
+            if i in animated:
+                return False
+            if i not in parent:
+                return True
+            i = parent[i]
+
+    groups = {}
+    for ni, node in enumerate(nodes):
+        if ("mesh" not in node or "skin" in node or "weights" in node
+                or ni in joints or EXT in node.get("extensions", {})
+                or not static(ni)):
+            continue
+        trs = decompose(world[ni])
+        if trs is not None:
+            groups.setdefault(node["mesh"], []).append((ni, trs))
+
+    scene_of = {}
+    for si, scene in enumerate(gltf.get("scenes", [])):
+        stack = list(scene.get("nodes", []))
+        while stack:
+            n = stack.pop()
+            scene_of.setdefault(n, si)
+            stack.extend(nodes[n].get("children", []))
+    made = []
+    for mi, members in groups.items():
+        if len(members) < min_count:
+            continue
+        t = np.array([trs[0] for _, trs in members], np.float32)
+        r = np.array([trs[1] for _, trs in members], np.float32)
+        s = np.array([trs[2] for _, trs in members], np.float32)
+        attrs = {"TRANSLATION": add_accessor(gltf, binc, t)}
+        if np.abs(r - [0, 0, 0, 1]).max() > 1e-7:
+            attrs["ROTATION"] = add_accessor(gltf, binc, r)
+        if np.abs(s - 1).max() > 1e-7:
+            attrs["SCALE"] = add_accessor(gltf, binc, s)
+        name = gltf["meshes"][mi].get("name", f"mesh_{mi}")
+        nodes.append({"name": f"{name}_instances", "mesh": mi,
+                      "extensions": {EXT: {"attributes": attrs}},
+                      "extras": {"instanceNodes": [
+                          nodes[ni].get("name", f"node_{ni}") for ni, _ in members]}})
+        inst = len(nodes) - 1
+        for ni, _ in members:
+            del nodes[ni]["mesh"]
+        scene = scene_of.get(members[0][0], 0)
+        if gltf.get("scenes"):
+            gltf["scenes"][scene].setdefault("nodes", []).append(inst)
+        made.append((name, len(members), len(gltf["meshes"][mi]["primitives"])))
+    if made:
+        for key in ("extensionsUsed", "extensionsRequired"):
+            lst = gltf.setdefault(key, [])
+            if EXT not in lst:
+                lst.append(EXT)
+    return deduped, made
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--min-count", type=int, default=2,
+                   help="instance a mesh only if at least this many nodes use it")
+    a = p.parse_args()
+    gltf, binc = read_glb(a.input)
+    before, bin_before = draw_calls(gltf), len(binc)
+    deduped, made = instance(gltf, binc, a.min_count)
+    for name, count, prims in made:
+        print(f"  '{name}': {count} nodes -> 1 instanced node ({prims} draw calls)")
+    out = compact_bin(gltf, binc)
+    # duplicate meshes are now unreferenced: drop them from the mesh list
+    used = sorted({n["mesh"] for n in gltf.get("nodes", []) if "mesh" in n})
+    if len(used) < len(gltf.get("meshes", [])):
+        mesh_map = {old: new for new, old in enumerate(used)}
+        gltf["meshes"] = [gltf["meshes"][i] for i in used]
+        for n in gltf["nodes"]:
+            if "mesh" in n:
+                n["mesh"] = mesh_map[n["mesh"]]
+        out = compact_bin(gltf, out)
+    write_glb(a.output, gltf, out)
+    print(f"meshes deduplicated: {deduped}; draw calls {before} -> {draw_calls(gltf)}")
+    print(f"done: {a.output} ({bin_before} -> {len(out)} BIN bytes)")
+
+
+if __name__ == "__main__":
+    main()
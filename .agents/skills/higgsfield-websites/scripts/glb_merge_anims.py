@@ -14,15 +14,27 @@ Includes the two mandatory Meshy post-fixes from the skill:
   * materials forced to alphaMode OPAQUE + doubleSided (the "inverted
     normals" lookalike).
 
+Donors are loaded concurrently (--jobs threads, default min(8, CPUs)):
+each one is mmapped and only its JSON chunk plus the byte ranges of its
+animation accessors are touched — the donor's mesh and textures are never
+read. Clips are merged in command-line order whatever finishes first, and
+the output BIN is streamed to disk without another full copy.
+
 Usage:
     python3 glb_merge_anims.py base.glb walk.glb:Walk run.glb:Run \
-            idle.glb:Idle attack.glb:Attack out.glb
+            idle.glb:Idle attack.glb:Attack out.glb [--jobs 8]
+
+Set GLB_VALIDATE=1 to run glb_validate.py on every GLB written through
+write_glb (all the numpy passes use it) and fail on structural errors.
 
 Verify the result with glb_inspect.py (clip count, skins>=1, root scale 1.0).
 """
 import json
+import mmap
+import os
 import struct
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 MAGIC = 0x46546C67
 CHUNK_JSON = 0x4E4F534A
@@ -30,6 +42,7 @@ CHUNK_BIN = 0x004E4942
 COMP_SIZE = {5120: 1, 5121: 1, 5122: 2, 5123: 2, 5125: 4, 5126: 4}
 TYPE_COUNT = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT4": 16}
 SCALE_TOL = 0.02
+MESHOPT = "EXT_meshopt_compression"
 
 
 def read_glb(path):
@@ -56,12 +69,59 @@ def write_glb(path, gltf, binc):
         gltf["buffers"][0]["byteLength"] = len(binc)
     j = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
     j += b" " * ((4 - len(j) % 4) % 4)
-    b = bytes(binc) + b"\x00" * ((4 - len(binc) % 4) % 4)
-    total = 12 + 8 + len(j) + 8 + len(b)
+    pad = (4 - len(binc) % 4) % 4
+    total = 12 + 8 + len(j) + 8 + len(binc) + pad
     with open(path, "wb") as f:
         f.write(struct.pack("<III", MAGIC, 2, total))
         f.write(struct.pack("<II", len(j), CHUNK_JSON) + j)
-        f.write(struct.pack("<II", len(b), CHUNK_BIN) + b)
+        f.write(struct.pack("<II", len(binc) + pad, CHUNK_BIN))
+        f.write(binc)  # streamed as is, no padded copy of the whole BIN
+        f.write(b"\x00" * pad)
+    if os.environ.get("GLB_VALIDATE", "").strip().lower() in ("1", "true", "yes", "on"):
+        from glb_validate import validate_file  # numpy; only when gating
+        errors = [i for i in validate_file(path) if i["severity"] == "error"]
+        if errors:
+            raise SystemExit(f"{path}: invalid GLB written:\n" + "\n".join(
+                f"  {i['code']} {i['pointer']} {i['message']}" for i in errors))
+
+
+def load_donor(path):
+    """Donor JSON + only its animation accessors, read through mmap.
+
+    Returns (gltf, bin) where gltf keeps nodes and animations and its
+    accessors/bufferViews are rewritten to point into the small bin.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        magic, version, _ = struct.unpack_from("<III", mm, 0)
+        if magic != MAGIC or version != 2:
+            raise SystemExit(f"{path}: not a GLB v2")
+        jlen, jtype = struct.unpack_from("<II", mm, 12)
+        if jtype != CHUNK_JSON:
+            raise SystemExit(f"{path}: first chunk is not JSON")
+        gltf = json.loads(mm[20: 20 + jlen].decode("utf-8"))
+        bin_off = 20 + jlen + 8
+        accessors, views, binc, remap = [], [], bytearray(), {}
+        for anim in gltf.get("animations", []):
+            for smp in anim.get("samplers", []):
+                for key in ("input", "output"):
+                    old = smp[key]
+                    if old not in remap:
+                        acc = dict(gltf["accessors"][old])
+                        bv = gltf["bufferViews"][acc["bufferView"]]
+                        n = COMP_SIZE[acc["componentType"]] * TYPE_COUNT[acc["type"]]
+                        start = bin_off + bv.get("byteOffset", 0) + acc.get("byteOffset", 0)
+                        while len(binc) % 4:
+                            binc.append(0)
+                        views.append({"buffer": 0, "byteOffset": len(binc),
+                                      "byteLength": acc["count"] * n})
+                        binc.extend(mm[start: start + acc["count"] * n])
+                        acc["bufferView"], acc["byteOffset"] = len(views) - 1, 0
+                        remap[old] = len(accessors)
+                        accessors.append(acc)
+                    smp[key] = remap[old]
+    donor = {"nodes": gltf.get("nodes", []), "animations": gltf.get("animations", []),
+             "accessors": accessors, "bufferViews": views}
+    return donor, binc
 
 
 def accessor_bytes(gltf, binc, idx):
@@ -69,6 +129,9 @@ def accessor_bytes(gltf, binc, idx):
     bv = gltf["bufferViews"][acc["bufferView"]]
     n = COMP_SIZE[acc["componentType"]] * TYPE_COUNT[acc["type"]]
     start = bv.get("byteOffset", 0) + acc.get("byteOffset", 0)
+    if start + acc["count"] * n > len(binc):
+        raise SystemExit(f"accessor {idx} reads past the BIN chunk "
+                         "(truncated file? run glb_validate.py)")
     return acc, bytes(binc[start: start + acc["count"] * n])
 
 
@@ -88,6 +151,145 @@ def append_accessor(base, base_bin, acc, raw):
     return acc_idx
 
 
+def accessor_refs(gltf):
+    """Yield (container, key) for every accessor index stored in the JSON."""
+    for mesh in gltf.get("meshes", []):
+        for prim in mesh.get("primitives", []):
+            if "indices" in prim:
+                yield prim, "indices"
+            attrs = prim.get("attributes", {})
+            for k in attrs:
+                yield attrs, k
+            for tgt in prim.get("targets", []):
+                for k in tgt:
+                    yield tgt, k
+    for skin in gltf.get("skins", []):
+        if "inverseBindMatrices" in skin:
+            yield skin, "inverseBindMatrices"
+    for anim in gltf.get("animations", []):
+        for smp in anim.get("samplers", []):
+            yield smp, "input"
+            yield smp, "output"
+    for node in gltf.get("nodes", []):
+        inst = node.get("extensions", {}).get("EXT_mesh_gpu_instancing", {})
+        attrs = inst.get("attributes", {})
+        for k in attrs:
+            yield attrs, k
+
+
+def compact_bin(gltf, binc):
+    """Drop accessors/bufferViews nothing references and repack the BIN chunk.
+
+    Accessor and bufferView indices are renumbered everywhere they appear;
+    views on external (uri) buffers are kept but not moved, and the
+    compressed streams of EXT_meshopt_compression views move with them.
+    Returns the new BIN bytearray.
+    """
+    accessors = gltf.get("accessors", [])
+    used = sorted({c[k] for c, k in accessor_refs(gltf)})
+    acc_map = {old: new for new, old in enumerate(used)}
+    for c, k in list(accessor_refs(gltf)):
+        c[k] = acc_map[c[k]]
+    gltf["accessors"] = [accessors[i] for i in used]
+
+    view_refs = []
+    for acc in gltf["accessors"]:
+        if "bufferView" in acc:
+            view_refs.append((acc, "bufferView"))
+        sparse = acc.get("sparse")
+        if sparse:
+            view_refs.append((sparse["indices"], "bufferView"))
+            view_refs.append((sparse["values"], "bufferView"))
+    for img in gltf.get("images", []):
+        if "bufferView" in img:
+            view_refs.append((img, "bufferView"))
+    for mesh in gltf.get("meshes", []):
+        for prim in mesh.get("primitives", []):
+            bvh = prim.get("extras", {}).get("bvh")  # glb_bvh.py
+            if bvh and "bufferView" in bvh:
+                view_refs.append((bvh, "bufferView"))
+    views = gltf.get("bufferViews", [])
+    used_views = sorted({c[k] for c, k in view_refs})
+    view_map = {old: new for new, old in enumerate(used_views)}
+    new_bin = bytearray()
+    new_views = []
+    for old in used_views:
+        bv = dict(views[old])
+        if bv.get("buffer", 0) == 0:
+            while len(new_bin) % 4:
+                new_bin.append(0)
+            start = bv.get("byteOffset", 0)
+            chunk = binc[start: start + bv["byteLength"]]
+            bv["byteOffset"] = len(new_bin)
+            new_bin.extend(chunk)
+        ext = bv.get("extensions", {}).get(MESHOPT)
+        if ext and ext.get("buffer", 0) == 0:
+            # glb_meshopt.py: the view sits in the fallback buffer, its
+            # compressed stream is a BIN range of its own
+            while len(new_bin) % 4:
+                new_bin.append(0)
+            start = ext.get("byteOffset", 0)
+            chunk = binc[start: start + ext["byteLength"]]
+            ext = dict(ext, byteOffset=len(new_bin))
+            bv["extensions"] = dict(bv["extensions"], **{MESHOPT: ext})
+            new_bin.extend(chunk)
+        new_views.append(bv)
+    for c, k in view_refs:
+        c[k] = view_map[c[k]]
+    gltf["bufferViews"] = new_views
+    return new_bin
+
+
+def drop_channels(anim, dead):
+    """Remove channels for which dead(channel) is true, then unused samplers."""
+    anim["channels"] = [ch for ch in anim.get("channels", []) if not dead(ch)]
+    used = sorted({ch["sampler"] for ch in anim["channels"]})
+    smp_map = {old: new for new, old in enumerate(used)}
+    anim["samplers"] = [anim["samplers"][i] for i in used]
+    for ch in anim["channels"]:
+        ch["sampler"] = smp_map[ch["sampler"]]
+
+
+def remove_nodes(gltf, drop):
+    """Delete nodes and renumber node indices everywhere they appear.
+
+    The caller re-parents children / rewrites skin joint lists first; this
+    only unlinks the dropped nodes (children, scene roots, skin joints and
+    skeleton, MSFT_lod ids) and drops animation channels targeting them.
+    Returns the old -> new index map of the kept nodes.
+    """
+    drop = set(drop)
+    nodes = gltf.get("nodes", [])
+    node_map = {}
+    for old in range(len(nodes)):
+        if old not in drop:
+            node_map[old] = len(node_map)
+    gltf["nodes"] = [nodes[i] for i in sorted(node_map)]
+    for node in gltf["nodes"]:
+        if "children" in node:
+            node["children"] = [node_map[c] for c in node["children"] if c in node_map]
+            if not node["children"]:
+                del node["children"]
+        lod = node.get("extensions", {}).get("MSFT_lod")
+        if lod:
+            lod["ids"] = [node_map[i] for i in lod["ids"] if i in node_map]
+    for scene in gltf.get("scenes", []):
+        scene["nodes"] = [node_map[n] for n in scene.get("nodes", []) if n in node_map]
+    for skin in gltf.get("skins", []):
+        skin["joints"] = [node_map[j] for j in skin["joints"] if j in node_map]
+        if "skeleton" in skin:
+            if skin["skeleton"] in node_map:
+                skin["skeleton"] = node_map[skin["skeleton"]]
+            else:
+                del skin["skeleton"]
+    for anim in gltf.get("animations", []):
+        drop_channels(anim, lambda ch: ch["target"].get("node") in drop)
+        for ch in anim["channels"]:
+            if "node" in ch["target"]:
+                ch["target"]["node"] = node_map[ch["target"]["node"]]
+    return node_map
+
+
 def node_names(gltf):
     return {n.get("name", f"node_{i}"): i for i, n in enumerate(gltf.get("nodes", []))}
 
@@ -179,26 +381,43 @@ def fix_root_scale(base, base_bin):
                     print(f"    translation of same root divided by {mean:.4f}")
 
 
+def merge(base, base_bin, specs, jobs=None):
+    """Merge [(donor path, clip name)] into base in place, plus the Meshy fixes."""
+    jobs = jobs or min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max(1, jobs)) as pool:
+        # map() yields in submission order: clip order = command-line order
+        donors = pool.map(load_donor, [path for path, _ in specs])
+        for (path, name), (donor, donor_bin) in zip(specs, donors):
+            print(f"donor: {path} -> '{name}'")
+            merge_clip(base, base_bin, donor, donor_bin, name)
+    fix_root_scale(base, base_bin)
+    for m in base.get("materials", []):
+        m["alphaMode"] = "OPAQUE"
+        m.pop("alphaCutoff", None)
+        m["doubleSided"] = True
+
+
 def main():
-    if len(sys.argv) < 4:
+    args = sys.argv[1:]
+    jobs = min(8, os.cpu_count() or 1)
+    if "--jobs" in args:
+        i = args.index("--jobs")
+        jobs = int(args[i + 1])
+        del args[i: i + 2]
+    if len(args) < 3:
         raise SystemExit(__doc__)
-    base_path, out_path = sys.argv[1], sys.argv[-1]
-    base, base_bin = read_glb(base_path)
-    print(f"base: {base_path} ({len(base.get('animations', []))} clips, "
-          f"{len(base.get('skins', []))} skins)")
-    for spec in sys.argv[2:-1]:
+    base_path, out_path = args[0], args[-1]
+    specs = []
+    for spec in args[1:-1]:
         if ":" in spec:
             path, name = spec.rsplit(":", 1)
         else:
             path, name = spec, spec.rsplit("/", 1)[-1].rsplit(".", 1)[0]
-        donor, donor_bin = read_glb(path)
-        print(f"donor: {path} -> '{name}'")
-        merge_clip(base, base_bin, donor, donor_bin, name)
-    fix_root_scale(base, base_bin)
-    for m in base.get("materials", []):
-        m["alphaMode"] = "OPAQUE"
-        m.pop("alphaCutoff", None)
-        m["doubleSided"] = True
+        specs.append((path, name))
+    base, base_bin = read_glb(base_path)
+    print(f"base: {base_path} ({len(base.get('animations', []))} clips, "
+          f"{len(base.get('skins', []))} skins)")
+    merge(base, base_bin, specs, jobs)
     write_glb(out_path, base, base_bin)
     print(f"done: {out_path} ({len(base.get('animations', []))} clips)")
 
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""glb_merge_scene.py — merge many static GLBs into one, batched by material
+(numpy + stdlib, no Blender).
+
+Level loading fetches and parses dozens of small static GLBs one by one.
+This tool reads them all and writes ONE GLB:
+  * images are deduplicated by content hash, samplers/textures/materials by
+    their resolved content (names ignored);
+  * every node transform is baked into the vertices (normals/tangents by
+    the inverse transpose; winding flipped for mirrored nodes);
+  * primitives sharing a material and attribute layout are concatenated into
+    one primitive — uint32 indices by default, or --index 16 to split
+    batches at object boundaries so each stays under 65 535 vertices;
+  * each merged primitive keeps a name -> range manifest in its extras
+    (three.js: geometry.userData.objects), so a raycast's faceIndex can
+    still be mapped back to the source object:
+        {"name", "source", "firstIndex", "indexCount", "firstVertex",
+         "vertexCount"}
+Skinned or morphing nodes are rejected (static scenery only); attributes
+are written as float32 — run glb_quantize.py afterwards. The sources'
+extensionsUsed / extensionsRequired carry over for every extension still
+present (material and texture extensions are copied as they are).
+
+Usage:
+    python3 glb_merge_scene.py out.glb a.glb b.glb c.glb@4,0,-2 ...
+(file@x,y,z places that file's scene at an offset)
+"""
+import argparse
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+from glb_arrays import (ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER, add_accessor,
+                        append_view, read_accessor, triangles)
+from glb_instance import world_matrices
+from glb_merge_anims import read_glb, write_glb
+
+STATIC_ATTRS = ("POSITION", "NORMAL", "TANGENT", "TEXCOORD_0", "TEXCOORD_1",
+                "COLOR_0")
+
+
+class SceneBuilder:
+    """Accumulates deduplicated images/textures/materials and batches."""
+
+    def __init__(self):
+        self.gltf = {"asset": {"version": "2.0", "generator": "glb_merge_scene.py"},
+                     "buffers": [{"byteLength": 0}]}
+        self.binc = bytearray()
+        self.keys = {}     # (kind, content key) -> new index
+        self.batches = {}  # (material, ((attribute, columns), ...)) -> list of parts
+        self.ext_required = set()
+
+    def _intern(self, kind, key, item):
+        k = (kind, key)
+        if k not in self.keys:
+            self.gltf.setdefault(kind, []).append(item)
+            self.keys[k] = len(self.gltf[kind]) - 1
+        return self.keys[k]
+
+    def image(self, src, sbin, i):
+        im = dict(src["images"][i])
+        if "bufferView" in im:
+            bv = src["bufferViews"][im["bufferView"]]
+            start = bv.get("byteOffset", 0)
+            raw = bytes(sbin[start: start + bv["byteLength"]])
+            key = hashlib.sha1(raw).hexdigest()
+            if ("images", key) not in self.keys:
+                im["bufferView"] = append_view(self.gltf, self.binc, raw)
+        else:
+            key = im.get("uri")
+        im.pop("name", None)
+        return self._intern("images", key, im)
+
+    def texture(self, src, sbin, ti):
+        tex = json.loads(json.dumps(src["textures"][ti]))
+        if "source" in tex:
+            tex["source"] = self.image(src, sbin, tex["source"])
+        for ext in tex.get("extensions", {}).values():
+            if isinstance(ext, dict) and "source" in ext:
+                ext["source"] = self.image(src, sbin, ext["source"])
+        if "sampler" in tex:
+            smp = src["samplers"][tex["sampler"]]
+            tex["sampler"] = self._intern("samplers", json.dumps(smp, sort_keys=True), smp)
+        tex.pop("name", None)
+        return self._intern("textures", json.dumps(tex, sort_keys=True), tex)
+
+    def material(self, src, sbin, mi):
+        if mi is None:
+            return None
+        mat = json.loads(json.dumps(src["materials"][mi]))
+        name = mat.pop("name", None)
+
+        def walk(obj, key=""):
+            if isinstance(obj, dict):
+                if key.endswith("Texture") and "index" in obj:
+                    obj["index"] = self.texture(src, sbin, obj["index"])
+                for k, v in obj.items():
+                    walk(v, k)
+            elif isinstance(obj, list):
+                for v in obj:
+                    walk(v, key)
+
+        walk(mat)
+        key = json.dumps(mat, sort_keys=True)
+        if name and ("materials", key) not in self.keys:
+            mat["name"] = name
+        return self._intern("materials", key, mat)
+
+    def add_file(self, path, offset):
+        src, sbin = read_glb(path)
+        self.ext_required.update(src.get("extensionsRequired", []))
+        world, _ = world_matrices(src)
+        place = np.eye(4)
+        place[:3, 3] = offset
+        if src.get("scenes"):
+            roots = src["scenes"][src.get("scene", 0)].get("nodes", [])
+        else:
+            roots = range(len(src.get("nodes", [])))
+        stack, seen = list(roots), set()
+        count = 0
+        while stack:
+            ni = stack.pop()
+            if ni in seen:
+                continue
+            seen.add(ni)
+            node = src["nodes"][ni]
+            stack.extend(node.get("children", []))
+            if "mesh" not in node:
+                continue
+            mesh = src["meshes"][node["mesh"]]
+            if "skin" in node or any(p.get("targets") for p in mesh["primitives"]):
+                raise SystemExit(f"{path}: node '{node.get('name', ni)}' is skinned "
+                                 f"or morphing — static scenery only")
+            m = place @ world[ni]
+            for pi, prim in enumerate(mesh["primitives"]):
+                tris = triangles(src, sbin, prim)
+                if tris is None or "POSITION" not in prim["attributes"]:
+                    print(f"  {path}: skipped non-triangle primitive {pi}")
+                    continue
+                self._add_part(src, sbin, prim, tris, m,
+                               node.get("name", mesh.get("name", f"node_{ni}")),
+                               Path(path).name)
+                count += 1
+        return count
+
+    def _add_part(self, src, sbin, prim, tris, m, name, source):
+        attrs = {}
+        for k in STATIC_ATTRS:
+            if k in prim["attributes"]:
+                a = read_accessor(src, sbin, prim["attributes"][k], normalize=True)
+                attrs[k] = a.astype(np.float32)
+        p = attrs["POSITION"].astype(np.float64)
+        attrs["POSITION"] = (p @ m[:3, :3].T + m[:3, 3]).astype(np.float32)
+        normal_m = np.linalg.inv(m[:3, :3]).T
+        if "NORMAL" in attrs:
+            n = attrs["NORMAL"] @ normal_m.T
+            n /= np.maximum(np.linalg.norm(n, axis=1, keepdims=True), 1e-12)
+            attrs["NORMAL"] = n.astype(np.float32)
+        if "TANGENT" in attrs:
+            t = attrs["TANGENT"].copy()
+            t[:, :3] = t[:, :3] @ m[:3, :3].T
+            t[:, :3] /= np.maximum(np.linalg.norm(t[:, :3], axis=1, keepdims=True), 1e-12)
+            attrs["TANGENT"] = t.astype(np.float32)
+        if np.linalg.det(m[:3, :3]) < 0:
+            tris = tris[:, ::-1]
+            if "TANGENT" in attrs:
+                # mirrored: the bitangent sign flips with the handedness
+                attrs["TANGENT"][:, 3] *= -1
+        mat = self.material(src, sbin, prim.get("material"))
+        # column counts too: COLOR_0 VEC3 and VEC4 cannot share an accessor
+        key = (mat, tuple((k, attrs[k].shape[1]) for k in sorted(attrs)))
+        self.batches.setdefault(key, []).append((name, source, attrs, tris))
+
+    def build(self, index_bits):
+        prims = []
+        for (mat, layout), parts in self.batches.items():
+            names = [k for k, _ in layout]
+            for chunk in split_parts(parts, index_bits):
+                prims.append(self._primitive(mat, names, chunk))
+        self.gltf["meshes"] = [{"name": "merged", "primitives": prims}]
+        self.gltf["nodes"] = [{"name": "merged", "mesh": 0}]
+        self.gltf["scenes"] = [{"nodes": [0]}]
+        self.gltf["scene"] = 0
+        # every extension still present is used; the sources' required ones
+        # stay required. Geometry extensions (KHR_mesh_quantization, ...) drop
+        # out: attributes are rewritten as plain float32.
+        present = extension_names(self.gltf)
+        used = sorted(present)
+        required = sorted(self.ext_required & present)
+        if used:
+            self.gltf["extensionsUsed"] = used
+        if required:
+            self.gltf["extensionsRequired"] = required
+        return self.gltf, self.binc
+
+    def _primitive(self, mat, names, parts):
+        arrays = {k: [] for k in names}
+        index_parts, ranges = [], []
+        vbase = ibase = 0
+        for name, source, attrs, tris in parts:
+            nv = len(attrs["POSITION"])
+            for k in names:
+                arrays[k].append(attrs[k])
+            index_parts.append(tris.reshape(-1) + vbase)
+            ranges.append({"name": name, "source": source, "firstIndex": ibase,
+                           "indexCount": int(tris.size), "firstVertex": vbase,
+                           "vertexCount": nv})
+            vbase += nv
+            ibase += tris.size
+        prim = {"attributes": {}}
+        for k in names:
+            prim["attributes"][k] = add_accessor(
+                self.gltf, self.binc, np.concatenate(arrays[k]),
+                target=ARRAY_BUFFER, minmax=(k == "POSITION"))
+        flat = np.concatenate(index_parts)
+        flat = flat.astype(np.uint16 if vbase <= 0xFFFF else np.uint32)
+        prim["indices"] = add_accessor(self.gltf, self.binc, flat,
+                                       target=ELEMENT_ARRAY_BUFFER)
+        if mat is not None:
+            prim["material"] = mat
+        prim["extras"] = {"objects": ranges}
+        return prim
+
+
+def extension_names(obj):
+    """Names of every extension object anywhere in a glTF JSON tree."""
+    found = set()
+    if isinstance(obj, dict):
+        if isinstance(obj.get("extensions"), dict):
+            found.update(obj["extensions"])
+        for v in obj.values():
+            found |= extension_names(v)
+    elif isinstance(obj, list):
+        for v in obj:
+            found |= extension_names(v)
+    return found
+
+
+def split_parts(parts, index_bits):
+    """Yield lists of parts; with 16-bit indices, each under 65 535 vertices."""
+    if index_bits == 32:
+        yield parts
+        return
+    chunk, verts = [], 0
+    for part in parts:
+        nv = len(part[2]["POSITION"])
+        if chunk and verts + nv > 0xFFFF:
+            yield chunk
+            chunk, verts = [], 0
+        chunk.append(part)
+        verts += nv
+    if chunk:
+        yield chunk
+
+
+def parse_spec(spec):
+    if "@" in spec:
+        path, off = spec.rsplit("@", 1)
+        xyz = [float(v) for v in off.split(",")]
+        if len(xyz) != 3:
+            raise SystemExit(f"bad offset in '{spec}' (want file.glb@x,y,z)")
+        return path, xyz
+    return spec, [0.0, 0.0, 0.0]
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("output")
+    p.add_argument("inputs", nargs="+", help="file.glb or file.glb@x,y,z")
+    p.add_argument("--index", type=int, choices=(16, 32), default=32,
+                   help="32 = one primitive per batch; 16 = split batches")
+    a = p.parse_args()
+    builder = SceneBuilder()
+    nprims = 0
+    for spec in a.inputs:
+        path, off = parse_spec(spec)
+        n = builder.add_file(path, off)
+        nprims += n
+        print(f"  {path}: {n} primitives")
+    gltf, binc = builder.build(a.index)
+    write_glb(a.output, gltf, binc)
+    print(f"merged {len(a.inputs)} files: {nprims} draw calls -> "
+          f"{len(gltf['meshes'][0]['primitives'])}; materials "
+          f"{len(gltf.get('materials', []))}, textures {len(gltf.get('textures', []))}, "
+          f"images {len(gltf.get('images', []))}")
+    print(f"done: {a.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,649 @@
+#!/usr/bin/env python3
+"""glb_meshopt.py — EXT_meshopt_compression encoder for GLB buffers
+(numpy + stdlib, no Blender).
+
+Re-encodes bufferViews with the meshoptimizer codecs that three.js decodes
+in a worker (GLTFLoader.setMeshoptDecoder(MeshoptDecoder)):
+  TRIANGLES    index views (uint16/uint32 triangle lists): index codec v1
+               (edge + vertex FIFOs, varint free indices)
+  ATTRIBUTES   vertex, skin and animation views: vertex codec v0
+               (byte-transposed zigzag deltas, 0/2/4/8-bit groups)
+plus the lossy filters on views owned by a single accessor:
+  OCTAHEDRAL   NORMAL / TANGENT already quantized to int8 / int16
+               (glb_quantize.py) — 2 components + 1 spare
+  QUATERNION   rotation sampler outputs -> int16, --quat-bits (default 12)
+  EXPONENTIAL  translation / scale sampler outputs, --exp-bits mantissa
+               (default 16)
+--lossless disables the filters. Images stay as they are (already
+compressed); a view is left raw when encoding does not shrink it.
+
+Compressed views move into a fallback buffer ({fallback: true}); the
+extension is then required. --fallback FILE.bin also writes the decoded
+data next to the GLB so decoders without meshopt still load it
+(extension only "used"). Every encoded view is decoded again before
+writing — streams must round-trip byte-exactly, filtered data is reported
+with its max error — so a codec bug can never ship. Run it last: passes
+that read vertex or animation data refuse compressed views (the ones that
+only repack the BIN keep the streams). Expect 3-5x smaller downloads after
+gzip / brotli.
+
+Usage:
+    python3 glb_meshopt.py in.glb out.glb [--quat-bits 12] [--exp-bits 16]
+        [--lossless] [--fallback out.fallback.bin]
+"""
+import argparse
+import os
+import time
+import zlib
+
+import numpy as np
+
+from glb_arrays import DTYPE, read_accessor
+from glb_merge_anims import COMP_SIZE, TYPE_COUNT, compact_bin, read_glb, write_glb
+
+EXT = "EXT_meshopt_compression"
+VERTEX_HEADER = 0xA0  # vertex codec, version 0
+INDEX_HEADER = 0xE1   # index codec, version 1
+GROUP = 16
+TAIL_MIN = 32
+# index codec: (feb << 4 | fec) pairs reachable with a 4-bit code; stored in the stream
+CODEAUX_TABLE = bytes([0x00, 0x76, 0x87, 0x56, 0x67, 0x78, 0xA9, 0x86,
+                       0x65, 0x89, 0x68, 0x98, 0x01, 0x69, 0x00, 0x00])
+TRI_ORDER = ((0, 1, 2), (1, 2, 0), (2, 0, 1))
+ESC2 = [sum((b >> s) & 3 == 3 for s in (0, 2, 4, 6)) for b in range(256)]
+ESC4 = [(b >> 4 == 15) + (b & 15 == 15) for b in range(256)]
+
+
+# ---------------------------------------------------------------- vertex codec
+
+def vertex_block_size(stride):
+    return min((8192 // stride) & ~(GROUP - 1), 256)
+
+
+def zigzag8(d):
+    s = d.view(np.int8).astype(np.int16)
+    return (((s << 1) ^ (s >> 7)) & 0xFF).astype(np.uint8)
+
+
+def unzigzag8(v):
+    v = v.astype(np.int16)
+    return ((-(v & 1) ^ (v >> 1)) & 0xFF).astype(np.uint8)
+
+
+def encode_bytes(rows):
+    """(R, n) uint8 rows, n % 16 == 0 -> concatenated per-row byte streams.
+
+    Each row: 2-bit group modes (0 = all zero, 1 = 2-bit, 2 = 4-bit, 3 =
+    raw), then per group the packed values followed by the escaped bytes.
+    """
+    R, n = rows.shape
+    ng = n // GROUP
+    g = rows.reshape(R, ng, GROUP)
+    cost = np.stack([np.where((g == 0).all(-1), 0, 99), 4 + (g >= 3).sum(-1),
+                     8 + (g >= 15).sum(-1), np.full((R, ng), 16)], -1)
+    mode = cost.argmin(-1)
+    hs = (ng + 3) // 4
+    m = np.zeros((R, hs * 4), np.int64)
+    m[:, :ng] = mode
+    m = m.reshape(R, hs, 4)
+    header = (m[..., 0] | m[..., 1] << 2 | m[..., 2] << 4 | m[..., 3] << 6).astype(np.uint8)
+    c2 = np.minimum(g, 3).reshape(R, ng, 4, 4)
+    c4 = np.minimum(g, 15).reshape(R, ng, 8, 2)
+    packed = {1: (c2[..., 0] << 6 | c2[..., 1] << 4 | c2[..., 2] << 2 | c2[..., 3], 3),
+              2: (c4[..., 0] << 4 | c4[..., 1], 15)}
+    body = np.zeros((R, ng, 24), np.uint8)
+    keep = np.zeros((R, ng, 24), bool)
+    for code, (head, sentinel) in packed.items():
+        sel = mode == code
+        nb = head.shape[-1]
+        body[sel, :nb] = head[sel]
+        keep[sel, :nb] = True
+        body[sel, nb:nb + GROUP] = g[sel]
+        keep[sel, nb:nb + GROUP] = g[sel] >= sentinel
+    sel = mode == 3
+    body[sel, :GROUP] = g[sel]
+    keep[sel, :GROUP] = True
+    out = np.concatenate([header, body.reshape(R, -1)], 1)
+    mask = np.concatenate([np.ones(header.shape, bool), keep.reshape(R, -1)], 1)
+    return out[mask]
+
+
+def encode_vertex_buffer(raw, count, stride):
+    v = np.frombuffer(raw, np.uint8, count * stride).reshape(count, stride)
+    first = v[0] if count else np.zeros(stride, np.uint8)
+    z = zigzag8(v - np.vstack([first[None], v[:-1]]))
+    bs = vertex_block_size(stride)
+    full = count // bs
+    parts = [bytes([VERTEX_HEADER])]
+    if full:
+        rows = z[:full * bs].reshape(full, bs, stride).transpose(0, 2, 1)
+        parts.append(encode_bytes(rows.reshape(full * stride, bs)).tobytes())
+    rest = count - full * bs
+    if rest:
+        rows = np.zeros((stride, (rest + GROUP - 1) & ~(GROUP - 1)), np.uint8)
+        rows[:, :rest] = z[full * bs:].T
+        parts.append(encode_bytes(rows).tobytes())
+    parts.append(bytes(max(TAIL_MIN - stride, 0)) + first.tobytes())
+    return b"".join(parts)
+
+
+def decode_vertex_buffer(data, count, stride):
+    if data[0] != VERTEX_HEADER:
+        raise ValueError("not a vertex codec v0 stream")
+    bs = vertex_block_size(stride)
+    where, modes, pos = [], [], 1
+    for start in range(0, count, bs):
+        ng = (min(bs, count - start) + GROUP - 1) // GROUP
+        for _ in range(stride):
+            header = data[pos: pos + (ng + 3) // 4]
+            pos += len(header)
+            for j in range(ng):
+                m = header[j >> 2] >> ((j & 3) * 2) & 3
+                where.append(pos)
+                modes.append(m)
+                if m == 1:
+                    pos += 4 + sum(ESC2[b] for b in data[pos: pos + 4])
+                elif m == 2:
+                    pos += 8 + sum(ESC4[b] for b in data[pos: pos + 8])
+                elif m == 3:
+                    pos += 16
+    if len(data) - pos != max(TAIL_MIN, stride):
+        raise ValueError("vertex stream length mismatch")
+    buf = np.frombuffer(bytes(data) + bytes(48), np.uint8)
+    where, modes = np.array(where, np.int64), np.array(modes)
+    vals = np.zeros((len(where), GROUP), np.uint8)
+    sel = modes == 3
+    vals[sel] = buf[where[sel, None] + np.arange(GROUP)]
+    for code, nb, shifts, mask in ((1, 4, [6, 4, 2, 0], 3), (2, 8, [4, 0], 15)):
+        sel = modes == code
+        head = buf[where[sel, None] + np.arange(nb)]
+        v = ((head[..., None] >> np.array(shifts, np.uint8)) & mask).reshape(-1, GROUP)
+        esc = v == mask
+        at = where[sel, None] + nb + np.cumsum(esc, 1) - 1
+        vals[sel] = np.where(esc, buf[np.where(esc, at, 0)], v)
+    deltas = np.empty((count, stride), np.uint8)
+    gi = 0
+    for start in range(0, count, bs):
+        n = min(bs, count - start)
+        ng = (n + GROUP - 1) // GROUP
+        deltas[start: start + n] = vals[gi: gi + stride * ng].reshape(stride, ng * GROUP)[:, :n].T
+        gi += stride * ng
+    first = np.frombuffer(data, np.uint8, stride, len(data) - stride)
+    return (np.cumsum(unzigzag8(deltas), 0, dtype=np.uint8) + first).tobytes()
+
+
+# ----------------------------------------------------------------- index codec
+
+def _vbyte(out, v):
+    while v >= 0x80:
+        out.append((v & 0x7F) | 0x80)
+        v >>= 7
+    out.append(v)
+
+
+def _free_index(out, index, last):
+    d = (index - last) & 0xFFFFFFFF
+    _vbyte(out, ((d << 1) ^ (0xFFFFFFFF if d >> 31 else 0)) & 0xFFFFFFFF)
+
+
+def encode_index_buffer(tris):
+    """(T, 3) triangle list -> index codec v1 stream."""
+    edges = [(-1, -1)] * 16
+    verts = [-1] * 16
+    eo = vo = nxt = last = 0
+    aux_code = {v: i for i, v in enumerate(CODEAUX_TABLE[:14])}
+    code, data = bytearray([INDEX_HEADER]), bytearray()
+
+    def vfind(v):
+        for i in range(16):
+            if verts[(vo - 1 - i) & 15] == v:
+                return i
+        return -1
+
+    for tri in tris.tolist():
+        i0, i1, i2 = tri
+        fer = -1
+        for i in range(15):
+            e0, e1 = edges[(eo - 1 - i) & 15]
+            if e0 == i0 and e1 == i1:
+                fer = i << 2
+            elif e0 == i1 and e1 == i2:
+                fer = i << 2 | 1
+            elif e0 == i2 and e1 == i0:
+                fer = i << 2 | 2
+            if fer >= 0:
+                break
+        if fer >= 0:
+            a, b, c = (tri[o] for o in TRI_ORDER[fer & 3])
+            fc = vfind(c)
+            if 1 <= fc < 13:
+                fec = fc
+            elif c == nxt:
+                fec, nxt = 0, nxt + 1
+            else:
+                fec = 15
+                if c + 1 == last:
+                    fec, last = 13, c
+                elif c == last + 1:
+                    fec, last = 14, c
+            code.append((fer >> 2) << 4 | fec)
+            if fec == 15:
+                _free_index(data, c, last)
+                last = c
+            if fec == 0 or fec >= 13:
+                verts[vo], vo = c, (vo + 1) & 15
+            edges[eo], eo = (c, b), (eo + 1) & 15
+            edges[eo], eo = (a, c), (eo + 1) & 15
+            continue
+        rot = 1 if i1 == nxt else 2 if i2 == nxt else 0
+        a, b, c = (tri[o] for o in TRI_ORDER[rot])
+        fb, fc = vfind(b), vfind(c)
+        fea = 0 if a == nxt else 15
+        nxt += fea == 0
+        if 0 <= fb < 14:
+            feb = fb + 1
+        elif b == nxt:
+            feb, nxt = 0, nxt + 1
+        else:
+            feb = 15
+        if 0 <= fc < 14:
+            fec = fc + 1
+        elif c == nxt:
+            fec, nxt = 0, nxt + 1
+        else:
+            fec = 15
+        aux = feb << 4 | fec
+        if fea == 0 and aux in aux_code:
+            code.append(0xF0 | aux_code[aux])
+        else:
+            code.append(0xF0 | 14 | (fea & 1))
+            data.append(aux)
+        for v, fe in ((a, fea), (b, feb), (c, fec)):
+            if fe == 15:
+                _free_index(data, v, last)
+                last = v
+        for v, fe in ((a, fea), (b, feb), (c, fec)):
+            if fe in (0, 15):
+                verts[vo], vo = v, (vo + 1) & 15
+        for e in ((b, a), (c, b), (a, c)):
+            edges[eo], eo = e, (eo + 1) & 15
+    return bytes(code + data + CODEAUX_TABLE)
+
+
+def _read_free(data, pos, last):
+    v = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        v |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            break
+    d = (v >> 1) ^ (0xFFFFFFFF if v & 1 else 0)
+    return (last + d) & 0xFFFFFFFF, pos
+
+
+def decode_index_buffer(data, index_count):
+    if data[0] != INDEX_HEADER:
+        raise ValueError("not an index codec v1 stream")
+    edges = [(0xFFFFFFFF, 0xFFFFFFFF)] * 16
+    verts = [0xFFFFFFFF] * 16
+    eo = vo = nxt = last = 0
+    code = 1
+    pos = 1 + index_count // 3
+    table = data[len(data) - 16:]
+    out = []
+    for _ in range(index_count // 3):
+        tri = data[code]
+        code += 1
+        if tri < 0xF0:
+            a, b = edges[(eo - 1 - (tri >> 4)) & 15]
+            fec = tri & 15
+            if fec < 13:
+                c = nxt if fec == 0 else verts[(vo - 1 - fec) & 15]
+                if fec == 0:
+                    nxt += 1
+                    verts[vo], vo = c, (vo + 1) & 15
+            else:
+                if fec == 15:
+                    c, pos = _read_free(data, pos, last)
+                else:
+                    c = (last + (fec - (fec ^ 3))) & 0xFFFFFFFF
+                last = c
+                verts[vo], vo = c, (vo + 1) & 15
+            edges[eo], eo = (c, b), (eo + 1) & 15
+            edges[eo], eo = (a, c), (eo + 1) & 15
+            out.append((a, b, c))
+            continue
+        if tri < 0xFE:
+            aux = table[tri & 15]
+            fea = 0
+        else:
+            aux = data[pos]
+            pos += 1
+            fea = 0 if tri == 0xFE else 15
+            if aux == 0:
+                nxt = 0
+        feb, fec = aux >> 4, aux & 15
+        a = b = c = 0
+        if fea == 0:
+            a, nxt = nxt, nxt + 1
+        if feb == 0:
+            b, nxt = nxt, nxt + 1
+        elif feb < 15:
+            b = verts[(vo - feb) & 15]
+        if fec == 0:
+            c, nxt = nxt, nxt + 1
+        elif fec < 15:
+            c = verts[(vo - fec) & 15]
+        if fea == 15:
+            a, pos = _read_free(data, pos, last)
+            last = a
+        if feb == 15:
+            b, pos = _read_free(data, pos, last)
+            last = b
+        if fec == 15:
+            c, pos = _read_free(data, pos, last)
+            last = c
+        verts[vo], vo = a, (vo + 1) & 15
+        if feb in (0, 15):
+            verts[vo], vo = b, (vo + 1) & 15
+        if fec in (0, 15):
+            verts[vo], vo = c, (vo + 1) & 15
+        for e in ((b, a), (c, b), (a, c)):
+            edges[eo], eo = e, (eo + 1) & 15
+        out.append((a, b, c))
+    if pos != len(data) - 16:
+        raise ValueError("index stream length mismatch")
+    return np.array(out, np.int64).reshape(-1, 3)
+
+
+# --------------------------------------------------------------------- filters
+
+def quantize_snorm(v, bits):
+    scale = (1 << (bits - 1)) - 1
+    v = np.clip(v, -1, 1)
+    return (v * scale + np.where(v >= 0, 0.5, -0.5)).astype(np.int32)
+
+
+def encode_oct(n, stride, bits):
+    """(N, 4) float xyz(w) -> OCTAHEDRAL filtered int8 (stride 4) / int16 (8)."""
+    n = n.astype(np.float32)
+    x, y, z, w = n.T
+    nl = np.abs(x) + np.abs(y) + np.abs(z)
+    ns = np.where(nl == 0, 0, 1 / np.where(nl == 0, 1, nl))
+    x, y = x * ns, y * ns
+    u = np.where(z >= 0, x, (1 - np.abs(y)) * np.where(x >= 0, 1, -1))
+    v = np.where(z >= 0, y, (1 - np.abs(x)) * np.where(y >= 0, 1, -1))
+    out = np.stack([quantize_snorm(u, bits), quantize_snorm(v, bits),
+                    np.full(len(n), quantize_snorm(np.float32(1), bits)),
+                    quantize_snorm(w, stride * 2)], 1)
+    return out.astype(np.int8 if stride == 4 else np.int16)
+
+
+def decode_oct(d):
+    full = np.float32((1 << (d.dtype.itemsize * 8 - 1)) - 1)
+    x, y = d[:, 0].astype(np.float32), d[:, 1].astype(np.float32)
+    z = d[:, 2].astype(np.float32) - np.abs(x) - np.abs(y)
+    t = np.minimum(z, 0)
+    x = x + np.where(x >= 0, t, -t)
+    y = y + np.where(y >= 0, t, -t)
+    s = full / np.sqrt(x * x + y * y + z * z)
+    out = d.copy()
+    for i, c in enumerate((x, y, z)):
+        out[:, i] = (c * s + np.where(c >= 0, 0.5, -0.5)).astype(np.int32)
+    return out
+
+
+def encode_quat(q, bits):
+    """(N, 4) xyzw -> QUATERNION filtered int16: 3 smallest + max index."""
+    q = q.astype(np.float32)
+    qc = np.abs(q).argmax(1)
+    sign = np.where(q[np.arange(len(q)), qc] < 0, -1, 1).astype(np.float32)
+    out = np.empty((len(q), 4), np.int16)
+    for k in range(3):
+        comp = q[np.arange(len(q)), (qc + 1 + k) & 3]
+        out[:, k] = quantize_snorm(comp * np.float32(np.sqrt(2)) * sign, bits)
+    out[:, 3] = (quantize_snorm(np.float32(1), bits) & ~3) | qc
+    return out
+
+
+def decode_quat(d):
+    sf = (d[:, 3].astype(np.int32) | 3).astype(np.float32)
+    ss = np.float32(1 / np.sqrt(2)) / sf
+    xyz = d[:, :3].astype(np.float32) * ss[:, None]
+    w = np.sqrt(np.maximum(1 - (xyz * xyz).sum(1), 0))
+    qc = d[:, 3].astype(np.int64) & 3
+    out = np.empty_like(d)
+    rows = np.arange(len(d))
+    for k in range(3):
+        c = xyz[:, k]
+        out[rows, (qc + 1 + k) & 3] = (c * 32767 + np.where(c >= 0, 0.5, -0.5)).astype(np.int32)
+    out[rows, qc] = (w * 32767 + 0.5).astype(np.int32)
+    return out
+
+
+def encode_exp(v, bits):
+    """float32 values -> EXPONENTIAL filtered uint32 (8-bit exp, 24-bit mantissa)."""
+    v = v.astype(np.float32)
+    _, e = np.frexp(v)
+    e = np.maximum(np.where(v == 0, 0, e), -100) - (bits - 1)
+    m = (v.astype(np.float64) * np.exp2(-e.astype(np.float64))
+         + np.where(v >= 0, 0.5, -0.5)).astype(np.int64)
+    return ((m & 0xFFFFFF) | ((e.astype(np.int64) & 0xFF) << 24)).astype(np.uint32)
+
+
+def decode_exp(d):
+    m = (d.astype(np.int64) << 40) >> 40
+    e = d.view(np.int32) >> 24
+    return (np.exp2(e.astype(np.float64)) * m).astype(np.float32)
+
+
+# ------------------------------------------------------------------ GLB pass
+
+def accessor_roles(gltf):
+    roles = {}
+    for mesh in gltf.get("meshes", []):
+        for prim in mesh.get("primitives", []):
+            if "indices" in prim:
+                roles.setdefault(prim["indices"], set()).add(
+                    "triangles" if prim.get("mode", 4) == 4 else "indices")
+            for k, a in prim.get("attributes", {}).items():
+                roles.setdefault(a, set()).add(k.split("_")[0] if "_" in k else k)
+    for anim in gltf.get("animations", []):
+        for ch in anim.get("channels", []):
+            smp = anim["samplers"][ch["sampler"]]
+            roles.setdefault(smp["input"], set()).add("input")
+            path = ch["target"]["path"]
+            if smp.get("interpolation") == "CUBICSPLINE":
+                path = "cubic"
+            roles.setdefault(smp["output"], set()).add(path)
+    return roles
+
+
+def plan_view(gltf, vi, accs, roles, lossless):
+    """-> (mode, stride, filter, accessor) or None to leave the view raw."""
+    bv = gltf["bufferViews"][vi]
+    if not accs or bv.get("buffer", 0) != 0:
+        return None
+    sizes = {COMP_SIZE[gltf["accessors"][a]["componentType"]]
+             * TYPE_COUNT[gltf["accessors"][a]["type"]] for a in accs}
+    uses = set().union(*(roles.get(a, {"other"}) for a in accs))
+    if "triangles" in uses:
+        comp = {gltf["accessors"][a]["componentType"] for a in accs}
+        if uses != {"triangles"} or len(comp) != 1 or comp & {5121}:
+            return None
+        stride = sizes.pop()
+        if bv["byteLength"] % (3 * stride):
+            return None
+        return "TRIANGLES", stride, None, None
+    if "indices" in uses:
+        return None
+    stride = bv.get("byteStride") or (sizes.pop() if len(sizes) == 1 else 0)
+    if not stride or stride % 4 or stride > 256 or bv["byteLength"] % stride:
+        return None
+    filt = None
+    acc = gltf["accessors"][accs[0]]
+    whole = (len(accs) == 1 and acc.get("byteOffset", 0) == 0
+             and acc["count"] * stride == bv["byteLength"] and len(uses) == 1)
+    if whole and not lossless:
+        use, ctype = next(iter(uses)), acc["componentType"]
+        if (use in ("NORMAL", "TANGENT") and acc.get("normalized")
+                and (ctype, stride) in ((5120, 4), (5122, 8))):
+            filt = "OCTAHEDRAL"
+        elif use == "rotation" and ctype == 5126 and acc["type"] == "VEC4":
+            filt = "QUATERNION"
+        elif use in ("translation", "scale") and ctype == 5126 and acc["type"] == "VEC3":
+            filt = "EXPONENTIAL"
+    return "ATTRIBUTES", stride, filt, accs[0] if filt else None
+
+
+def filter_view(gltf, binc, acc_idx, filt, stride, quat_bits, exp_bits):
+    """-> (filtered bytes to encode, decoded bytes, max error, new stride)."""
+    vals = read_accessor(gltf, binc, acc_idx, normalize=True).astype(np.float32)
+    if filt == "OCTAHEDRAL":
+        n4 = np.zeros((len(vals), 4), np.float32)
+        n4[:, :vals.shape[1]] = vals
+        enc = encode_oct(n4, stride, stride * 2)
+        dec = decode_oct(enc)
+        info = np.iinfo(dec.dtype)
+        got = np.maximum(dec[:, :3].astype(np.float32) / info.max, -1)
+        err = float(np.abs(got - vals[:, :3]).max()) if len(vals) else 0.0
+        return enc.tobytes(), dec.tobytes(), err, stride
+    if filt == "QUATERNION":
+        enc = encode_quat(vals, quat_bits)
+        dec = decode_quat(enc)
+        got = np.maximum(dec.astype(np.float32) / 32767, -1)
+        dots = np.abs((got * vals).sum(1)) / np.maximum(np.linalg.norm(got, axis=1), 1e-12)
+        err = float(2 * np.degrees(np.arccos(np.clip(dots.min(), 0, 1)))) if len(vals) else 0.0
+        return enc.tobytes(), dec.tobytes(), err, 8
+    enc = encode_exp(vals.reshape(-1), exp_bits)
+    dec = decode_exp(enc).reshape(vals.shape)
+    err = float(np.abs(dec - vals).max()) if len(vals) else 0.0
+    return enc.tobytes(), dec.tobytes(), err, stride
+
+
+def compress(gltf, binc, lossless=False, quat_bits=12, exp_bits=16):
+    """Re-encode views in place; returns (new BIN, fallback bytes, report)."""
+    roles = accessor_roles(gltf)
+    by_view = {}
+    for ai, acc in enumerate(gltf.get("accessors", [])):
+        if "sparse" in acc:
+            for v in (acc["sparse"]["indices"]["bufferView"], acc["sparse"]["values"]["bufferView"]):
+                by_view.setdefault(v, []).append(None)
+        if "bufferView" in acc:
+            by_view.setdefault(acc["bufferView"], []).append(ai)
+    new_bin, fallback, report = bytearray(), bytearray(), []
+    for vi, bv in enumerate(gltf.get("bufferViews", [])):
+        accs = by_view.get(vi, [])
+        plan = None if None in accs else plan_view(gltf, vi, accs, roles, lossless)
+        start = bv.get("byteOffset", 0)
+        raw = bytes(binc[start: start + bv["byteLength"]]) if bv.get("buffer", 0) == 0 else b""
+        if plan:
+            mode, stride, filt, acc_idx = plan
+            data, decoded, err = raw, raw, None
+            if filt:
+                data, decoded, err, stride = filter_view(gltf, binc, acc_idx, filt, stride,
+                                                         quat_bits, exp_bits)
+            count = len(data) // stride
+            if mode == "TRIANGLES":
+                tris = np.frombuffer(data, DTYPE[5123 if stride == 2 else 5125]).reshape(-1, 3)
+                enc = encode_index_buffer(tris)
+                got = decode_index_buffer(enc, count)
+                # the codec keeps winding but may rotate a triangle's corners
+                ok = got.shape == tris.shape and bool(np.logical_or.reduce(
+                    [(got == np.roll(tris, r, 1)).all(1) for r in range(3)]).all())
+                decoded = got.astype(tris.dtype).tobytes()
+            else:
+                enc = encode_vertex_buffer(data, count, stride)
+                ok = decode_vertex_buffer(enc, count, stride) == data
+            if not ok:
+                raise SystemExit(f"bufferView[{vi}]: {mode} round-trip mismatch — not writing")
+            if len(enc) < len(raw):
+                if filt == "QUATERNION":
+                    acc = gltf["accessors"][acc_idx]
+                    acc["componentType"], acc["normalized"] = 5122, True
+                    acc.pop("min", None)
+                    acc.pop("max", None)
+                elif filt == "EXPONENTIAL" and count:
+                    # lets glb_inspect.py check root scale without decoding
+                    acc = gltf["accessors"][acc_idx]
+                    dec = np.frombuffer(decoded, np.float32).reshape(count, -1)
+                    acc["min"] = [float(v) for v in dec.min(0)]
+                    acc["max"] = [float(v) for v in dec.max(0)]
+                while len(new_bin) % 4:
+                    new_bin.append(0)
+                while len(fallback) % 4:
+                    fallback.append(0)
+                ext = {"buffer": 0, "byteOffset": len(new_bin), "byteLength": len(enc),
+                       "byteStride": stride, "mode": mode, "count": count}
+                if filt:
+                    ext["filter"] = filt
+                bv["extensions"] = {EXT: ext}
+                bv["buffer"], bv["byteOffset"], bv["byteLength"] = -1, len(fallback), len(decoded)
+                new_bin.extend(enc)
+                fallback.extend(decoded)
+                report.append((vi, mode, filt, len(raw), len(enc), err))
+                continue
+        if bv.get("buffer", 0) == 0:
+            while len(new_bin) % 4:
+                new_bin.append(0)
+            bv["byteOffset"] = len(new_bin)
+            new_bin.extend(raw)
+    return new_bin, fallback, report
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--lossless", action="store_true",
+                   help="no OCTAHEDRAL / QUATERNION / EXPONENTIAL filters")
+    p.add_argument("--quat-bits", type=int, default=12, choices=range(4, 17),
+                   metavar="4..16", help="rotation output bits (default 12)")
+    p.add_argument("--exp-bits", type=int, default=16, choices=range(1, 24),
+                   metavar="1..23", help="translation/scale mantissa bits (default 16)")
+    p.add_argument("--fallback", metavar="FILE.bin",
+                   help="also write uncompressed data here (extension not required)")
+    a = p.parse_args()
+    gltf, binc = read_glb(a.input)
+    binc = compact_bin(gltf, binc)
+    if any(EXT in bv.get("extensions", {}) for bv in gltf.get("bufferViews", [])):
+        raise SystemExit(f"{a.input}: already uses {EXT}")
+    before = len(binc)
+    t0 = time.perf_counter()
+    new_bin, fallback, report = compress(gltf, binc, a.lossless, a.quat_bits, a.exp_bits)
+    dt = time.perf_counter() - t0
+    for vi, mode, filt, raw, enc, err in report:
+        extra = f"  max err {err:.3g}{' deg' if filt == 'QUATERNION' else ''}" if filt else ""
+        print(f"  bufferView[{vi}] {mode:<10} {filt or '':<11} {raw:9d} -> {enc:8d} B{extra}")
+    if report:
+        buffers = gltf.setdefault("buffers", [{"byteLength": 0}])
+        fb = {"byteLength": len(fallback), "extensions": {EXT: {"fallback": True}}}
+        if a.fallback:
+            with open(a.fallback, "wb") as f:
+                f.write(fallback)
+            fb["uri"] = os.path.relpath(a.fallback, os.path.dirname(os.path.abspath(a.output)))
+        buffers.append(fb)
+        for bv in gltf["bufferViews"]:
+            if bv.get("buffer") == -1:
+                bv["buffer"] = len(buffers) - 1
+        used = gltf.setdefault("extensionsUsed", [])
+        if EXT not in used:
+            used.append(EXT)
+        if not a.fallback:
+            req = gltf.setdefault("extensionsRequired", [])
+            if EXT not in req:
+                req.append(EXT)
+    write_glb(a.output, gltf, new_bin)
+    gz0, gz1 = len(zlib.compress(bytes(binc), 9)), len(zlib.compress(bytes(new_bin), 9))
+    raw_sum, enc_sum = sum(r[3] for r in report), sum(r[4] for r in report)
+    print(f"  encoded views: {raw_sum / 1024:.1f} -> {enc_sum / 1024:.1f} KiB "
+          f"({raw_sum / max(enc_sum, 1):.1f}x)")
+    print(f"done: {a.output} — BIN {before / 1024:.1f} -> {len(new_bin) / 1024:.1f} KiB, "
+          f"gzip {gz0 / 1024:.1f} -> {gz1 / 1024:.1f} KiB ({gz0 / max(gz1, 1):.1f}x), "
+          f"{len(report)} views encoded + verified, {dt:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
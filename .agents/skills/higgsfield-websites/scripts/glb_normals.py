@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""glb_normals.py — winding repair, outward orientation and normal
+recomputation for GLB meshes (numpy + stdlib, no Blender).
+
+fbx2glb.py / rig_transfer.py repair normals inside Blender
+(normals_make_consistent per object in edit mode, then a Python loop over
+every polygon for the outward check) — the slowest step on high-poly scans
+and impossible without Blender. Per vertex buffer (primitives sharing a
+POSITION accessor are handled together) this pass:
+  1. welds positions (--tolerance x bbox diagonal, as glb_weld.py) and
+     hashes every triangle edge (sorted min/max key) to get triangle
+     adjacency across manifold edges;
+  2. labels connected components and propagates a consistent winding from
+     one seed per component (vectorized multi-source BFS, one numpy step
+     per BFS level): neighbours walking a shared edge in the same direction
+     get opposite flips;
+  3. orients each component outward by its signed volume about its own
+     centroid; flat / open pieces with no meaningful volume keep the
+     winding most of their original triangles had;
+  4. recomputes NORMAL as the angle-weighted (--weighting area: area-
+     weighted) average of the face normals, then averages normals of split
+     vertices at one position within --angle (UV seams) — hard edges stay.
+Reports flipped triangles, components turned outward, non-manifold /
+still-inconsistent edges and the fbx2glb-style outward score before/after.
+Quantized POSITION (run before glb_quantize.py) and non-TRIANGLES
+primitives are skipped; morph-target normals and TANGENT are left as is.
+
+Usage:
+    python3 glb_normals.py in.glb out.glb [--weighting angle|area] [--angle 30]
+        [--tolerance 1e-6] [--winding-only]
+"""
+import argparse
+import collections
+import time
+
+import numpy as np
+
+from glb_arrays import (ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER, add_accessor,
+                        index_array, read_accessor, replace_accessor, triangles)
+from glb_merge_anims import compact_bin, read_glb, write_glb
+from glb_weld import components, merge_normals, quantize
+
+
+def weld(pos, tolerance):
+    """Vertex -> welded position id (grid of tolerance x bbox diagonal)."""
+    step = tolerance * (float(np.linalg.norm(np.ptp(pos, 0))) or 1.0)
+    label = components(quantize(pos, step), quantize(pos + step / 2, step))
+    return np.unique(label, return_inverse=True)[1].reshape(-1)
+
+
+def edge_pairs(tris):
+    """Manifold edge pairs (ti, tj, same_direction) + non-manifold edge count."""
+    u = tris[:, [0, 1, 2]].reshape(-1)
+    v = tris[:, [1, 2, 0]].reshape(-1)
+    tri = np.repeat(np.arange(len(tris)), 3)
+    ok = u != v
+    u, v, tri = u[ok], v[ok], tri[ok]
+    n = int(tris.max()) + 1 if len(tris) else 1
+    key = np.minimum(u, v) * n + np.maximum(u, v)
+    order = np.argsort(key, kind="stable")
+    k = key[order]
+    starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+    counts = np.diff(np.r_[starts, len(k)])
+    two = starts[counts == 2]
+    i, j = order[two], order[two + 1]
+    return tri[i], tri[j], (u[i] == u[j]).astype(np.int8), int((counts > 2).sum())
+
+
+def component_labels(count, ti, tj):
+    """Hook roots to the smaller root + pointer jumping -> min triangle per component."""
+    label = np.arange(count)
+    while True:
+        lu, lv = label[ti], label[tj]
+        differ = lu != lv
+        if not differ.any():
+            return label
+        np.minimum.at(label, np.maximum(lu, lv)[differ], np.minimum(lu, lv)[differ])
+        while True:
+            jumped = label[label]
+            if np.array_equal(jumped, label):
+                break
+            label = jumped
+
+
+def propagate(count, ti, tj, same, label):
+    """Flip bit per triangle making the winding consistent within components."""
+    src = np.concatenate([ti, tj])
+    dst = np.concatenate([tj, ti])
+    par = np.concatenate([same, same])
+    order = np.argsort(src, kind="stable")
+    dst, par = dst[order], par[order]
+    indptr = np.zeros(count + 1, np.int64)
+    np.cumsum(np.bincount(src, minlength=count), out=indptr[1:])
+    flip = np.full(count, -1, np.int8)
+    frontier = np.flatnonzero(label == np.arange(count))
+    flip[frontier] = 0
+    while len(frontier):
+        lo, hi = indptr[frontier], indptr[frontier + 1]
+        deg = hi - lo
+        if not deg.sum():
+            break
+        edge = np.repeat(lo - np.cumsum(deg) + deg, deg) + np.arange(deg.sum())
+        nb = dst[edge]
+        val = np.repeat(flip[frontier], deg) ^ par[edge]
+        new = flip[nb] < 0
+        nb, first = np.unique(nb[new], return_index=True)
+        flip[nb] = val[new][first]
+        frontier = nb
+    return flip.astype(bool)
+
+
+def face_data(pos, tris):
+    p0, p1, p2 = pos[tris[:, 0]], pos[tris[:, 1]], pos[tris[:, 2]]
+    cross = np.cross(p1 - p0, p2 - p0)
+    return p0, p1, p2, cross
+
+
+def outward_score(pos, tris):
+    """fbx2glb.py's check: mean dot(face normal, dir centroid -> face center)."""
+    if not len(tris):
+        return 0.0
+    p0, p1, p2, cross = face_data(pos, tris)
+    n = cross / np.maximum(np.linalg.norm(cross, axis=1, keepdims=True), 1e-30)
+    d = (p0 + p1 + p2) / 3 - pos[np.unique(tris)].mean(0)
+    d /= np.maximum(np.linalg.norm(d, axis=1, keepdims=True), 1e-9)
+    return float((n * d).sum(1).mean())
+
+
+def orient_outward(pos, tris, flip, label):
+    """Invert whole components whose signed volume is negative; returns count."""
+    _, comp = np.unique(label, return_inverse=True)
+    comp = comp.reshape(-1)
+    ncomp = comp.max() + 1
+    fixed = tris.copy()
+    fixed[flip] = fixed[flip][:, [0, 2, 1]]
+    p0, p1, p2, cross = face_data(pos, fixed)
+    center = np.stack([np.bincount(comp, (p0 + p1 + p2)[:, c], ncomp) for c in range(3)], 1)
+    center /= 3 * np.bincount(comp, minlength=ncomp)[:, None]
+    c = center[comp]
+    vol = np.bincount(comp, ((p0 - c) * np.cross(p1 - c, p2 - c)).sum(1), ncomp)
+    area = np.bincount(comp, np.linalg.norm(cross, axis=1) / 2, ncomp)
+    flipped = np.bincount(comp, flip, ncomp)
+    kept = np.bincount(comp, ~flip, ncomp)
+    # no meaningful volume (flat / open sheet): keep the majority winding
+    solid = np.abs(vol) > 1e-3 * area ** 1.5
+    invert = np.where(solid, vol < 0, flipped > kept)
+    flip ^= invert[comp]
+    return int((invert & solid).sum())
+
+
+def vertex_normals(pos, tris, weighting, count):
+    p0, p1, p2, cross = face_data(pos, tris)
+    unit = cross / np.maximum(np.linalg.norm(cross, axis=1, keepdims=True), 1e-30)
+    if weighting == "area":
+        w = np.repeat(np.linalg.norm(cross, axis=1)[:, None], 3, 1)
+    else:
+        corners = [(p0, p1, p2), (p1, p2, p0), (p2, p0, p1)]
+        w = np.stack([np.arctan2(np.linalg.norm(np.cross(b - a, c - a), axis=1),
+                                 ((b - a) * (c - a)).sum(1)) for a, b, c in corners], 1)
+    acc = np.stack([np.bincount(tris.reshape(-1), (unit[:, None, k] * w).reshape(-1), count)
+                    for k in range(3)], 1)
+    norm = np.linalg.norm(acc, axis=1, keepdims=True)
+    return acc / np.maximum(norm, 1e-30), norm[:, 0] > 0
+
+
+def repair(gltf, binc, prims, weighting, angle, tolerance, normals=True):
+    """One vertex buffer (primitives sharing POSITION); returns report dict."""
+    attrs = prims[0]["attributes"]
+    pos = read_accessor(gltf, binc, attrs["POSITION"])
+    if pos.dtype.kind != "f":
+        return {"skipped": "quantized POSITION"}
+    pos = pos.astype(np.float64)
+    parts = [triangles(gltf, binc, p) for p in prims]
+    sizes = [len(t) for t in parts]
+    tris = np.concatenate(parts)
+    wedge = weld(pos, tolerance)
+    wt = wedge[tris]
+    ti, tj, same, nonmanifold = edge_pairs(wt)
+    label = component_labels(len(tris), ti, tj)
+    flip = propagate(len(tris), ti, tj, same, label)
+    before = outward_score(pos, tris)
+    outward = orient_outward(pos, tris, flip, label)
+    tris = tris.copy()
+    tris[flip] = tris[flip][:, [0, 2, 1]]
+    bad = int(((flip[ti] ^ flip[tj]) != same.astype(bool)).sum())
+    rep = {"tris": len(tris), "components": len(np.unique(label)),
+           "flipped": int(flip.sum()), "outward": outward, "nonmanifold": nonmanifold,
+           "inconsistent": bad, "score": (before, outward_score(pos, tris)), "merged": 0}
+    at = 0
+    for prim, n in zip(prims, sizes):
+        flat = index_array(tris[at: at + n], len(pos))
+        at += n
+        if "indices" in prim:
+            replace_accessor(gltf, binc, prim["indices"], flat,
+                             target=ELEMENT_ARRAY_BUFFER, minmax=False)
+        else:
+            prim["indices"] = add_accessor(gltf, binc, flat, target=ELEMENT_ARRAY_BUFFER)
+    if not normals:
+        return rep
+    nrm, used = vertex_normals(pos, tris, weighting, len(pos))
+    old = None
+    if "NORMAL" in attrs:
+        old = read_accessor(gltf, binc, attrs["NORMAL"], normalize=True).astype(np.float64)
+        nrm[~used] = old[~used]
+    if angle is not None:
+        nrm, rep["merged"] = merge_normals(wedge[:, None], None, nrm, angle)
+    acc = gltf["accessors"][attrs["NORMAL"]] if old is not None else None
+    if acc is not None and acc["componentType"] == 5120 and acc.get("normalized"):
+        data, norm = np.round(np.clip(nrm, -1, 1) * 127).astype(np.int8), True
+    elif acc is not None and acc["componentType"] == 5122 and acc.get("normalized"):
+        data, norm = np.round(np.clip(nrm, -1, 1) * 32767).astype(np.int16), True
+    else:
+        data, norm = nrm.astype(np.float32), False
+    if old is not None:
+        replace_accessor(gltf, binc, attrs["NORMAL"], data, target=ARRAY_BUFFER,
+                         normalized=norm)
+    else:
+        a = add_accessor(gltf, binc, data, target=ARRAY_BUFFER)
+        for prim in prims:
+            prim["attributes"]["NORMAL"] = a
+    return rep
+
+
+def repair_all(gltf, binc, weighting="angle", angle=30.0, tolerance=1e-6, normals=True):
+    groups = collections.OrderedDict()
+    for mi, mesh in enumerate(gltf.get("meshes", [])):
+        for pi, prim in enumerate(mesh.get("primitives", [])):
+            if prim.get("mode", 4) != 4 or "POSITION" not in prim.get("attributes", {}):
+                continue
+            groups.setdefault(prim["attributes"]["POSITION"], []).append(
+                (mesh.get("name", f"mesh_{mi}"), pi, prim))
+    report = []
+    for members in groups.values():
+        prims = [p for _, _, p in members]
+        label = ", ".join(f"{name}[{pi}]" for name, pi, _ in members)
+        if len({p["attributes"].get("NORMAL") for p in prims}) > 1:
+            report.append((label, {"skipped": "shared POSITION, different NORMAL"}))
+            continue
+        report.append((label, repair(gltf, binc, prims, weighting, angle, tolerance, normals)))
+    return report
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--weighting", choices=["angle", "area"], default="angle",
+                   help="face normal weights per corner (default angle)")
+    p.add_argument("--angle", type=float, default=30.0,
+                   help="merge split-vertex normals within this angle (degrees, default 30)")
+    p.add_argument("--tolerance", type=float, default=1e-6,
+                   help="weld grid for adjacency, fraction of the bbox diagonal (default 1e-6)")
+    p.add_argument("--winding-only", action="store_true",
+                   help="fix winding / orientation, keep the existing normals")
+    a = p.parse_args()
+    gltf, binc = read_glb(a.input)
+    t0 = time.perf_counter()
+    report = repair_all(gltf, binc, a.weighting, a.angle, a.tolerance, not a.winding_only)
+    dt = time.perf_counter() - t0
+    flipped = 0
+    for label, rep in report:
+        if "skipped" in rep:
+            print(f"  {label}: {rep['skipped']}, skipped")
+            continue
+        flipped += rep["flipped"]
+        b, s = rep["score"]
+        extra = f", {rep['nonmanifold']} non-manifold" if rep["nonmanifold"] else ""
+        extra += f", {rep['inconsistent']} inconsistent edges left" if rep["inconsistent"] else ""
+        print(f"  {label}: {rep['tris']} tris, {rep['components']} components, "
+              f"{rep['flipped']} flipped ({rep['outward']} components turned outward{extra}); "
+              f"outward score {b:.3f} -> {s:.3f}")
+    write_glb(a.output, gltf, compact_bin(gltf, binc))
+    print(f"done: {a.output} — {flipped} triangles flipped, "
+          f"normals {'kept' if a.winding_only else 'recomputed'}, {dt:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
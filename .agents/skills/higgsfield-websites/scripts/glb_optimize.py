@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""glb_optimize.py — vertex cache + vertex fetch optimizer for GLB meshes
+(numpy + stdlib, no Blender).
+
+Meshy / image-to-3D outputs (and fbx2glb.py / rig_transfer.py exports of
+them) arrive with essentially random triangle order, so the GPU's
+post-transform vertex cache misses on almost every vertex. Per TRIANGLES
+primitive this pass:
+  1. reorders triangles for cache locality (Tipsify, Sander et al. 2007 —
+     linear time, adjacency built vectorized);
+  2. reorders vertices in first-use order for fetch locality and remaps
+     EVERY attribute with the same permutation (POSITION, NORMAL, UVs,
+     JOINTS_0/WEIGHTS_0, COLOR, morph targets);
+  3. reports ACMR (average cache miss ratio: transformed vertices per
+     triangle, 0.5 is ideal, 3.0 is worst) before/after on a FIFO cache.
+
+Vertex buffers shared by several primitives only get the triangle reorder
+(a vertex permutation would break the other users).
+
+Usage:
+    python3 glb_optimize.py in.glb out.glb [--cache 16]
+    python3 glb_optimize.py --bench            # synthetic meshes, timings
+"""
+import argparse
+import collections
+import time
+
+import numpy as np
+
+from glb_arrays import (ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER, add_accessor,
+                        index_array, read_accessor, replace_accessor, triangles)
+from glb_merge_anims import compact_bin, read_glb, write_glb
+
+CACHE_SIZE = 16
+
+
+def acmr(tris, cache_size=CACHE_SIZE):
+    """Average cache miss ratio of a triangle list on a FIFO cache."""
+    if not len(tris):
+        return 0.0
+    fifo = collections.deque()
+    cached = set()
+    misses = 0
+    for v in tris.reshape(-1).tolist():
+        if v in cached:
+            continue
+        misses += 1
+        fifo.append(v)
+        cached.add(v)
+        if len(fifo) > cache_size:
+            cached.discard(fifo.popleft())
+    return misses / len(tris)
+
+
+def vertex_triangle_adjacency(tris, vertex_count):
+    """CSR vertex -> triangle lists (offsets, triangle ids), vectorized."""
+    flat = tris.reshape(-1)
+    order = np.argsort(flat, kind="stable")
+    counts = np.bincount(flat, minlength=vertex_count)
+    offsets = np.zeros(vertex_count + 1, np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets, order // 3, counts
+
+
+def tipsify(tris, vertex_count, cache_size=CACHE_SIZE):
+    """Cache-friendly triangle order (Tipsify). Returns a triangle permutation."""
+    ntri = len(tris)
+    if ntri == 0:
+        return np.zeros(0, np.int64)
+    offsets, adj, counts = vertex_triangle_adjacency(tris, vertex_count)
+    offsets, adj = offsets.tolist(), adj.tolist()
+    tri_list = tris.tolist()
+    live = counts.tolist()
+    stamp = [0] * vertex_count
+    emitted = [False] * ntri
+    dead_end = []
+    out = []
+    time_now = cache_size + 1
+    cursor = 0
+    fan = int(tris[0, 0])
+    while fan >= 0:
+        candidates = []
+        for t in adj[offsets[fan]:offsets[fan + 1]]:
+            if emitted[t]:
+                continue
+            emitted[t] = True
+            out.append(t)
+            for v in tri_list[t]:
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if time_now - stamp[v] > cache_size:
+                    stamp[v] = time_now
+                    time_now += 1
+        # next fanning vertex: the candidate still in cache with the most
+        # remaining triangles that will stay in cache while we fan it
+        fan, best = -1, -1
+        for v in candidates:
+            if live[v] > 0:
+                age = time_now - stamp[v]
+                prio = age if age + 2 * live[v] <= cache_size else 0
+                if prio > best:
+                    best, fan = prio, v
+        if fan == -1:
+            while dead_end:
+                d = dead_end.pop()
+                if live[d] > 0:
+                    fan = d
+                    break
+        if fan == -1:
+            while cursor < vertex_count:
+                if live[cursor] > 0:
+                    fan = cursor
+                    break
+                cursor += 1
+    return np.asarray(out, np.int64)
+
+
+def fetch_order(tris, vertex_count):
+    """Vertex permutation in first-use order (unused vertices go last)."""
+    flat = tris.reshape(-1)
+    used, first = np.unique(flat, return_index=True)
+    order = used[np.argsort(first, kind="stable")]
+    unused = np.setdiff1d(np.arange(vertex_count), used, assume_unique=True)
+    return np.concatenate([order, unused])
+
+
+def optimize_triangles(tris, vertex_count, cache_size=CACHE_SIZE):
+    """Returns (new_tris, vertex_perm) — new_tris index the permuted vertices."""
+    tris = tris[tipsify(tris, vertex_count, cache_size)]
+    perm = fetch_order(tris, vertex_count)
+    remap = np.empty(vertex_count, np.int64)
+    remap[perm] = np.arange(vertex_count)
+    return remap[tris], perm
+
+
+def attribute_users(gltf):
+    """accessor index -> number of primitives using it as a vertex attribute."""
+    users = collections.Counter()
+    for mesh in gltf.get("meshes", []):
+        for prim in mesh.get("primitives", []):
+            accs = set(prim.get("attributes", {}).values())
+            for tgt in prim.get("targets", []):
+                accs.update(tgt.values())
+            users.update(accs)
+    return users
+
+
+def optimize_primitive(gltf, binc, prim, users, cache_size):
+    tris = triangles(gltf, binc, prim)
+    if tris is None or not len(tris):
+        return None
+    vcount = gltf["accessors"][prim["attributes"]["POSITION"]]["count"]
+    before = acmr(tris, cache_size)
+    attrs = list(prim["attributes"].values())
+    for tgt in prim.get("targets", []):
+        attrs.extend(tgt.values())
+    shared = any(users[a] > 1 for a in attrs)
+    if shared:
+        tris = tris[tipsify(tris, vcount, cache_size)]
+    else:
+        tris, perm = optimize_triangles(tris, vcount, cache_size)
+        for a in attrs:
+            acc = gltf["accessors"][a]
+            data = read_accessor(gltf, binc, a)[perm]
+            replace_accessor(gltf, binc, a, data, target=ARRAY_BUFFER,
+                             normalized=acc.get("normalized", False))
+    flat = index_array(tris, vcount)
+    if "indices" in prim:
+        replace_accessor(gltf, binc, prim["indices"], flat,
+                         target=ELEMENT_ARRAY_BUFFER, minmax=False)
+    else:
+        prim["indices"] = add_accessor(gltf, binc, flat, target=ELEMENT_ARRAY_BUFFER)
+    return len(tris), vcount, before, acmr(tris, cache_size), shared
+
+
+def optimize(gltf, binc, cache_size=CACHE_SIZE):
+    users = attribute_users(gltf)
+    report = []
+    for mi, mesh in enumerate(gltf.get("meshes", [])):
+        for pi, prim in enumerate(mesh.get("primitives", [])):
+            res = optimize_primitive(gltf, binc, prim, users, cache_size)
+            if res:
+                report.append((mesh.get("name", f"mesh_{mi}"), pi) + res)
+    return report
+
+
+def bench(cache_size):
+    rng = np.random.default_rng(1)
+    for side in (64, 128, 256):
+        g = np.arange(side * side).reshape(side, side)
+        a, b, c, d = g[:-1, :-1], g[:-1, 1:], g[1:, :-1], g[1:, 1:]
+        tris = np.concatenate([np.stack([a, c, b], -1).reshape(-1, 3),
+                               np.stack([b, c, d], -1).reshape(-1, 3)])
+        tris = tris[rng.permutation(len(tris))]
+        t0 = time.perf_counter()
+        new, _ = optimize_triangles(tris, side * side, cache_size)
+        dt = time.perf_counter() - t0
+        print(f"grid {side}x{side}: {len(tris):7d} tris  ACMR "
+              f"{acmr(tris, cache_size):.3f} -> {acmr(new, cache_size):.3f}  "
+              f"{dt * 1000:8.1f} ms ({len(tris) / dt / 1e3:.0f}k tris/s)")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("input", nargs="?")
+    p.add_argument("output", nargs="?")
+    p.add_argument("--cache", type=int, default=CACHE_SIZE,
+                   help="simulated FIFO cache size (default 16)")
+    p.add_argument("--bench", action="store_true",
+                   help="run on shuffled synthetic grids and print timings")
+    a = p.parse_args()
+    if a.bench:
+        bench(a.cache)
+        return
+    if not a.input or not a.output:
+        raise SystemExit(__doc__)
+    gltf, binc = read_glb(a.input)
+    t0 = time.perf_counter()
+    report = optimize(gltf, binc, a.cache)
+    dt = time.perf_counter() - t0
+    for name, pi, ntri, nvert, before, after, shared in report:
+        note = "  (shared vertex buffer: triangle order only)" if shared else ""
+        print(f"  {name}[{pi}]: {ntri} tris, {nvert} verts  ACMR "
+              f"{before:.3f} -> {after:.3f}{note}")
+    write_glb(a.output, gltf, compact_bin(gltf, binc))
+    print(f"done: {a.output} ({len(report)} primitives, {dt:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
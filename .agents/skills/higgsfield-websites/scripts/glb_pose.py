@@ -0,0 +1,237 @@
+"""glb_pose.py — numpy animation sampling and skinning for the GLB tools.
+
+Evaluates glTF animation samplers (STEP / LINEAR with slerp / CUBICSPLINE)
+at arbitrary times, composes node world matrices for every frame at once
+and applies linear blend skinning, so offline passes can look at a clip the
+way the client will draw it — no Blender, no three.js.
+
+    gltf, binc = read_glb(path)
+    times = frame_times(clip_duration(gltf, binc, anim), fps=30)
+    world = world_poses(gltf, binc, anim, times)      # (F, nodes, 4, 4)
+    pos = skinned_positions(gltf, binc, mesh_node, world)  # (F, V, 3)
+Morph targets are not applied.
+"""
+import numpy as np
+
+from glb_arrays import read_accessor
+from glb_instance import local_matrix
+
+
+def quat_to_matrix(q):
+    """(..., 4) xyzw -> (..., 3, 3)."""
+    q = q / np.linalg.norm(q, axis=-1, keepdims=True)
+    x, y, z, w = np.moveaxis(q, -1, 0)
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)], -1),
+        np.stack([2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)], -1),
+        np.stack([2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)], -1),
+    ], -2)
+
+
+def matrix_to_quat(m):
+    """(..., 3, 3) rotation matrices -> (..., 4) xyzw (w >= 0)."""
+    m = np.asarray(m, np.float64)
+    # Shepperd: pick the largest of 4w², 4x², 4y², 4z² per matrix
+    t = np.stack([m[..., 0, 0] + m[..., 1, 1] + m[..., 2, 2],
+                  m[..., 0, 0] - m[..., 1, 1] - m[..., 2, 2],
+                  m[..., 1, 1] - m[..., 0, 0] - m[..., 2, 2],
+                  m[..., 2, 2] - m[..., 0, 0] - m[..., 1, 1]], -1)
+    k = np.argmax(t, -1)
+    r = np.sqrt(np.maximum(1 + np.take_along_axis(t, k[..., None], -1)[..., 0], 1e-300))
+    s = 0.5 / r
+    d21, d02, d10 = m[..., 2, 1] - m[..., 1, 2], m[..., 0, 2] - m[..., 2, 0], m[..., 1, 0] - m[..., 0, 1]
+    s21, s02, s10 = m[..., 2, 1] + m[..., 1, 2], m[..., 0, 2] + m[..., 2, 0], m[..., 1, 0] + m[..., 0, 1]
+    cases = np.stack([
+        np.stack([d21 * s, d02 * s, d10 * s, 0.5 * r], -1),
+        np.stack([0.5 * r, s10 * s, s02 * s, d21 * s], -1),
+        np.stack([s10 * s, 0.5 * r, s21 * s, d02 * s], -1),
+        np.stack([s02 * s, s21 * s, 0.5 * r, d10 * s], -1)], -2)
+    q = np.take_along_axis(cases, k[..., None, None], -2)[..., 0, :]
+    q = np.where(q[..., 3:] < 0, -q, q)
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+
+def rotation_part(m):
+    """(..., 4, 4) or (..., 3, 3) -> rotation with the column scale removed."""
+    r = np.asarray(m)[..., :3, :3]
+    return r / np.linalg.norm(r, axis=-2, keepdims=True)
+
+
+def quat_mul(a, b):
+    """Hamilton product of (..., 4) xyzw quaternions."""
+    ax, ay, az, aw = np.moveaxis(a, -1, 0)
+    bx, by, bz, bw = np.moveaxis(b, -1, 0)
+    return np.stack([aw * bx + ax * bw + ay * bz - az * by,
+                     aw * by - ax * bz + ay * bw + az * bx,
+                     aw * bz + ax * by - ay * bx + az * bw,
+                     aw * bw - ax * bx - ay * by - az * bz], -1)
+
+
+def slerp(q0, q1, u):
+    """Row-wise slerp of (F, 4) quaternions by (F,) factors (shortest arc)."""
+    d = (q0 * q1).sum(-1)
+    q1 = np.where(d[:, None] < 0, -q1, q1)
+    d = np.abs(d)
+    theta = np.arccos(np.clip(d, -1, 1))
+    sin = np.sin(theta)
+    near = sin < 1e-6
+    safe = np.where(near, 1.0, sin)
+    a = np.where(near, 1 - u, np.sin((1 - u) * theta) / safe)
+    b = np.where(near, u, np.sin(u * theta) / safe)
+    q = a[:, None] * q0 + b[:, None] * q1
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+
+def trs_matrices(t, r, s):
+    """(F, 3), (F, 4), (F, 3) -> (F, 4, 4) = T @ R @ S."""
+    m = np.zeros((len(t), 4, 4))
+    m[:, :3, :3] = quat_to_matrix(r) * s[:, None, :]
+    m[:, :3, 3] = t
+    m[:, 3, 3] = 1
+    return m
+
+
+def sample(gltf, binc, anim, smp_idx, times, path):
+    """Evaluate one animation sampler at `times` -> (F, ncomp)."""
+    smp = anim["samplers"][smp_idx]
+    keys = read_accessor(gltf, binc, smp["input"]).astype(np.float64)
+    vals = read_accessor(gltf, binc, smp["output"], normalize=True).astype(np.float64)
+    vals = vals.reshape(len(keys) * (3 if smp.get("interpolation") == "CUBICSPLINE" else 1), -1)
+    interp = smp.get("interpolation", "LINEAR")
+    t = np.clip(times, keys[0], keys[-1])
+    k = np.clip(np.searchsorted(keys, t, side="right") - 1, 0, len(keys) - 1)
+    k1 = np.minimum(k + 1, len(keys) - 1)
+    dt = keys[k1] - keys[k]
+    u = np.where(dt > 0, (t - keys[k]) / np.where(dt > 0, dt, 1), 0.0)
+    if interp == "STEP" or len(keys) == 1:
+        step = vals[1::3] if interp == "CUBICSPLINE" else vals
+        return step[k]
+    if interp == "CUBICSPLINE":
+        a, v, b = vals[0::3], vals[1::3], vals[2::3]
+        u2, u3 = u * u, u * u * u
+        out = ((2 * u3 - 3 * u2 + 1)[:, None] * v[k]
+               + ((u3 - 2 * u2 + u) * dt)[:, None] * b[k]
+               + (-2 * u3 + 3 * u2)[:, None] * v[k1]
+               + ((u3 - u2) * dt)[:, None] * a[k1])
+        if path == "rotation":
+            out /= np.linalg.norm(out, axis=-1, keepdims=True)
+        return out
+    if path == "rotation":
+        return slerp(vals[k], vals[k1], u)
+    return vals[k] + u[:, None] * (vals[k1] - vals[k])
+
+
+def frame_times(duration, fps):
+    n = max(1, int(round(duration * fps))) + 1
+    return np.linspace(0.0, duration, n)
+
+
+def world_poses(gltf, binc, anim, times):
+    """World matrix of every node at every time -> (F, N, 4, 4).
+
+    `anim` may be None for the rest pose (broadcast over `times`).
+    """
+    nodes = gltf.get("nodes", [])
+    F = len(times)
+    tracks = {}
+    for ch in (anim or {}).get("channels", []):
+        tgt = ch["target"]
+        if "node" in tgt and tgt["path"] in ("translation", "rotation", "scale"):
+            tracks.setdefault(tgt["node"], {})[tgt["path"]] = sample(
+                gltf, binc, anim, ch["sampler"], times, tgt["path"])
+    local = np.empty((F, len(nodes), 4, 4))
+    for i, node in enumerate(nodes):
+        tr = tracks.get(i)
+        if not tr:
+            local[:, i] = local_matrix(node)
+            continue
+        t = tr.get("translation", np.tile(node.get("translation", [0, 0, 0]), (F, 1)))
+        r = tr.get("rotation", np.tile(node.get("rotation", [0, 0, 0, 1]), (F, 1)))
+        s = tr.get("scale", np.tile(node.get("scale", [1, 1, 1]), (F, 1)))
+        local[:, i] = trs_matrices(np.asarray(t, float), np.asarray(r, float),
+                                   np.asarray(s, float))
+    parent = {c: i for i, n in enumerate(nodes) for c in n.get("children", [])}
+    world = np.empty_like(local)
+    done = set()
+
+    def resolve(i):
+        if i in done:
+            return
+        if i in parent:
+            resolve(parent[i])
+            world[:, i] = world[:, parent[i]] @ local[:, i]
+        else:
+            world[:, i] = local[:, i]
+        done.add(i)
+
+    for i in range(len(nodes)):
+        resolve(i)
+    return world
+
+
+def joint_matrices(gltf, binc, skin, world):
+    """(F, J, 4, 4) skinning matrices world[joint] @ inverseBind."""
+    joints = skin["joints"]
+    if "inverseBindMatrices" in skin:
+        ibm = read_accessor(gltf, binc, skin["inverseBindMatrices"])
+        ibm = ibm.reshape(len(joints), 4, 4).transpose(0, 2, 1).astype(np.float64)
+    else:
+        ibm = np.tile(np.eye(4), (len(joints), 1, 1))
+    return world[:, joints] @ ibm
+
+
+def skin_weights(gltf, binc, prim):
+    """All JOINTS_n/WEIGHTS_n sets -> (V, K) joint indices, (V, K) weights summing to 1."""
+    sets = []
+    n = 0
+    while f"JOINTS_{n}" in prim["attributes"]:
+        j = read_accessor(gltf, binc, prim["attributes"][f"JOINTS_{n}"]).astype(np.int64)
+        w = read_accessor(gltf, binc, prim["attributes"][f"WEIGHTS_{n}"], normalize=True)
+        sets.append((j, w.astype(np.float64)))
+        n += 1
+    joints = np.concatenate([j for j, _ in sets], 1)
+    weights = np.concatenate([w for _, w in sets], 1)
+    total = weights.sum(1, keepdims=True)
+    return joints, np.divide(weights, total, out=np.zeros_like(weights), where=total > 0)
+
+
+def store_weights(w, dtype):
+    """Float rows summing to 1 -> dtype; integer rows sum exactly to its max."""
+    if dtype.kind == "f":
+        return w.astype(dtype)
+    top = np.iinfo(dtype).max
+    q = np.floor(w * top).astype(np.int64)
+    # hand the rounding remainder to the largest fractional parts
+    rem = top - q.sum(1)
+    rank = np.argsort(np.argsort(q - w * top, 1), 1)
+    q += rank < rem[:, None]
+    q[w.sum(1) == 0] = 0
+    return q.astype(dtype)
+
+
+def skinned_positions(gltf, binc, node_idx, world, prim_idx=0):
+    """(F, V, 3) scene-space positions of one mesh node for all frames at once.
+
+    Skinned nodes use linear blend skinning (their own transform is ignored,
+    as in glTF); plain mesh nodes are moved by their world matrix. Memory is
+    F * V * 12 doubles — chunk the frames (skinned_frames) for long clips.
+    """
+    node = gltf["nodes"][node_idx]
+    prim = gltf["meshes"][node["mesh"]]["primitives"][prim_idx]
+    pos = read_accessor(gltf, binc, prim["attributes"]["POSITION"], normalize=True)
+    pos = np.c_[pos.astype(np.float64), np.ones(len(pos))]
+    if "skin" not in node:
+        return np.einsum("fij,vj->fvi", world[:, node_idx, :3], pos)
+    jm = joint_matrices(gltf, binc, gltf["skins"][node["skin"]], world)[:, :, :3]
+    joints, weights = skin_weights(gltf, binc, prim)
+    blend = np.zeros((len(jm), len(pos), 3, 4))
+    for k in range(joints.shape[1]):
+        blend += weights[None, :, k, None, None] * jm[:, joints[:, k]]
+    return np.einsum("fvij,vj->fvi", blend, pos)
+
+
+def skinned_frames(gltf, binc, node_idx, world, prim_idx=0, chunk=16):
+    """Yield (V, 3) scene-space positions per frame, `chunk` frames per batch."""
+    for start in range(0, len(world), chunk):
+        yield from skinned_positions(gltf, binc, node_idx,
+                                     world[start:start + chunk], prim_idx)
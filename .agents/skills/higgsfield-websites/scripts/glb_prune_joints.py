@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""glb_prune_joints.py — unused-joint and dead-channel pruning for skinned GLBs
+(numpy + stdlib, no Blender).
+
+Mixamo / Meshy skeletons ship 50-65 joints; on a stylised character many of
+them (finger tips, *_End / HeadTop_End leaves, toe ends, twist helpers)
+carry no or almost no skin weight, yet every clip still samples them and the
+vertex shader still uploads their matrices. Per skin this pass takes each
+joint's largest WEIGHTS_n influence over every primitive skinned by it and
+prunes the joint when that is below --min-weight AND every joint under it is
+pruned too, so only whole leaf chains go and kept joints never change
+parent. Skeleton roots, skin.skeleton, joints carrying a mesh/camera or a
+non-joint child (props, sockets) and --keep names always stay.
+
+A pruned joint's weight is folded into its nearest kept ancestor: slots of a
+vertex that now name the same joint are summed, sorted by weight and
+renormalized (integer weights re-quantized to sum exactly to 255/65535).
+JOINTS_n are remapped to the shortened skin.joints, inverseBindMatrices lose
+the pruned rows, the nodes are deleted (indices renumbered in children,
+skins, scenes and animations) and every channel targeting them goes with its
+sampler.
+
+Dead channels are dropped as well: a node/path whose channels hold the
+node's rest value (translation/scale within 1e-5, rotation within 1e-4 rad)
+for the whole of EVERY clip animating it does nothing (--keep-static to
+leave them). A clip made only of such channels (a T-pose / reset clip) is
+kept whole, and a clip left without channels (it only animated pruned
+joints) is removed and reported. Unreferenced accessors are
+repacked out of the BIN; joints and channels removed are reported per skin
+and per clip.
+
+Skins no mesh is skinned by (skeleton-only / animation-library GLBs) and
+skins whose JOINTS accessors are shared with another skin are skipped.
+
+Usage:
+    python3 glb_prune_joints.py in.glb out.glb [--min-weight 0.01]
+        [--keep HeadTop_End LeftEye ...] [--keep-static]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from glb_arrays import ARRAY_BUFFER, DTYPE, add_accessor, read_accessor, replace_accessor
+from glb_merge_anims import (compact_bin, drop_channels, read_glb, remove_nodes,
+                             write_glb)
+from glb_pose import quat_mul, skin_weights, store_weights
+
+STATIC_TOL = 1e-5  # translation / scale, relative to the rest value
+STATIC_ROT_TOL = 1e-4  # rotation angle in radians (~0.006 deg)
+REST = {"translation": [0.0, 0.0, 0.0], "rotation": [0.0, 0.0, 0.0, 1.0],
+        "scale": [1.0, 1.0, 1.0]}
+
+
+def skinned_primitives(gltf):
+    """{skin: [primitive, ...]} for every skinned primitive with JOINTS_0."""
+    out = {}
+    for node in gltf.get("nodes", []):
+        if "mesh" not in node or "skin" not in node:
+            continue
+        prims = out.setdefault(node["skin"], [])
+        for prim in gltf["meshes"][node["mesh"]]["primitives"]:
+            if "JOINTS_0" in prim["attributes"] and prim not in prims:
+                prims.append(prim)
+    return out
+
+
+def skipped_skins(gltf, prims):
+    """Skins with no skinned primitive, or JOINTS accessors used by another skin."""
+    owner = {}
+    shared = set(range(len(gltf.get("skins", [])))) - set(prims)
+    for si, plist in prims.items():
+        for prim in plist:
+            for k, a in prim["attributes"].items():
+                if k.startswith("JOINTS_"):
+                    if owner.setdefault(a, si) != si:
+                        shared.update((si, owner[a]))
+    return shared
+
+
+def influence(gltf, binc, prims):
+    """{node: largest single vertex weight it receives under any skin}."""
+    out = {}
+    for si, plist in prims.items():
+        joints = gltf["skins"][si]["joints"]
+        best = np.zeros(len(joints))
+        for prim in plist:
+            j, w = skin_weights(gltf, binc, prim)
+            np.maximum.at(best, j.reshape(-1), w.reshape(-1))
+        for slot, node in enumerate(joints):
+            out[node] = max(out.get(node, 0.0), float(best[slot]))
+    return out
+
+
+def prunable(gltf, binc, prims, min_weight, keep):
+    """Set of joint nodes to delete: negligible, leaf-closed, not protected."""
+    nodes = gltf.get("nodes", [])
+    parent = {c: i for i, n in enumerate(nodes) for c in n.get("children", [])}
+    skip = skipped_skins(gltf, prims)
+    skins_of = {}
+    for si, skin in enumerate(gltf.get("skins", [])):
+        for j in skin["joints"]:
+            skins_of.setdefault(j, []).append(si)
+    protected = {skin["skeleton"] for skin in gltf.get("skins", []) if "skeleton" in skin}
+    weight = influence(gltf, binc, prims)
+
+    def candidate(ni):
+        node = nodes[ni]
+        if ni not in skins_of or ni in protected or node.get("name") in keep:
+            return False
+        if "mesh" in node or "camera" in node or weight.get(ni, 0.0) >= min_weight:
+            return False
+        # the nearest kept ancestor must be a joint of every skin using ni
+        return all(si not in skip and parent.get(ni) in gltf["skins"][si]["joints"]
+                   for si in skins_of[ni])
+
+    memo = {}
+
+    def visit(ni):
+        if ni not in memo:
+            kids = [visit(c) for c in nodes[ni].get("children", [])]
+            memo[ni] = candidate(ni) and all(kids)
+        return memo[ni]
+
+    for ni in range(len(nodes)):
+        visit(ni)
+    return {ni for ni, ok in memo.items() if ok}
+
+
+def merge_slots(j, w):
+    """Sum slots naming the same joint, sort by weight, zero slots -> joint 0."""
+    k = j.shape[1]
+    for a in range(k):
+        for b in range(a + 1, k):
+            same = (j[:, a] == j[:, b]) & (w[:, b] > 0)
+            w[same, a] += w[same, b]
+            w[same, b] = 0
+    order = np.argsort(-w, 1, kind="stable")
+    j = np.take_along_axis(j, order, 1)
+    w = np.take_along_axis(w, order, 1)
+    j[w == 0] = 0
+    return j, w
+
+
+def fold_skin(gltf, binc, si, plist, pruned, parent, done):
+    """Reassign pruned joints' weights to kept ancestors, shorten the skin."""
+    skin = gltf["skins"][si]
+    joints = skin["joints"]
+    kept = [j for j in joints if j not in pruned]
+    if len(kept) == len(joints):
+        return len(joints), len(kept)
+    new_slot = {j: i for i, j in enumerate(kept)}
+    remap = np.zeros(len(joints), np.int64)
+    for slot, j in enumerate(joints):
+        while j not in new_slot:
+            j = parent[j]
+        remap[slot] = new_slot[j]
+    for prim in plist:
+        attrs = prim["attributes"]
+        if attrs["JOINTS_0"] in done:
+            continue
+        done.add(attrs["JOINTS_0"])
+        j, w = skin_weights(gltf, binc, prim)
+        acc = gltf["accessors"]
+        j, w = merge_slots(remap[j], w)
+        # quantize all sets at once so integer rows still sum to 255/65535
+        w = store_weights(w, np.dtype(DTYPE[acc[attrs["WEIGHTS_0"]]["componentType"]]))
+        n = 0
+        while f"JOINTS_{n}" in attrs:
+            ja, wa = attrs[f"JOINTS_{n}"], attrs[f"WEIGHTS_{n}"]
+            cols = slice(4 * n, 4 * n + 4)
+            jdt = DTYPE[acc[ja]["componentType"]]
+            replace_accessor(gltf, binc, ja, j[:, cols].astype(jdt), target=ARRAY_BUFFER)
+            replace_accessor(gltf, binc, wa, w[:, cols], target=ARRAY_BUFFER,
+                             normalized=acc[wa].get("normalized", False))
+            n += 1
+    if "inverseBindMatrices" in skin:
+        ibm = read_accessor(gltf, binc, skin["inverseBindMatrices"])
+        rows = [slot for slot, j in enumerate(joints) if j not in pruned]
+        skin["inverseBindMatrices"] = add_accessor(gltf, binc, ibm[rows])
+    skin["joints"] = kept
+    return len(joints), len(kept)
+
+
+def is_static(gltf, binc, anim, ch):
+    """Channel holding its node's rest value for the whole clip."""
+    path = ch["target"]["path"]
+    node = gltf["nodes"][ch["target"]["node"]]
+    smp = anim["samplers"][ch["sampler"]]
+    if path not in REST or "matrix" in node or smp.get("interpolation") == "CUBICSPLINE":
+        return False
+    out = read_accessor(gltf, binc, smp["output"], normalize=True).astype(np.float64)
+    rest = np.array(node.get(path, REST[path]))
+    if path == "rotation":
+        # angle of rest^-1 * q; atan2 stays exact near 0 where acos(|dot|) does not
+        rel = quat_mul(rest * [-1, -1, -1, 1], out)
+        angle = 2 * np.arctan2(np.linalg.norm(rel[:, :3], axis=1), np.abs(rel[:, 3]))
+        return bool(np.all(angle < STATIC_ROT_TOL))
+    return bool(np.all(np.abs(out - rest) < STATIC_TOL * max(1.0, np.abs(rest).max())))
+
+
+def static_channels(gltf, binc):
+    """{(node, path)} whose channels are static in every clip animating them."""
+    verdict = {}
+    for anim in gltf.get("animations", []):
+        for ch in anim.get("channels", []):
+            if "node" not in ch["target"]:
+                continue
+            key = (ch["target"]["node"], ch["target"]["path"])
+            if verdict.get(key, True):
+                verdict[key] = is_static(gltf, binc, anim, ch)
+    return {k for k, v in verdict.items() if v}
+
+
+def prune(gltf, binc, min_weight=0.01, keep=(), drop_static=True):
+    """Returns (skin rows, clip rows) for the report."""
+    nodes = gltf.get("nodes", [])
+    names = [n.get("name", f"node_{i}") for i, n in enumerate(nodes)]
+    parent = {c: i for i, n in enumerate(nodes) for c in n.get("children", [])}
+    prims = skinned_primitives(gltf)
+    pruned = prunable(gltf, binc, prims, min_weight, set(keep))
+    static = static_channels(gltf, binc) if drop_static else set()
+
+    skin_rows, done = [], set()
+    for si, skin in enumerate(gltf.get("skins", [])):
+        gone = [names[j] for j in skin["joints"] if j in pruned]
+        before, after = fold_skin(gltf, binc, si, prims.get(si, []), pruned, parent, done)
+        skin_rows.append((skin.get("name", f"skin_{si}"), before, after, gone))
+
+    def dead(ch):
+        node = ch["target"].get("node")
+        return (node, ch["target"]["path"]) in static and node not in pruned
+
+    clip_rows = []
+    for ai, anim in enumerate(gltf.get("animations", [])):
+        chans = anim.get("channels", [])
+        by_joint = sum(ch["target"].get("node") in pruned for ch in chans)
+        before = len(chans)
+        live = [ch for ch in chans if ch["target"].get("node") not in pruned]
+        # a clip holding only the rest pose (T-pose / reset clip) is kept whole
+        rest_pose = bool(live) and all(dead(ch) for ch in live)
+        if not rest_pose:
+            drop_channels(anim, dead)
+        clip_rows.append([anim.get("name", f"clip_{ai}"), before, by_joint,
+                          before - len(anim["channels"]), rest_pose])
+    remove_nodes(gltf, pruned)
+    anims = gltf.get("animations", [])
+    for row, anim in zip(clip_rows, anims):
+        row.insert(4, len(anim["channels"]))
+    # channels are required: clips that only animated pruned joints go
+    if any(not anim["channels"] for anim in anims):
+        gltf["animations"] = [anim for anim in anims if anim["channels"]]
+        if not gltf["animations"]:
+            del gltf["animations"]
+    return skin_rows, clip_rows
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--min-weight", type=float, default=0.01,
+                   help="prune joints whose largest vertex weight is below this (default 0.01)")
+    p.add_argument("--keep", nargs="+", default=[], metavar="NAME",
+                   help="joint names never pruned (attach points, look-at targets)")
+    p.add_argument("--keep-static", action="store_true",
+                   help="leave channels that only hold the rest pose")
+    a = p.parse_args()
+    gltf, binc = read_glb(a.input)
+    t0 = time.perf_counter()
+    skin_rows, clip_rows = prune(gltf, binc, a.min_weight, a.keep, not a.keep_static)
+    dt = time.perf_counter() - t0
+    for name, before, after, gone in skin_rows:
+        shown = ", ".join(gone[:6]) + (f", +{len(gone) - 6}" if len(gone) > 6 else "")
+        print(f"  skin '{name}': {before} -> {after} joints"
+              + (f" (pruned: {shown})" if gone else ""))
+    for name, before, by_joint, static, after, rest_pose in clip_rows:
+        note = (", rest pose kept" if rest_pose else "") + (", clip removed" if not after else "")
+        print(f"  clip '{name}': {before} -> {after} channels "
+              f"({by_joint} pruned joints, {static} static{note})")
+    joints = sum(b - a_ for _, b, a_, _ in skin_rows)
+    channels = sum(r[1] - r[4] for r in clip_rows)
+    write_glb(a.output, gltf, compact_bin(gltf, binc))
+    print(f"done: {a.output} — {joints} joints, {channels} channels removed, {dt:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""glb_quantize.py — KHR_mesh_quantization pass for generated meshes
+(numpy + stdlib, no Blender).
+
+fbx2glb.py / rig_transfer.py export every vertex as float32 position,
+normal, UV and skin weights (48+ bytes). Per vertex attribute this pass
+stores:
+  POSITION     int16 (int8 with --position-bits <= 8; integer grid over
+               the bbox); the dequantization
+               (translate + uniform scale) goes into the inverse bind
+               matrices for skinned meshes (skinned node transforms are
+               ignored by glTF) or into a new child node otherwise;
+  NORMAL       normalized int8 (VEC3, padded to a 4-byte stride);
+  TANGENT      normalized int8 (VEC4);
+  TEXCOORD_n   normalized uint16 when all UVs lie in [0, 1] (else float);
+  COLOR_n      normalized uint8;
+  WEIGHTS_n    normalized uint8, a vertex's weights over ALL sets
+               re-summed to exactly 255;
+  JOINTS_n     uint8 when the skin has <= 256 joints.
+Morph targets stay float (allowed by the extension); their POSITION deltas
+are divided by the same grid step, since the dequantization scales them
+too. Meshes sharing vertex buffers (e.g. glb_simplify.py LODs) or a skin
+share one transform. Meshes drawn by an EXT_mesh_gpu_instancing node keep
+float positions (reported): a dequantization child would either lose the
+instances or scale the mesh under the instance transforms.
+KHR_mesh_quantization is declared required; the max error against the
+original is printed per attribute (skinned characters: ~2.5x smaller).
+
+Usage:
+    python3 glb_quantize.py in.glb out.glb [--position-bits 16]
+"""
+import argparse
+
+import numpy as np
+
+from glb_arrays import ARRAY_BUFFER, add_accessor, read_accessor, replace_accessor
+from glb_merge_anims import compact_bin, read_glb, write_glb
+from glb_pose import store_weights
+
+EXT = "KHR_mesh_quantization"
+INSTANCING = "EXT_mesh_gpu_instancing"
+
+
+def dequant_matrix(center, step):
+    d = np.eye(4)
+    d[:3, :3] *= step
+    d[:3, 3] = center
+    return d
+
+
+def mesh_groups(gltf):
+    """Union meshes sharing a POSITION accessor or a skin.
+
+    Returns a list of (mesh set, skins used, used by an unskinned node).
+    """
+    parent = list(range(len(gltf.get("meshes", []))))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    owner = {}
+    for mi, mesh in enumerate(gltf.get("meshes", [])):
+        for prim in mesh["primitives"]:
+            a = prim["attributes"].get("POSITION")
+            if a in owner:
+                parent[find(mi)] = find(owner[a])
+            owner.setdefault(a, mi)
+    skin_mesh = {}
+    for node in gltf.get("nodes", []):
+        if "mesh" in node and "skin" in node:
+            s = node["skin"]
+            if s in skin_mesh:
+                parent[find(node["mesh"])] = find(skin_mesh[s])
+            skin_mesh.setdefault(s, node["mesh"])
+    groups = {}
+    for mi in range(len(parent)):
+        groups.setdefault(find(mi), set()).add(mi)
+    info = []
+    for meshes in groups.values():
+        skins, plain = set(), False
+        for node in gltf.get("nodes", []):
+            if node.get("mesh") in meshes:
+                if "skin" in node:
+                    skins.add(node["skin"])
+                else:
+                    plain = True
+        info.append((meshes, skins, plain))
+    return info
+
+
+def weights_animated(gltf):
+    return {ch["target"].get("node") for a in gltf.get("animations", [])
+            for ch in a["channels"] if ch["target"]["path"] == "weights"}
+
+
+def quantize_positions(gltf, binc, bits, report):
+    qmax = (1 << (bits - 1)) - 1
+    qtype = np.int8 if bits <= 8 else np.int16
+    rescaled = set()
+    morphing = weights_animated(gltf)
+    for meshes, skins, plain in mesh_groups(gltf):
+        nodes = [ni for ni, n in enumerate(gltf.get("nodes", []))
+                 if n.get("mesh") in meshes]
+        instanced = any(INSTANCING in gltf["nodes"][ni].get("extensions", {})
+                        for ni in nodes)
+        if not nodes or (skins and plain) or (plain and morphing & set(nodes)) or instanced:
+            names = [gltf["meshes"][m].get("name", m) for m in meshes]
+            print(f"  positions of {names} kept float (mixed skinned/static "
+                  f"use, animated morph weights or {INSTANCING} on the mesh node)")
+            continue
+        accs = sorted({p["attributes"]["POSITION"] for m in meshes
+                       for p in gltf["meshes"][m]["primitives"]})
+        data = {a: read_accessor(gltf, binc, a, normalize=True).astype(np.float64)
+                for a in accs}
+        lo = np.min([d.min(0) for d in data.values()], 0)
+        hi = np.max([d.max(0) for d in data.values()], 0)
+        center = (lo + hi) / 2
+        step = max(float((hi - lo).max()) / 2 / qmax, 1e-12)
+        err = 0.0
+        for a, d in data.items():
+            q = np.round((d - center) / step).astype(qtype)
+            replace_accessor(gltf, binc, a, q, target=ARRAY_BUFFER, minmax=True)
+            err = max(err, float(np.abs(q * step + center - d).max()))
+        report.append(("POSITION", err, float(np.linalg.norm(hi - lo))))
+        # morph deltas go through the same scale (no translation)
+        for m in meshes:
+            for prim in gltf["meshes"][m]["primitives"]:
+                for target in prim.get("targets", []):
+                    a = target.get("POSITION")
+                    if a is None or a in rescaled:
+                        continue
+                    rescaled.add(a)
+                    d = read_accessor(gltf, binc, a, normalize=True).astype(np.float64)
+                    replace_accessor(gltf, binc, a, (d / step).astype(np.float32),
+                                     target=ARRAY_BUFFER, minmax=True)
+        dq = dequant_matrix(center, step)
+        if skins:
+            for s in skins:
+                skin = gltf["skins"][s]
+                n = len(skin["joints"])
+                if "inverseBindMatrices" in skin:
+                    ibm = read_accessor(gltf, binc, skin["inverseBindMatrices"])
+                    m = ibm.reshape(n, 4, 4).transpose(0, 2, 1).astype(np.float64)
+                else:
+                    m = np.tile(np.eye(4), (n, 1, 1))
+                new = (m @ dq).transpose(0, 2, 1).reshape(n, 16).astype(np.float32)
+                if "inverseBindMatrices" in skin:
+                    replace_accessor(gltf, binc, skin["inverseBindMatrices"], new)
+                else:
+                    skin["inverseBindMatrices"] = add_accessor(gltf, binc, new)
+        else:
+            for ni in nodes:
+                node = gltf["nodes"][ni]
+                child = {"name": f"{node.get('name', f'node_{ni}')}_dequant",
+                         "mesh": node.pop("mesh"),
+                         "translation": [float(c) for c in center],
+                         "scale": [step] * 3}
+                if "weights" in node:
+                    child["weights"] = node.pop("weights")
+                gltf["nodes"].append(child)
+                node.setdefault("children", []).append(len(gltf["nodes"]) - 1)
+
+
+def quantize_attribute(gltf, binc, name, a, joint_count):
+    """Quantize one non-position attribute accessor; returns max error or None."""
+    acc = gltf["accessors"][a]
+    if acc["componentType"] != 5126 and not name.startswith("JOINTS"):
+        return None
+    d = read_accessor(gltf, binc, a, normalize=True)
+    if name in ("NORMAL", "TANGENT"):
+        q = np.round(np.clip(d, -1, 1) * 127).astype(np.int8)
+        replace_accessor(gltf, binc, a, q, target=ARRAY_BUFFER, normalized=True)
+        return float(np.abs(q / 127.0 - d).max())
+    if name.startswith("TEXCOORD"):
+        if d.size and (d.min() < 0 or d.max() > 1):
+            return None
+        q = np.round(d * 65535).astype(np.uint16)
+        replace_accessor(gltf, binc, a, q, target=ARRAY_BUFFER, normalized=True)
+        return float(np.abs(q / 65535.0 - d).max())
+    if name.startswith("COLOR"):
+        q = np.round(np.clip(d, 0, 1) * 255).astype(np.uint8)
+        replace_accessor(gltf, binc, a, q, target=ARRAY_BUFFER, normalized=True)
+        return float(np.abs(q / 255.0 - d).max())
+    if name.startswith("JOINTS"):
+        if joint_count > 256 or acc["componentType"] == 5121:
+            return None
+        replace_accessor(gltf, binc, a, d.astype(np.uint8), target=ARRAY_BUFFER)
+        return 0.0
+    return None
+
+
+def quantize_weights(gltf, binc, prim, done):
+    """Quantize all WEIGHTS_n sets of a primitive together; returns max error or None.
+
+    Rows are normalized across every set (as glb_pose.skin_weights reads
+    them), so a vertex's weights sum to 255 in total, not 255 per set.
+    """
+    attrs = prim["attributes"]
+    accs = []
+    while f"WEIGHTS_{len(accs)}" in attrs:
+        accs.append(attrs[f"WEIGHTS_{len(accs)}"])
+    if not accs or any(a in done for a in accs):
+        return None
+    done.update(accs)
+    if any(gltf["accessors"][a]["componentType"] != 5126 for a in accs):
+        return None
+    sets = [read_accessor(gltf, binc, a).astype(np.float64) for a in accs]
+    d = np.concatenate(sets, 1)
+    w = np.clip(d, 0, None)
+    s = w.sum(1, keepdims=True)
+    q = store_weights(np.divide(w, s, out=np.zeros_like(w), where=s > 0), np.dtype(np.uint8))
+    col = 0
+    for a, part in zip(accs, sets):
+        replace_accessor(gltf, binc, a, q[:, col: col + part.shape[1]],
+                         target=ARRAY_BUFFER, normalized=True)
+        col += part.shape[1]
+    return float(np.abs(q / 255.0 - d).max())
+
+
+def quantize(gltf, binc, bits):
+    report = []
+    quantize_positions(gltf, binc, bits, report)
+    joints = {}
+    for node in gltf.get("nodes", []):
+        if "mesh" in node and "skin" in node:
+            n = len(gltf["skins"][node["skin"]]["joints"])
+            joints[node["mesh"]] = max(joints.get(node["mesh"], 0), n)
+    done = set()
+    errors = {}
+    for mi, mesh in enumerate(gltf.get("meshes", [])):
+        for prim in mesh["primitives"]:
+            err = quantize_weights(gltf, binc, prim, done)
+            if err is not None:
+                errors["WEIGHTS_n"] = max(errors.get("WEIGHTS_n", 0.0), err)
+            for name, a in prim["attributes"].items():
+                if name == "POSITION" or name.startswith("WEIGHTS") or a in done:
+                    continue
+                done.add(a)
+                # unknown joint count (mesh never skinned): keep joints as is
+                err = quantize_attribute(gltf, binc, name, a, joints.get(mi, 1 << 16))
+                if err is not None:
+                    errors[name] = max(errors.get(name, 0.0), err)
+    report.extend((k, v, None) for k, v in errors.items())
+    if report:
+        for key in ("extensionsUsed", "extensionsRequired"):
+            lst = gltf.setdefault(key, [])
+            if EXT not in lst:
+                lst.append(EXT)
+    return report
+
+
+def vertex_bytes(gltf):
+    accs = {a for mesh in gltf.get("meshes", []) for prim in mesh["primitives"]
+            for a in prim["attributes"].values()}
+    total = 0
+    for a in accs:
+        acc = gltf["accessors"][a]
+        bv = gltf["bufferViews"][acc["bufferView"]]
+        total += acc["count"] * bv["byteStride"] if "byteStride" in bv else bv["byteLength"]
+    return total
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--position-bits", type=int, default=16, choices=range(8, 17),
+                   metavar="{8..16}", help="position grid resolution (default 16)")
+    a = p.parse_args()
+    gltf, binc = read_glb(a.input)
+    before = vertex_bytes(gltf)
+    report = quantize(gltf, binc, a.position_bits)
+    out = compact_bin(gltf, binc)
+    after = vertex_bytes(gltf)
+    for name, err, extent in report:
+        rel = f" ({err / extent:.2e} of bbox diagonal)" if extent else ""
+        print(f"  {name:<12} max error {err:.6f}{rel}")
+    write_glb(a.output, gltf, out)
+    print(f"vertex data: {before} -> {after} bytes "
+          f"({before / max(after, 1):.2f}x smaller)")
+    print(f"done: {a.output}")
+
+
+if __name__ == "__main__":
+    main()
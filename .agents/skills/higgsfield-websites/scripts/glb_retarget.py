@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""glb_retarget.py — retarget clips between two rigged GLBs
+(numpy + stdlib, no Blender).
+
+rig_transfer.py rebinds a whole donor skeleton in Blender; when both files
+are already rigged (Mixamo / Meshy / Rigify-style names) only the clips
+have to move. Per donor clip:
+  1. bones are paired by exact name, then through the alias tables below
+     (mixamorig:LeftUpLeg == LeftUpLeg == upperleg.l == thigh_l ...), then
+     by --map donor=target overrides;
+  2. every pair gets a rest alignment A (the swing taking the target bone's
+     rest direction onto the donor's, so A-pose and T-pose rigs match), and
+     the donor's world-space rotation delta from its rest pose is applied:
+         W_target(t) = W_donor(t) * W_donor_rest^-1 * A * W_target_rest
+     then turned back into target-local quaternions along the target
+     hierarchy (unpaired bones keep their rest rotation);
+  3. the root (hips) translation delta is scaled by target/donor leg length
+     (hip -> knee -> ankle; hips height as fallback) — the same idea as
+     fix_root_scale() in glb_merge_anims.py. Donor scale channels (the Meshy
+     baked root-scale bug) are ignored.
+Clips are sampled at the union of the donor's key times and written as
+LINEAR samplers into the target (same-named clips replaced).
+
+Usage:
+    python3 glb_retarget.py target.glb donor.glb out.glb [--clips Walk,Run]
+        [--map donorBone=targetBone ...] [--no-align]
+"""
+import argparse
+import re
+
+import numpy as np
+
+from glb_arrays import add_accessor, read_accessor
+from glb_merge_anims import compact_bin, read_glb, write_glb
+from glb_pose import matrix_to_quat, rotation_part, world_poses
+
+# canonical bone -> aliases (normalized: lowercase, no separators/prefix)
+CENTER = {
+    "hips": ["hips", "pelvis", "hip"],
+    "spine": ["spine", "spine0", "spine00", "torso"],
+    "chest": ["spine1", "spine01", "chest"],
+    "upperchest": ["spine2", "spine02", "upperchest"],
+    "neck": ["neck", "neck1", "neck01"],
+    "head": ["head"],
+}
+SIDED = {
+    "shoulder": ["shoulder", "clavicle", "collar"],
+    "upperarm": ["arm", "upperarm"],
+    "lowerarm": ["forearm", "lowerarm", "elbow"],
+    "hand": ["hand", "wrist"],
+    "upperleg": ["upleg", "upperleg", "thigh"],
+    "lowerleg": ["leg", "lowerleg", "shin", "calf", "knee"],
+    "foot": ["foot", "ankle"],
+    "toes": ["toebase", "toes", "toe", "ball"],
+}
+
+
+def alias_table():
+    table = {}
+    for canon, names in CENTER.items():
+        for n in names:
+            table[n] = canon
+    for canon, names in SIDED.items():
+        for side, full, short in (("left", "left", "l"), ("right", "right", "r")):
+            for n in names:
+                for form in (full + n, n + full, short + n, n + short):
+                    table.setdefault(form, side + canon)
+    return table
+
+
+ALIASES = alias_table()
+
+
+def normalize(name):
+    name = name.rsplit(":", 1)[-1].rsplit("|", 1)[-1].lower()
+    name = re.sub(r"^mixamorig", "", name)
+    return re.sub(r"[^a-z0-9]", "", name)
+
+
+def canonical(name):
+    return ALIASES.get(normalize(name))
+
+
+def skeleton_nodes(gltf):
+    joints = {j for s in gltf.get("skins", []) for j in s["joints"]}
+    if not joints:
+        joints = {ch["target"]["node"] for a in gltf.get("animations", [])
+                  for ch in a["channels"] if "node" in ch["target"]}
+    return sorted(joints)
+
+
+def bone_pairs(donor, target, overrides):
+    """-> {target node: donor node} and {target node: canonical name}."""
+    d_nodes, t_nodes = skeleton_nodes(donor), skeleton_nodes(target)
+    d_by_name = {donor["nodes"][i].get("name"): i for i in d_nodes}
+    d_by_canon = {}
+    for i in d_nodes:
+        c = canonical(donor["nodes"][i].get("name", ""))
+        if c:
+            d_by_canon.setdefault(c, i)
+    t_by_name = {target["nodes"][i].get("name"): i for i in t_nodes}
+    pairs, canon = {}, {}
+    for ti in t_nodes:
+        name = target["nodes"][ti].get("name", "")
+        c = canonical(name)
+        if c:
+            canon[ti] = c
+        if name in d_by_name:
+            pairs[ti] = d_by_name[name]
+        elif c in d_by_canon:
+            pairs[ti] = d_by_canon[c]
+    for spec in overrides:
+        dn, _, tn = spec.partition("=")
+        if dn not in d_by_name or tn not in t_by_name:
+            raise SystemExit(f"--map {spec}: bone not found in donor/target skeleton")
+        pairs[t_by_name[tn]] = d_by_name[dn]
+    for ti, di in pairs.items():
+        canon.setdefault(ti, canonical(donor["nodes"][di].get("name", "")))
+    return pairs, canon
+
+
+def swing(a, b):
+    """Rotation matrix taking unit direction a onto unit direction b."""
+    v, c = np.cross(a, b), float(np.dot(a, b))
+    if c < -1 + 1e-9:
+        axis = np.cross(a, [1, 0, 0] if abs(a[0]) < 0.9 else [0, 1, 0])
+        axis /= np.linalg.norm(axis)
+        return 2 * np.outer(axis, axis) - np.eye(3)
+    k = np.array([[0, -v[2], v[1]], [v[2], 0, -v[0]], [-v[1], v[0], 0]])
+    return np.eye(3) + k + k @ k / (1 + c)
+
+
+def rest_alignment(target, pairs, d_rest, t_rest, align):
+    """Per paired target bone: A (3x3) mapping target rest onto donor rest."""
+    children = {i: n.get("children", []) for i, n in enumerate(target["nodes"])}
+    parent = {c: i for i, cs in children.items() for c in cs}
+    out = {}
+
+    def get(ti):
+        if ti in out:
+            return out[ti]
+        a = np.eye(3)
+        if align:
+            kids = [c for c in children[ti] if c in pairs]
+            if kids:
+                dt = t_rest[kids[0], :3, 3] - t_rest[ti, :3, 3]
+                dd = d_rest[pairs[kids[0]], :3, 3] - d_rest[pairs[ti], :3, 3]
+                if np.linalg.norm(dt) > 1e-9 and np.linalg.norm(dd) > 1e-9:
+                    a = swing(dt / np.linalg.norm(dt), dd / np.linalg.norm(dd))
+            else:
+                p = parent.get(ti)
+                while p is not None and p not in pairs:
+                    p = parent.get(p)
+                if p is not None:
+                    a = get(p)  # leaf: keep its rest offset to the parent
+        out[ti] = a
+        return a
+
+    for ti in pairs:
+        get(ti)
+    return out
+
+
+def leg_length(rest, nodes_by_canon):
+    lengths = []
+    for side in ("left", "right"):
+        chain = [nodes_by_canon.get(side + c) for c in ("upperleg", "lowerleg", "foot")]
+        if None not in chain:
+            p = rest[chain, :3, 3]
+            lengths.append(np.linalg.norm(p[1] - p[0]) + np.linalg.norm(p[2] - p[1]))
+    return float(np.mean(lengths)) if lengths else None
+
+
+def root_scale(pairs, canon, d_rest, t_rest, root):
+    t_canon = {c: ti for ti, c in canon.items() if c}
+    d_canon = {c: pairs[ti] for c, ti in t_canon.items() if ti in pairs}
+    lt, ld = leg_length(t_rest, t_canon), leg_length(d_rest, d_canon)
+    if lt and ld:
+        return lt / ld, "leg length"
+    # fallback: hips height above the lowest paired joint
+    ht = t_rest[root, 1, 3] - min(t_rest[t, 1, 3] for t in pairs)
+    hd = d_rest[pairs[root], 1, 3] - min(d_rest[d, 1, 3] for d in pairs.values())
+    return (ht / hd if hd > 1e-9 else 1.0), "hips height"
+
+
+def key_times(donor, dbin, anim):
+    times = [read_accessor(donor, dbin, s["input"]) for s in anim["samplers"]]
+    return np.unique(np.concatenate(times).astype(np.float64))
+
+
+def retarget_clip(target, tbin, donor, dbin, anim, pairs, align_m, root, scale, t_rest, d_rest):
+    times = key_times(donor, dbin, anim)
+    dw = world_poses(donor, dbin, anim, times)             # (F, Nd, 4, 4)
+    d_idx = np.array([pairs[t] for t in pairs])
+    delta = rotation_part(dw[:, d_idx]) @ rotation_part(d_rest[d_idx]).transpose(0, 2, 1)
+    want = {}
+    for k, ti in enumerate(pairs):
+        want[ti] = delta[:, k] @ align_m[ti] @ rotation_part(t_rest[ti])
+
+    nodes = target["nodes"]
+    parent = {c: i for i, n in enumerate(nodes) for c in n.get("children", [])}
+    F = len(times)
+    world = {}
+
+    def world_rot(i):
+        if i not in world:
+            if i in want:
+                world[i] = want[i]
+            elif i in parent:
+                world[i] = world_rot(parent[i]) @ rotation_part(t_rest[parent[i]]).T \
+                    @ rotation_part(t_rest[i])
+            else:
+                world[i] = np.broadcast_to(rotation_part(t_rest[i]), (F, 3, 3))
+        return world[i]
+
+    channels = []
+    for ti in pairs:
+        p_rot = world_rot(parent[ti]) if ti in parent else np.eye(3)
+        local = np.swapaxes(p_rot, -1, -2) @ want[ti]
+        q = matrix_to_quat(local)
+        flip = np.cumprod(np.sign((q[1:] * q[:-1]).sum(1) + 1e-12))
+        q[1:] *= flip[:, None]
+        channels.append((ti, "rotation", q))
+
+    # root translation: scaled world delta, back into the root's parent frame
+    dp = dw[:, pairs[root], :3, 3] - d_rest[pairs[root], :3, 3]
+    p_world = t_rest[root, :3, 3] + scale * dp
+    p_mat = t_rest[parent[root]] if root in parent else np.eye(4)
+    local_t = (np.c_[p_world, np.ones(F)] @ np.linalg.inv(p_mat).T)[:, :3]
+    channels.append((root, "translation", local_t))
+
+    t_acc = add_accessor(target, tbin, times.astype(np.float32), minmax=True)
+    out = {"name": anim.get("name", "clip"), "channels": [], "samplers": []}
+    for node, path, values in channels:
+        out["samplers"].append({"input": t_acc, "interpolation": "LINEAR",
+                                "output": add_accessor(target, tbin, values.astype(np.float32))})
+        out["channels"].append({"sampler": len(out["samplers"]) - 1,
+                                "target": {"node": node, "path": path}})
+    return out, F
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("target", help="rigged GLB that receives the clips")
+    p.add_argument("donor", help="rigged GLB with the clips")
+    p.add_argument("output")
+    p.add_argument("--clips", help="comma list of donor clip names (default: all)")
+    p.add_argument("--map", nargs="*", default=[], metavar="DONOR=TARGET",
+                   help="extra bone pairs, override the name tables")
+    p.add_argument("--no-align", action="store_true",
+                   help="skip the rest-pose swing alignment (identical rest poses)")
+    a = p.parse_args()
+    target, tbin = read_glb(a.target)
+    donor, dbin = read_glb(a.donor)
+    pairs, canon = bone_pairs(donor, target, a.map)
+    if not pairs:
+        raise SystemExit("no bones paired — add --map donor=target pairs")
+    t_rest = world_poses(target, tbin, None, [0.0])[0]
+    d_rest = world_poses(donor, dbin, None, [0.0])[0]
+    roots = [ti for ti in pairs if canon.get(ti) == "hips"]
+    if not roots:
+        # topmost paired bone
+        parent = {c: i for i, n in enumerate(target["nodes"]) for c in n.get("children", [])}
+        depth = {}
+        for ti in pairs:
+            d, i = 0, ti
+            while i in parent:
+                d, i = d + 1, parent[i]
+            depth[ti] = d
+        roots = [min(depth, key=depth.get)]
+    root = roots[0]
+    scale, how = root_scale(pairs, canon, d_rest, t_rest, root)
+    align_m = rest_alignment(target, pairs, d_rest, t_rest, not a.no_align)
+    unpaired = len(skeleton_nodes(target)) - len(pairs)
+    print(f"paired {len(pairs)} bones ({unpaired} target bones unpaired); "
+          f"root '{target['nodes'][root].get('name')}' translation x{scale:.4f} ({how})")
+
+    names = a.clips.split(",") if a.clips else None
+    clips = [an for an in donor.get("animations", [])
+             if names is None or an.get("name") in names]
+    if names:
+        missing = set(names) - {an.get("name") for an in clips}
+        if missing:
+            raise SystemExit(f"donor has no clips {sorted(missing)}")
+    new = []
+    for anim in clips:
+        out, frames = retarget_clip(target, tbin, donor, dbin, anim, pairs,
+                                    align_m, root, scale, t_rest, d_rest)
+        new.append(out)
+        print(f"  '{out['name']}': {frames} keys, {len(out['channels'])} channels")
+    taken = {an["name"] for an in new}
+    target["animations"] = [an for an in target.get("animations", [])
+                            if an.get("name") not in taken] + new
+    write_glb(a.output, target, compact_bin(target, tbin))
+    print(f"done: {a.output} ({len(target['animations'])} clips)")
+
+
+if __name__ == "__main__":
+    main()
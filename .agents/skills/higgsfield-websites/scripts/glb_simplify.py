@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""glb_simplify.py — quadric-error (QEM) simplifier + LOD chain for GLB
+meshes (numpy + stdlib, no Blender).
+
+Generated characters/props are often 100k–500k triangles. This pass
+builds a LOD chain (default 100% / 50% / 20% / 5% of the triangles) per
+TRIANGLES primitive and writes it as MSFT_lod: the LOD levels are extra
+meshes on extra nodes (same skin), listed in the base node's
+extensions.MSFT_lod.ids, with extras.MSFT_screencoverage thresholds. A
+plain extras manifest (extras.lod on the base node: ratio, triangles,
+error) is written too, for loaders that ignore MSFT_lod.
+
+Algorithm: batched half-edge collapses. Each pass prices every edge u->v
+with the accumulated quadrics Q[u]+Q[v] evaluated at v, rejects collapses
+that flip a face, open a border or tear a UV seam, then greedily applies
+an independent set of the cheapest ones. Half-edge collapses keep v's
+vertex as is, so UVs, normals and JOINTS_0/WEIGHTS_0 stay exact and every
+LOD only needs a new index buffer — vertex buffers are shared with LOD0.
+
+Geometric error per level = sqrt(max collapse cost), in mesh units and
+relative to the bbox diagonal; screen coverage is where that error
+projects to --pixels-error pixels on a --screen-height display.
+
+Usage:
+    python3 glb_simplify.py in.glb out.glb [--levels 1,0.5,0.2,0.05]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from glb_arrays import (ELEMENT_ARRAY_BUFFER, add_accessor, index_array,
+                        read_accessor, triangles)
+from glb_merge_anims import compact_bin, read_glb, write_glb
+
+BORDER_WEIGHT = 10.0  # seam/border planes vs surface planes
+PASS_FRACTION = 0.2   # max share of live vertices collapsed per pass
+
+
+def weld_positions(pos):
+    """wedge (glTF vertex) -> unique position index, unique positions."""
+    keys = np.ascontiguousarray(pos.astype(np.float32)).view(np.uint32)
+    uniq, wedge_pos = np.unique(keys, axis=0, return_inverse=True)
+    return wedge_pos.reshape(-1), uniq.view(np.float32).astype(np.float64)
+
+
+def plane_quadrics(pts, normals, weights):
+    """(n,4,4) quadrics of planes through pts with unit normals."""
+    planes = np.concatenate([normals, -(normals * pts).sum(1, keepdims=True)], 1)
+    return weights[:, None, None] * planes[:, :, None] * planes[:, None, :]
+
+
+def initial_quadrics(P, wtris, wedge_pos):
+    pt = wedge_pos[wtris]
+    a, b, c = P[pt[:, 0]], P[pt[:, 1]], P[pt[:, 2]]
+    n = np.cross(b - a, c - a)
+    ln = np.linalg.norm(n, axis=1)
+    ok = ln > 1e-20
+    n[ok] /= ln[ok, None]
+    Q = np.zeros((len(P), 4, 4))
+    fq = plane_quadrics(a, n, ok.astype(np.float64))
+    for k in range(3):
+        np.add.at(Q, pt[:, k], fq)
+    # border + UV-seam edges: a wedge edge seen once per side
+    we = np.stack([wtris, np.roll(wtris, -1, 1)], -1).reshape(-1, 2)
+    pe = wedge_pos[we]
+    wkey = np.sort(we, 1)
+    _, winv, wcnt = np.unique(wkey[:, 0] * (wtris.max() + 1) + wkey[:, 1],
+                              return_inverse=True, return_counts=True)
+    edge_once = wcnt[winv] == 1
+    if edge_once.any():
+        ea, eb = P[pe[edge_once, 0]], P[pe[edge_once, 1]]
+        fn = np.repeat(n, 3, 0)[edge_once]
+        m = np.cross(eb - ea, fn)
+        lm = np.linalg.norm(m, axis=1)
+        good = lm > 1e-20
+        m[good] /= lm[good, None]
+        bq = plane_quadrics(ea, m, BORDER_WEIGHT * good)
+        np.add.at(Q, pe[edge_once, 0], bq)
+        np.add.at(Q, pe[edge_once, 1], bq)
+    return Q
+
+
+class Simplifier:
+    """Incremental simplifier: call reduce(target) repeatedly for a chain."""
+
+    def __init__(self, pos, wtris):
+        self.wedge_pos, self.P = weld_positions(pos)
+        self.wtris = wtris.astype(np.int64)
+        self.Q = initial_quadrics(self.P, self.wtris, self.wedge_pos)
+        self.error = 0.0
+
+    def reduce(self, target):
+        while len(self.wtris) > target:
+            if not self._pass(len(self.wtris) - target):
+                break
+        return self.wtris, np.sqrt(max(self.error, 0.0))
+
+    def _pass(self, excess):
+        P, Q, wp = self.P, self.Q, self.wedge_pos
+        wt = self.wtris
+        pt = wp[wt]
+        nverts = len(P)
+        # directed edge records: (u, v, wedge_u, wedge_v) per triangle corner pair
+        i, j = np.array([0, 1, 2, 1, 2, 0]), np.array([1, 2, 0, 0, 1, 2])
+        pu, pv = pt[:, i].reshape(-1), pt[:, j].reshape(-1)
+        wu, wv = wt[:, i].reshape(-1), wt[:, j].reshape(-1)
+        key = pu * nverts + pv
+        ukey, kinv, kcnt = np.unique(key, return_inverse=True, return_counts=True)
+        u, v = ukey // nverts, ukey % nverts
+        # border: undirected edge in a single triangle
+        border_edge = kcnt == 1
+        border_vert = np.zeros(nverts, bool)
+        border_vert[u[border_edge]] = True
+        ok = ~border_vert[u] | border_edge
+        # seams: every wedge of u must map to exactly one wedge of v
+        live_wedges = np.unique(wt)
+        wcount = np.bincount(wp[live_wedges], minlength=nverts)
+        k1 = kinv * len(wp) + wu
+        o = np.argsort(k1, kind="stable")
+        k1s, wvs = k1[o], wv[o]
+        starts = np.flatnonzero(np.r_[True, k1s[1:] != k1s[:-1]])
+        group = kinv[o][starts]
+        split = (np.minimum.reduceat(wvs, starts) != np.maximum.reduceat(wvs, starts))
+        n_wu = np.bincount(group, minlength=len(ukey))
+        torn = np.bincount(group, weights=split, minlength=len(ukey)) > 0
+        ok &= (n_wu == wcount[u]) & ~torn
+        cand = np.nonzero(ok)[0]
+        if not len(cand):
+            return False
+        ph = np.concatenate([P[v[cand]], np.ones((len(cand), 1))], 1)
+        cost = np.einsum("ni,nij,nj->n", ph, Q[u[cand]] + Q[v[cand]], ph)
+        order = np.argsort(cost, kind="stable")
+        want = max(1, min(excess // 2 + 1, int(PASS_FRACTION * len(np.unique(pt))) + 1))
+        cand, cost = cand[order[:4 * want]], cost[order[:4 * want]]
+        cand, cost = self._no_flips(cand, cost, u, v, pt)
+        # vertex -> neighbour CSR for the independent-set walk
+        nb_order = np.argsort(u, kind="stable")
+        nb_off = np.searchsorted(u[nb_order], np.arange(nverts + 1))
+        nb = v[nb_order].tolist()
+        nb_off = nb_off.tolist()
+        touched = np.zeros(nverts, bool).tolist()
+        ul, vl = u.tolist(), v.tolist()
+        taken, max_cost = [], 0.0
+        for c, cst in zip(cand.tolist(), cost.tolist()):
+            a, b = ul[c], vl[c]
+            if touched[a] or touched[b]:
+                continue
+            taken.append(c)
+            max_cost = max(max_cost, cst)
+            touched[a] = touched[b] = True
+            for n in nb[nb_off[a]:nb_off[a + 1]]:
+                touched[n] = True
+            if len(taken) >= want:
+                break
+        if not taken:
+            return False
+        taken = np.asarray(taken)
+        self.error = max(self.error, max_cost)
+        Q[v[taken]] += Q[u[taken]]
+        pos_map = np.arange(nverts)
+        pos_map[u[taken]] = v[taken]
+        accepted = np.zeros(len(ukey), bool)
+        accepted[taken] = True
+        hit = accepted[kinv]
+        wedge_map = np.arange(len(wp))
+        wedge_map[wu[hit]] = wv[hit]
+        wt = wedge_map[wt]
+        pt = pos_map[pt]
+        keep = (pt[:, 0] != pt[:, 1]) & (pt[:, 1] != pt[:, 2]) & (pt[:, 0] != pt[:, 2])
+        self.wtris = wt[keep]
+        return True
+
+    def _no_flips(self, cand, cost, u, v, pt):
+        """Drop candidates whose collapse would flip a triangle around u."""
+        P = self.P
+        cu, cv = u[cand], v[cand]
+        flat = pt.reshape(-1)
+        order = np.argsort(flat, kind="stable")
+        off = np.searchsorted(flat[order], np.arange(len(P) + 1))
+        cnt = off[cu + 1] - off[cu]
+        owner = np.repeat(np.arange(len(cand)), cnt)
+        start = np.repeat(off[cu] - np.cumsum(np.r_[0, cnt[:-1]]), cnt)
+        tri = order[start + np.arange(cnt.sum())] // 3
+        t = pt[tri]
+        has_v = (t == cv[owner, None]).any(1)
+        a, b, c = P[t[:, 0]], P[t[:, 1]], P[t[:, 2]]
+        before = np.cross(b - a, c - a)
+        moved = np.where((t == cu[owner, None])[..., None], P[cv[owner]][:, None, :], P[t])
+        after = np.cross(moved[:, 1] - moved[:, 0], moved[:, 2] - moved[:, 0])
+        nondegenerate = (before * before).sum(1) > 0
+        flips = ((before * after).sum(1) <= 0) & nondegenerate & ~has_v
+        bad = np.zeros(len(cand), bool)
+        np.logical_or.at(bad, owner, flips)
+        return cand[~bad], cost[~bad]
+
+
+def screen_coverage(rel_errors, screen_height, pixels_error):
+    """MSFT_screencoverage: level i is used above value[i] coverage."""
+    out = []
+    for nxt in rel_errors[1:]:
+        out.append(min(1.0, pixels_error / max(nxt * screen_height, 1e-9)))
+    out.append(0.0)
+    return out
+
+
+def copy_primitive(prim):
+    """Copy with its own attribute / target dicts: compact_bin remaps them in place."""
+    new = dict(prim, attributes=dict(prim["attributes"]))
+    if prim.get("targets"):
+        new["targets"] = [dict(t) for t in prim["targets"]]
+    else:
+        new.pop("targets", None)
+    return new
+
+
+def lod_mesh(gltf, binc, mesh, ratios, report):
+    """Returns one index-only mesh dict per LOD level > 0, plus level stats."""
+    levels = [dict(mesh, primitives=[], name=f"{mesh.get('name', 'mesh')}_LOD{i}")
+              for i in range(1, len(ratios))]
+    for lv in levels:
+        lv.pop("extras", None)
+    stats = [[0, 0.0] for _ in ratios]
+    for prim in mesh["primitives"]:
+        tris = triangles(gltf, binc, prim)
+        pos = read_accessor(gltf, binc, prim["attributes"]["POSITION"], normalize=True)
+        if tris is None or not len(tris):
+            for lv in levels:
+                lv["primitives"].append(copy_primitive(prim))
+            continue
+        diag = float(np.linalg.norm(pos.max(0) - pos.min(0))) or 1.0
+        simp = Simplifier(pos, tris)
+        stats[0][0] += len(tris)
+        # a level that collapses to nothing keeps the previous one (an empty
+        # index accessor is invalid)
+        prev, prev_tris, prev_err = prim.get("indices"), tris, 0.0
+        for li, ratio in enumerate(ratios[1:], 1):
+            out, err = simp.reduce(int(len(tris) * ratio))
+            if len(out):
+                prev = add_accessor(gltf, binc, index_array(out, len(pos)),
+                                    target=ELEMENT_ARRAY_BUFFER)
+                prev_tris, prev_err = out, err
+            out, err = prev_tris, prev_err
+            new = copy_primitive(prim)
+            if prev is not None:
+                new["indices"] = prev
+            levels[li - 1]["primitives"].append(new)
+            stats[li][0] += len(out)
+            stats[li][1] = max(stats[li][1], err / diag)
+    report.append(stats)
+    return levels, stats
+
+
+def build_lods(gltf, binc, ratios, screen_height, pixels_error):
+    report = []
+    mesh_lods = {}
+    nodes = gltf.get("nodes", [])
+    for ni in range(len(nodes)):
+        node = nodes[ni]
+        if "mesh" not in node or "MSFT_lod" in node.get("extensions", {}):
+            continue
+        mi = node["mesh"]
+        if mi not in mesh_lods:
+            levels, stats = lod_mesh(gltf, binc, gltf["meshes"][mi], ratios, report)
+            ids = []
+            for lv in levels:
+                gltf["meshes"].append(lv)
+                ids.append(len(gltf["meshes"]) - 1)
+            mesh_lods[mi] = (ids, stats)
+            name = gltf["meshes"][mi].get("name", f"mesh_{mi}")
+            for ratio, (ntri, err) in zip(ratios, stats):
+                print(f"  {name} LOD {ratio:>5.0%}: {ntri:7d} tris  "
+                      f"error {err:.5f} of bbox diagonal")
+        ids, stats = mesh_lods[mi]
+        lod_nodes = []
+        for li, mesh_idx in enumerate(ids, 1):
+            lod = {k: node[k] for k in ("skin", "translation", "rotation",
+                                        "scale", "matrix", "weights") if k in node}
+            lod["name"] = f"{node.get('name', f'node_{ni}')}_LOD{li}"
+            lod["mesh"] = mesh_idx
+            nodes.append(lod)
+            lod_nodes.append(len(nodes) - 1)
+        errors = [e for _, e in stats]
+        node.setdefault("extensions", {})["MSFT_lod"] = {"ids": lod_nodes}
+        extras = node.setdefault("extras", {})
+        extras["MSFT_screencoverage"] = screen_coverage(errors, screen_height,
+                                                        pixels_error)
+        extras["lod"] = [{"ratio": r, "triangles": n, "error": round(e, 6)}
+                         for r, (n, e) in zip(ratios, stats)]
+    if mesh_lods:
+        used = gltf.setdefault("extensionsUsed", [])
+        if "MSFT_lod" not in used:
+            used.append("MSFT_lod")
+    return report
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--levels", default="1,0.5,0.2,0.05",
+                   help="triangle ratios, first must be 1 (default 1,0.5,0.2,0.05)")
+    p.add_argument("--screen-height", type=int, default=1080)
+    p.add_argument("--pixels-error", type=float, default=1.0,
+                   help="allowed on-screen error in pixels for coverage thresholds")
+    a = p.parse_args()
+    ratios = [float(r) for r in a.levels.split(",")]
+    if ratios[0] != 1.0 or sorted(ratios, reverse=True) != ratios:
+        raise SystemExit("--levels must start at 1 and decrease")
+    gltf, binc = read_glb(a.input)
+    t0 = time.perf_counter()
+    build_lods(gltf, binc, ratios, a.screen_height, a.pixels_error)
+    write_glb(a.output, gltf, compact_bin(gltf, binc))
+    print(f"done: {a.output} ({time.perf_counter() - t0:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
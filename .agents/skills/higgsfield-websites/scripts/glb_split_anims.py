@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""glb_split_anims.py — stdlib-only lazy-load splitter for multi-clip GLBs.
+
+Takes a merged character (glb_merge_anims.py / merge_anim_glbs.py output)
+and writes:
+  * <stem>.glb             mesh + skin + the clip(s) needed for the first
+                           frame (default: the first clip named like "idle",
+                           else the first clip) — small, loads fast;
+  * <stem>_<clip>.gltf/.bin one animation-only glTF per remaining clip. Its
+                           nodes carry only NAMES, so three.js binds the
+                           tracks to the base scene by node name (the same
+                           rule glb_merge_anims.py merges by);
+  * <stem>.clips.json      manifest: clip name, duration, uri, byte size.
+
+Time-to-first-frame no longer scales with the animation library: fetch the
+base GLB, play idle, then fetch clips from the manifest on demand:
+    const {animations} = await loader.loadAsync(entry.uri);
+    mixer.clipAction(animations[0]).play();   // mixer root = base scene
+
+Usage:
+    python3 glb_split_anims.py merged.glb out_dir [--keep Idle --keep Walk]
+"""
+import argparse
+import json
+import re
+from pathlib import Path
+
+from glb_merge_anims import accessor_bytes, compact_bin, f32_list, read_glb, write_glb
+
+
+def clip_duration(gltf, binc, anim):
+    end = 0.0
+    for smp in anim.get("samplers", []):
+        acc = gltf["accessors"][smp["input"]]
+        if "max" in acc:
+            end = max(end, acc["max"][0])
+        else:
+            _, raw = accessor_bytes(gltf, binc, smp["input"])
+            end = max([end] + f32_list(raw))
+    return end
+
+
+def pick_keep(anims, keep):
+    names = [a.get("name", f"clip_{i}") for i, a in enumerate(anims)]
+    if keep:
+        missing = [k for k in keep if k not in names]
+        if missing:
+            raise SystemExit(f"--keep: no clip named {missing} (have {names})")
+        return set(keep)
+    for n in names:
+        if "idle" in n.lower():
+            return {n}
+    return set(names[:1])
+
+
+def clip_gltf(gltf, binc, anim, bin_uri):
+    """Standalone animation-only glTF: named nodes + one external buffer."""
+    nodes, node_map = [], {}
+    out = {"asset": {"version": "2.0", "generator": "glb_split_anims.py"},
+           "buffers": [{"byteLength": 0, "uri": bin_uri}],
+           "bufferViews": json.loads(json.dumps(gltf.get("bufferViews", []))),
+           "accessors": json.loads(json.dumps(gltf.get("accessors", []))),
+           "animations": [json.loads(json.dumps(anim))]}
+    for ch in out["animations"][0]["channels"]:
+        src = ch["target"]["node"]
+        if src not in node_map:
+            node_map[src] = len(nodes)
+            nodes.append({"name": gltf["nodes"][src].get("name", f"node_{src}")})
+        ch["target"]["node"] = node_map[src]
+    out["nodes"] = nodes
+    out["scenes"] = [{"nodes": list(range(len(nodes)))}]
+    out["scene"] = 0
+    out_bin = compact_bin(out, binc)
+    out["buffers"][0]["byteLength"] = len(out_bin)
+    return out, out_bin
+
+
+def safe_name(name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name) or "clip"
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("input")
+    p.add_argument("out_dir")
+    p.add_argument("--keep", action="append", default=[],
+                   help="clip(s) to keep inside the base GLB (repeatable)")
+    a = p.parse_args()
+
+    gltf, binc = read_glb(a.input)
+    anims = gltf.get("animations", [])
+    if not anims:
+        raise SystemExit(f"{a.input}: no animations to split")
+    keep = pick_keep(anims, a.keep)
+    out_dir = Path(a.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stem = Path(a.input).stem
+
+    manifest = {"base": f"{stem}.glb", "clips": []}
+    for i, anim in enumerate(anims):
+        name = anim.get("name", f"clip_{i}")
+        entry = {"name": name, "duration": round(clip_duration(gltf, binc, anim), 6),
+                 "channels": len(anim.get("channels", []))}
+        if name in keep:
+            entry["uri"] = manifest["base"]
+            entry["embedded"] = True
+            entry["bytes"] = 0
+        else:
+            base_name = f"{stem}_{safe_name(name)}"
+            cg, cbin = clip_gltf(gltf, binc, anim, base_name + ".bin")
+            (out_dir / (base_name + ".bin")).write_bytes(bytes(cbin))
+            j = json.dumps(cg, separators=(",", ":")).encode("utf-8")
+            (out_dir / (base_name + ".gltf")).write_bytes(j)
+            entry["uri"] = base_name + ".gltf"
+            entry["bytes"] = len(j) + len(cbin)
+            print(f"  clip '{name}': {entry['duration']:.3f}s, "
+                  f"{entry['bytes']} bytes -> {entry['uri']}")
+        manifest["clips"].append(entry)
+
+    gltf["animations"] = [anim for i, anim in enumerate(anims)
+                          if anim.get("name", f"clip_{i}") in keep]
+    base_bin = compact_bin(gltf, binc)
+    base_path = out_dir / manifest["base"]
+    write_glb(base_path, gltf, base_bin)
+    manifest["baseBytes"] = base_path.stat().st_size
+    (out_dir / f"{stem}.clips.json").write_text(json.dumps(manifest, indent=2))
+    lazy = sum(e["bytes"] for e in manifest["clips"])
+    print(f"base: {base_path} ({manifest['baseBytes']} bytes, "
+          f"clips {sorted(keep)}); lazy clips: {len(anims) - len(gltf['animations'])} "
+          f"({lazy} bytes)")
+    print(f"manifest: {out_dir / (stem + '.clips.json')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""glb_texstore.py — content-addressed external texture store for a GLB library
+(stdlib only, no Blender).
+
+Generated assets keep embedding the same base-colour / normal / roughness
+images (pipeline.py factory textures reused on several props, one Meshy
+texture on every LOD/variant), so the browser downloads and decodes the
+same bytes once per GLB. This pass moves every embedded image (bufferView)
+of every GLB given into STORE/<sha256[:16]>.<ext> and rewrites the image to
+a relative `uri` into the store; identical images across the whole library
+become one file. Serve the store with a long immutable Cache-Control: a
+name can only ever hold one content, so the HTTP cache and the client's
+texture cache (keyed by URL) are shared between assets.
+
+Inputs are GLB files or directories (searched recursively, the store
+itself excluded). Outputs go to --out-dir (directory inputs keep their
+relative layout) or overwrite the inputs with --in-place; URIs are relative
+to where each output is written (path segments percent-encoded), so keep
+the store next to the GLBs when deploying. Images already external are left
+alone; re-running is a no-op. A GLB reached twice (a file inside a listed
+directory) or two inputs mapping to one output stop the run before anything
+is written.
+
+Usage:
+    python3 glb_texstore.py assets/ --store assets/tex --in-place
+    python3 glb_texstore.py a.glb b.glb --store dist/tex --out-dir dist/ [--jobs 8]
+"""
+import argparse
+import hashlib
+import os
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from glb_merge_anims import compact_bin, read_glb, write_glb
+
+EXT = {"image/png": "png", "image/jpeg": "jpg", "image/webp": "webp",
+       "image/ktx2": "ktx2"}
+MAGIC = [(b"\x89PNG", "png"), (b"\xff\xd8", "jpg"), (b"RIFF", "webp"),
+         (b"\xabKTX 20", "ktx2")]
+HASH_CHARS = 16
+
+
+def image_ext(im, raw):
+    if im.get("mimeType") in EXT:
+        return EXT[im["mimeType"]]
+    for magic, ext in MAGIC:
+        if raw.startswith(magic):
+            return ext
+    return "bin"
+
+
+class Store:
+    """Hash-named files in one directory; concurrent-safe, collision-checked."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+        self.lock = threading.Lock()
+        self.seen = {}  # name -> size, this run
+        self.written = 0
+
+    def put(self, raw, ext):
+        """Store raw bytes; returns (absolute path, True if newly written)."""
+        name = f"{hashlib.sha256(raw).hexdigest()[:HASH_CHARS]}.{ext}"
+        path = os.path.join(self.root, name)
+        with self.lock:
+            if name in self.seen or os.path.exists(path):
+                size = self.seen.setdefault(name, os.path.getsize(path))
+                if size != len(raw):
+                    raise SystemExit(f"{path}: hash prefix collision (different size)")
+                return path, False
+            self.seen[name] = len(raw)
+            self.written += len(raw)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(raw)
+        os.replace(tmp, path)
+        return path, True
+
+
+def externalize(gltf, binc, store, out_path):
+    """Move embedded images into the store; returns (images, bytes, new files)."""
+    count = nbytes = new = 0
+    base = os.path.dirname(os.path.abspath(out_path))
+    for im in gltf.get("images", []):
+        if "bufferView" not in im:
+            continue
+        bv = gltf["bufferViews"][im["bufferView"]]
+        if bv.get("buffer", 0) != 0:
+            continue
+        start = bv.get("byteOffset", 0)
+        raw = bytes(binc[start: start + bv["byteLength"]])
+        path, fresh = store.put(raw, image_ext(im, raw))
+        im["uri"] = posixpath.join(*map(quote, os.path.relpath(path, base).split(os.sep)))
+        del im["bufferView"]
+        count, nbytes, new = count + 1, nbytes + len(raw), new + fresh
+    return count, nbytes, new
+
+
+def collect(inputs, store_root, out_dir):
+    """[(input, output)] for every GLB under the inputs."""
+    store_root = os.path.abspath(store_root)
+    pairs = []
+    for src in inputs:
+        if os.path.isdir(src):
+            for dirpath, dirs, files in os.walk(src):
+                dirs[:] = sorted(d for d in dirs
+                                 if os.path.abspath(os.path.join(dirpath, d)) != store_root)
+                for fn in sorted(files):
+                    if fn.lower().endswith(".glb"):
+                        path = os.path.join(dirpath, fn)
+                        rel = os.path.relpath(path, src)
+                        pairs.append((path, os.path.join(out_dir, rel) if out_dir else path))
+        else:
+            name = os.path.basename(src)
+            pairs.append((src, os.path.join(out_dir, name) if out_dir else src))
+    # one writer per output: the pool would race on a shared destination
+    owner = {}
+    for src, dst in pairs:
+        key = os.path.realpath(dst)
+        if key in owner:
+            first = owner[key]
+            raise SystemExit(f"{src}: listed twice" if os.path.realpath(first)
+                             == os.path.realpath(src) else
+                             f"{dst}: output of both {first} and {src}")
+        owner[key] = src
+    return pairs
+
+
+def process(src, dst, store):
+    gltf, binc = read_glb(src)
+    count, nbytes, new = externalize(gltf, binc, store, dst)
+    if count or src != dst:
+        os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+        write_glb(dst, gltf, compact_bin(gltf, binc))
+    return src, count, nbytes, new
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("inputs", nargs="+", help="GLB files and/or directories")
+    p.add_argument("--store", required=True, help="texture store directory")
+    dest = p.add_mutually_exclusive_group(required=True)
+    dest.add_argument("--out-dir", help="write rewritten GLBs here")
+    dest.add_argument("--in-place", action="store_true", help="overwrite the inputs")
+    p.add_argument("--jobs", type=int, default=min(8, os.cpu_count() or 1))
+    a = p.parse_args()
+    store = Store(a.store)
+    pairs = collect(a.inputs, a.store, None if a.in_place else a.out_dir)
+    if not pairs:
+        raise SystemExit("no .glb files found")
+    with ThreadPoolExecutor(max_workers=a.jobs) as pool:
+        results = list(pool.map(lambda sd: process(*sd, store), pairs))
+    images = embedded = 0
+    for src, count, nbytes, new in results:
+        if count:
+            print(f"  {src}: {count} images, {nbytes / 1024:.0f} KiB "
+                  f"({new} new in store)")
+        images, embedded = images + count, embedded + nbytes
+    unique = sum(store.seen.values())
+    print(f"done: {len(pairs)} GLBs, {images} images -> {len(store.seen)} store files; "
+          f"{embedded / 1048576:.2f} MiB embedded -> {unique / 1048576:.2f} MiB unique "
+          f"({store.written / 1048576:.2f} MiB newly written to {a.store})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""glb_textures.py — embedded texture recompression pass for GLB files
+(pillow + numpy helpers, no Blender).
+
+Meshy assets routinely embed 4096² PNG base-colour maps for objects that
+cover 200 px on screen. Every embedded image is decoded with Pillow,
+downsized to --max-size (longest side, Lanczos, power-of-two kept when
+the source was), and re-encoded:
+  --format webp  (default) WebP image added via EXT_texture_webp; the
+                 texture's plain `source` keeps a downsized, optimized PNG
+                 as the fallback (--no-fallback drops it and marks the
+                 extension required);
+  --format jpeg  optimized progressive JPEG for opaque images, optimized
+                 PNG for images with real alpha;
+  --format png   downsize + optimized PNG only.
+Images Pillow cannot decode (KTX2 from KHR_texture_basisu, ...) and images
+a texture reaches through an extension (already WebP / Basis) are skipped
+and reported. The BIN chunk is rewritten and compacted; images are
+processed in parallel. Prints per-image and total bytes before/after plus
+the decoded GPU memory estimate (RGBA8 + full mip chain = w*h*4*4/3).
+
+Usage:
+    python3 glb_textures.py in.glb out.glb [--max-size 1024] [--format webp]
+"""
+import argparse
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from glb_arrays import append_view
+from glb_merge_anims import compact_bin, read_glb, write_glb
+
+WEBP = "EXT_texture_webp"
+
+
+def gpu_bytes(w, h):
+    return w * h * 4 * 4 // 3
+
+
+def has_alpha(img):
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        return img.convert("RGBA").getchannel("A").getextrema()[0] < 255
+    return False
+
+
+def target_size(w, h, max_size):
+    scale = min(1.0, max_size / max(w, h))
+    nw, nh = max(1, round(w * scale)), max(1, round(h * scale))
+    if w & (w - 1) == 0 and h & (h - 1) == 0:
+        nw, nh = 1 << (nw.bit_length() - 1), 1 << (nh.bit_length() - 1)
+    return nw, nh
+
+
+def encode(img, fmt, quality):
+    buf = io.BytesIO()
+    if fmt == "webp":
+        img.save(buf, "WEBP", quality=quality, method=6)
+    elif fmt == "jpeg":
+        img.convert("RGB").save(buf, "JPEG", quality=quality, optimize=True,
+                                progressive=True)
+    else:
+        img.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+
+def recompress(raw, fmt, max_size, quality, fallback):
+    """One image -> dict of encoded payloads (runs in a worker thread).
+
+    Images Pillow cannot decode (KTX2 / Basis, ...) -> {"error": message}.
+    """
+    try:
+        img = Image.open(io.BytesIO(raw))
+        img.load()
+    except Exception as e:  # UnidentifiedImageError, truncated data, ...
+        return {"error": f"{type(e).__name__}: {e}"}
+    w, h = img.size
+    alpha = has_alpha(img)
+    img = img.convert("RGBA" if alpha else "RGB")
+    nw, nh = target_size(w, h, max_size)
+    if (nw, nh) != (w, h):
+        img = img.resize((nw, nh), Image.LANCZOS)
+    out = {"size": (w, h), "new_size": (nw, nh), "alpha": alpha}
+    if fmt == "webp":
+        out["webp"] = encode(img, "webp", quality)
+        if fallback:
+            out["png"] = encode(img, "png", quality)
+    elif fmt == "jpeg" and not alpha:
+        out["jpeg"] = encode(img, "jpeg", quality)
+    else:
+        out["png"] = encode(img, "png", quality)
+    return out
+
+
+MIME = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+def extension_sources(gltf):
+    """Images a texture reaches through an extension (EXT_texture_webp,
+    KHR_texture_basisu, ...), plus the plain sources of textures that
+    already carry EXT_texture_webp (converted by an earlier run)."""
+    out = set()
+    for tex in gltf.get("textures", []):
+        for name, ext in tex.get("extensions", {}).items():
+            if isinstance(ext, dict) and "source" in ext:
+                out.add(ext["source"])
+                if name == WEBP and "source" in tex:
+                    out.add(tex["source"])
+    return out
+
+
+def process(gltf, binc, fmt, max_size, quality, fallback, workers):
+    images = gltf.get("images", [])
+    skip = extension_sources(gltf)
+    jobs = {}
+    for i, im in enumerate(images):
+        if "bufferView" not in im:
+            print(f"  image[{i}]: external uri, skipped")
+            continue
+        if i in skip:
+            print(f"  image[{i}]: behind a texture extension, skipped")
+            continue
+        bv = gltf["bufferViews"][im["bufferView"]]
+        start = bv.get("byteOffset", 0)
+        jobs[i] = bytes(binc[start: start + bv["byteLength"]])
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = dict(zip(jobs, pool.map(
+            lambda raw: recompress(raw, fmt, max_size, quality, fallback),
+            jobs.values())))
+
+    webp_of = {}
+    total_before = total_after = gpu_before = gpu_after = 0
+    for i, res in results.items():
+        im = images[i]
+        if "error" in res:
+            print(f"  image[{i}] '{im.get('name', '')}' ({im.get('mimeType', '?')}): "
+                  f"cannot decode, skipped ({res['error']})")
+            continue
+        before = len(jobs[i])
+        after = 0
+        for kind in ("png", "jpeg"):
+            if kind in res:
+                im["bufferView"] = append_view(gltf, binc, res[kind])
+                im["mimeType"] = MIME[kind]
+                after += len(res[kind])
+        if "webp" in res:
+            webp = {"bufferView": append_view(gltf, binc, res["webp"]),
+                    "mimeType": MIME["webp"]}
+            if "name" in im:
+                webp["name"] = im["name"] + "_webp"
+            images.append(webp)
+            webp_of[i] = len(images) - 1
+            after += len(res["webp"])
+        (w, h), (nw, nh) = res["size"], res["new_size"]
+        total_before += before
+        total_after += after
+        gpu_before += gpu_bytes(w, h)
+        gpu_after += gpu_bytes(nw, nh)
+        kinds = "+".join(k for k in ("webp", "jpeg", "png") if k in res)
+        print(f"  image[{i}] '{im.get('name', '')}': {w}x{h} -> {nw}x{nh} {kinds}  "
+              f"{before / 1024:.0f} KiB -> {after / 1024:.0f} KiB")
+
+    if webp_of:
+        for tex in gltf.get("textures", []):
+            src = tex.get("source")
+            if src in webp_of:
+                tex.setdefault("extensions", {})[WEBP] = {"source": webp_of[src]}
+                if not fallback:
+                    tex.pop("source")
+        if not fallback:
+            # fallback images are now unreferenced: drop them, renumber
+            keep = [i for i in range(len(images)) if i not in webp_of]
+            remap = {old: new for new, old in enumerate(keep)}
+            gltf["images"] = [images[i] for i in keep]
+            for tex in gltf.get("textures", []):
+                for ext in tex.get("extensions", {}).values():
+                    if isinstance(ext, dict) and "source" in ext:
+                        ext["source"] = remap[ext["source"]]
+                if "source" in tex:
+                    tex["source"] = remap[tex["source"]]
+        used = gltf.setdefault("extensionsUsed", [])
+        if WEBP not in used:
+            used.append(WEBP)
+        if not fallback:
+            req = gltf.setdefault("extensionsRequired", [])
+            if WEBP not in req:
+                req.append(WEBP)
+    return total_before, total_after, gpu_before, gpu_after
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--max-size", type=int, default=1024,
+                   help="longest texture side after downsizing (default 1024)")
+    p.add_argument("--format", choices=["webp", "jpeg", "png"], default="webp")
+    p.add_argument("--quality", type=int, default=85)
+    p.add_argument("--no-fallback", action="store_true",
+                   help="webp only: no PNG fallback, EXT_texture_webp required")
+    p.add_argument("--workers", type=int, default=os.cpu_count())
+    a = p.parse_args()
+    gltf, binc = read_glb(a.input)
+    if not gltf.get("images"):
+        print("no images — nothing to do")
+    tb, ta, gb, ga = process(gltf, binc, a.format, a.max_size, a.quality,
+                             not a.no_fallback, a.workers)
+    write_glb(a.output, gltf, compact_bin(gltf, binc))
+    if tb:
+        print(f"images: {tb / 1048576:.2f} MiB -> {ta / 1048576:.2f} MiB "
+              f"({100 * (1 - ta / tb):.0f}% smaller); GPU (RGBA8+mips) "
+              f"{gb / 1048576:.1f} MiB -> {ga / 1048576:.1f} MiB")
+    print(f"done: {a.output} ({os.path.getsize(a.input)} -> "
+          f"{os.path.getsize(a.output)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
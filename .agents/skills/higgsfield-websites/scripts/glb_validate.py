@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""glb_validate.py — fast structural GLB validator (numpy + stdlib, no Blender).
+
+The GLB tools trust their inputs: a truncated download or a buggy pass
+shows up later as a raw struct.error or as silently short slices. This
+checks, in one pass over the memory-mapped file:
+  framing     header magic/version/length, chunk lengths and alignment,
+              JSON chunk first, BIN chunk vs buffers[0].byteLength
+  views       buffer index, byteOffset + byteLength inside the buffer,
+              byteStride 4..252 and a multiple of 4 (EXT_meshopt_compression
+              payload ranges against their own buffer)
+  accessors   componentType / type, alignment, count * stride inside the
+              view, sparse ranges
+  meshes      attribute accessors valid with equal counts, index
+              componentType unsigned, max index < vertex count (numpy max
+              over every index buffer), triangle lists % 3
+  animations  at least one channel and sampler; samplers: float input
+              strictly increasing and >= 0, output count matching (x3 for
+              CUBICSPLINE); channel node / path
+  skins       joint nodes valid and unique, inverseBindMatrices MAT4 float
+              with count >= joints
+  graph       node / mesh / skin / scene / image / texture references,
+              one parent per node, no cycles
+Issues are {severity: error|warning|info, code, pointer (JSON pointer),
+message}. Prints one line per issue (--json writes the list; '-' = stdout),
+exit 1 on any error (--strict: also on warnings).
+
+Every tool writing through glb_merge_anims.write_glb validates its output
+when GLB_VALIDATE=1 (or true/yes/on) is set, so a pipeline run can gate
+each step:
+    GLB_VALIDATE=1 python3 glb_weld.py in.glb out.glb
+
+Usage:
+    python3 glb_validate.py a.glb [b.glb ...] [--json report.json] [--strict]
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+MAGIC = 0x46546C67
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+DTYPE = {5120: np.int8, 5121: np.uint8, 5122: np.int16, 5123: np.uint16,
+         5125: np.uint32, 5126: np.float32}
+TYPE_COUNT = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+PATHS = {"translation", "rotation", "scale", "weights", "pointer"}
+MESHOPT = "EXT_meshopt_compression"
+
+
+class Report:
+    def __init__(self):
+        self.issues = []
+
+    def add(self, severity, code, pointer, message):
+        self.issues.append({"severity": severity, "code": code,
+                            "pointer": pointer, "message": message})
+
+    def error(self, code, pointer, message):
+        self.add("error", code, pointer, message)
+
+    def warning(self, code, pointer, message):
+        self.add("warning", code, pointer, message)
+
+
+def element_size(acc):
+    return np.dtype(DTYPE[acc["componentType"]]).itemsize * TYPE_COUNT[acc["type"]]
+
+
+def check_framing(data, rep):
+    """-> (gltf, BIN offset in data, BIN length) or (None, 0, 0)."""
+    size = len(data)
+    if size < 12:
+        rep.error("GLB_TRUNCATED", "", f"{size} bytes, shorter than the 12-byte header")
+        return None, 0, 0
+    magic, version, length = struct.unpack_from("<III", data, 0)
+    if magic != MAGIC:
+        rep.error("GLB_MAGIC", "", "not a GLB file (bad magic)")
+        return None, 0, 0
+    if version != 2:
+        rep.error("GLB_VERSION", "", f"GLB version {version}, expected 2")
+        return None, 0, 0
+    if length > size:
+        rep.error("GLB_TRUNCATED", "", f"header length {length} > file size {size} "
+                  "(interrupted download?)")
+    elif length < size:
+        rep.warning("GLB_TRAILING_DATA", "", f"{size - length} bytes after the declared length")
+    end = min(length, size)
+    gltf, bin_off, bin_len, off, n = None, 0, 0, 12, 0
+    while off < end:
+        if off + 8 > end:
+            rep.error("GLB_CHUNK_TRUNCATED", "", f"chunk header at byte {off} cut off")
+            break
+        clen, ctype = struct.unpack_from("<II", data, off)
+        if off + 8 + clen > end:
+            rep.error("GLB_CHUNK_TRUNCATED", "", f"chunk {n} needs {clen} bytes, "
+                      f"{end - off - 8} left")
+            clen = end - off - 8
+        if clen % 4:
+            rep.error("GLB_CHUNK_UNALIGNED", "", f"chunk {n} length {clen} not a multiple of 4")
+        if n == 0 and ctype != CHUNK_JSON:
+            rep.error("GLB_FIRST_CHUNK", "", "first chunk is not JSON")
+            return None, 0, 0
+        if ctype == CHUNK_JSON and n == 0:
+            try:
+                gltf = json.loads(bytes(data[off + 8: off + 8 + clen]).decode("utf-8"))
+            except (UnicodeDecodeError, ValueError) as e:
+                rep.error("JSON_INVALID", "", f"JSON chunk does not parse: {e}")
+                return None, 0, 0
+        elif ctype == CHUNK_BIN:
+            if n != 1:
+                rep.error("GLB_BIN_POSITION", "", "BIN chunk is not the second chunk")
+            bin_off, bin_len = off + 8, clen
+        else:
+            rep.add("info", "GLB_UNKNOWN_CHUNK", "", f"chunk {n} type 0x{ctype:08X} ignored")
+        off += 8 + clen
+        n += 1
+    if gltf is not None and not isinstance(gltf, dict):
+        rep.error("JSON_INVALID", "", "JSON root is not an object")
+        return None, 0, 0
+    return gltf, bin_off, bin_len
+
+
+def check_index(rep, arr, idx, pointer, what):
+    ok = isinstance(idx, int) and 0 <= idx < len(arr)
+    if not ok:
+        rep.error("INVALID_REFERENCE", pointer, f"{what} {idx!r} out of range (have {len(arr)})")
+    return ok
+
+
+def check_buffers(gltf, bin_len, rep):
+    """-> per buffer usable length (None = external uri, not checked)."""
+    lengths = []
+    for bi, buf in enumerate(gltf.get("buffers", [])):
+        ptr = f"/buffers/{bi}"
+        declared = buf.get("byteLength", 0)
+        if "uri" in buf:
+            lengths.append(None)
+        elif bi == 0:
+            if declared > bin_len:
+                rep.error("BUFFER_GLB_SHORT", ptr, f"byteLength {declared} > BIN chunk {bin_len}")
+            elif bin_len - declared > 3:
+                rep.warning("BUFFER_GLB_PADDING", ptr, f"BIN chunk {bin_len} > byteLength "
+                            f"{declared} + 3 padding")
+            lengths.append(min(declared, bin_len))
+        else:
+            fallback = buf.get("extensions", {}).get(MESHOPT, {}).get("fallback")
+            if not fallback:
+                rep.error("BUFFER_NO_DATA", ptr, "buffer without uri besides buffer 0")
+            lengths.append(declared)
+    return lengths
+
+
+def check_views(gltf, lengths, rep):
+    buffers = gltf.get("buffers", [])
+    for vi, bv in enumerate(gltf.get("bufferViews", [])):
+        ptr = f"/bufferViews/{vi}"
+        ranges = [(bv.get("buffer", -1), bv.get("byteOffset", 0), bv.get("byteLength", 0), ptr)]
+        ext = bv.get("extensions", {}).get(MESHOPT)
+        if ext:
+            ranges.append((ext.get("buffer", -1), ext.get("byteOffset", 0),
+                           ext.get("byteLength", 0), ptr + f"/extensions/{MESHOPT}"))
+            if ext.get("count", 0) * ext.get("byteStride", 0) != bv.get("byteLength"):
+                rep.error("MESHOPT_LENGTH", ptr, "count * byteStride != byteLength")
+        for b, off, n, p in ranges:
+            if not check_index(rep, buffers, b, p + "/buffer", "buffer"):
+                continue
+            if off < 0 or n <= 0:
+                rep.error("VIEW_RANGE", p, f"byteOffset {off} / byteLength {n}")
+            elif lengths[b] is not None and off + n > lengths[b]:
+                rep.error("VIEW_OUT_OF_RANGE", p, f"bytes {off}..{off + n} past buffer "
+                          f"{b} length {lengths[b]}")
+        stride = bv.get("byteStride")
+        if stride is not None and (stride < 4 or stride > 252 or stride % 4):
+            rep.error("VIEW_STRIDE", ptr, f"byteStride {stride} (must be 4..252, multiple of 4)")
+
+
+def check_accessors(gltf, rep):
+    views = gltf.get("bufferViews", [])
+    valid = []
+    for ai, acc in enumerate(gltf.get("accessors", [])):
+        ptr = f"/accessors/{ai}"
+        if acc.get("componentType") not in DTYPE or acc.get("type") not in TYPE_COUNT:
+            rep.error("ACCESSOR_TYPE", ptr, f"componentType {acc.get('componentType')} / "
+                      f"type {acc.get('type')!r}")
+            valid.append(False)
+            continue
+        count = acc.get("count", 0)
+        if not isinstance(count, int) or count < 1:
+            rep.error("ACCESSOR_COUNT", ptr, f"count {count!r}")
+            valid.append(False)
+            continue
+        ok = True
+        size = element_size(acc)
+        comp = np.dtype(DTYPE[acc["componentType"]]).itemsize
+        if "bufferView" in acc:
+            if check_index(rep, views, acc["bufferView"], ptr + "/bufferView", "bufferView"):
+                bv = views[acc["bufferView"]]
+                stride = bv.get("byteStride") or size
+                off = acc.get("byteOffset", 0)
+                need = off + stride * (count - 1) + size
+                if off % comp:
+                    rep.error("ACCESSOR_ALIGNMENT", ptr, f"byteOffset {off} not a multiple of {comp}")
+                if stride < size:
+                    rep.error("ACCESSOR_STRIDE", ptr, f"view byteStride {stride} < element {size}")
+                    ok = False
+                if need > bv.get("byteLength", 0):
+                    rep.error("ACCESSOR_OUT_OF_RANGE", ptr, f"needs {need} bytes of view "
+                              f"{acc['bufferView']} ({bv.get('byteLength', 0)})")
+                    ok = False
+            else:
+                ok = False
+        sparse = acc.get("sparse")
+        if sparse:
+            n = sparse.get("count", 0)
+            for part, item in (("indices", np.dtype(DTYPE.get(
+                    sparse.get("indices", {}).get("componentType"), np.uint32)).itemsize),
+                               ("values", size)):
+                sp = sparse.get(part, {})
+                p = f"{ptr}/sparse/{part}"
+                if check_index(rep, views, sp.get("bufferView"), p + "/bufferView", "bufferView"):
+                    need = sp.get("byteOffset", 0) + n * item
+                    if need > views[sp["bufferView"]].get("byteLength", 0):
+                        rep.error("ACCESSOR_SPARSE_OUT_OF_RANGE", p, f"needs {need} bytes")
+                        ok = False
+                else:
+                    ok = False
+        for k in ("min", "max"):
+            if k in acc and len(acc[k]) != TYPE_COUNT[acc["type"]]:
+                rep.error("ACCESSOR_MINMAX", ptr, f"{k} has {len(acc[k])} components")
+        valid.append(ok)
+    return valid
+
+
+class Reader:
+    """Accessor data straight from the mapped BIN chunk (None when not readable)."""
+
+    def __init__(self, data, gltf, bin_off, lengths, valid):
+        self.data, self.gltf, self.bin_off = data, gltf, bin_off
+        self.lengths, self.valid = lengths, valid
+
+    def __call__(self, ai):
+        acc = self.gltf["accessors"][ai]
+        if not self.valid[ai] or "bufferView" not in acc or "sparse" in acc:
+            return None
+        bv = self.gltf["bufferViews"][acc["bufferView"]]
+        if bv.get("buffer", 0) != 0 or MESHOPT in bv.get("extensions", {}) or not self.lengths:
+            return None
+        dtype = np.dtype(DTYPE[acc["componentType"]])
+        ncomp = TYPE_COUNT[acc["type"]]
+        start = self.bin_off + bv.get("byteOffset", 0) + acc.get("byteOffset", 0)
+        stride = bv.get("byteStride") or dtype.itemsize * ncomp
+        if start + stride * (acc["count"] - 1) + dtype.itemsize * ncomp > len(self.data):
+            return None
+        return np.ndarray((acc["count"], ncomp), dtype, self.data, start,
+                          (stride, dtype.itemsize))
+
+
+def check_meshes(gltf, read, rep):
+    accs = gltf.get("accessors", [])
+    for mi, mesh in enumerate(gltf.get("meshes", [])):
+        for pi, prim in enumerate(mesh.get("primitives", [])):
+            ptr = f"/meshes/{mi}/primitives/{pi}"
+            counts = set()
+            for k, a in prim.get("attributes", {}).items():
+                if check_index(rep, accs, a, f"{ptr}/attributes/{k}", "accessor"):
+                    counts.add(accs[a].get("count"))
+            for ti, tgt in enumerate(prim.get("targets", [])):
+                for k, a in tgt.items():
+                    if check_index(rep, accs, a, f"{ptr}/targets/{ti}/{k}", "accessor"):
+                        counts.add(accs[a].get("count"))
+            if len(counts) > 1:
+                rep.error("MESH_ATTRIBUTE_COUNTS", ptr, f"attribute counts differ: {sorted(counts)}")
+            if "POSITION" not in prim.get("attributes", {}):
+                rep.warning("MESH_NO_POSITION", ptr, "primitive without POSITION")
+            if "indices" not in prim or not check_index(rep, accs, prim["indices"],
+                                                        ptr + "/indices", "accessor"):
+                continue
+            acc = accs[prim["indices"]]
+            if acc.get("componentType") not in (5121, 5123, 5125) or acc.get("type") != "SCALAR":
+                rep.error("MESH_INDEX_TYPE", ptr + "/indices", "indices must be unsigned SCALAR")
+                continue
+            if prim.get("mode", 4) == 4 and acc.get("count", 0) % 3:
+                rep.warning("MESH_TRIANGLES_COUNT", ptr + "/indices",
+                            f"{acc['count']} indices is not a multiple of 3")
+            idx = read(prim["indices"])
+            if idx is not None and counts and len(idx):
+                top = int(idx.max())
+                vcount = min(counts)
+                if top >= vcount:
+                    rep.error("MESH_INDEX_OUT_OF_RANGE", ptr + "/indices",
+                              f"index {top} >= vertex count {vcount}")
+
+
+def check_animations(gltf, read, rep):
+    accs, nodes = gltf.get("accessors", []), gltf.get("nodes", [])
+    for ni, anim in enumerate(gltf.get("animations", [])):
+        samplers = anim.get("samplers", [])
+        if not anim.get("channels") or not samplers:
+            rep.error("ANIM_EMPTY", f"/animations/{ni}", "animation without channels/samplers")
+        for si, smp in enumerate(samplers):
+            ptr = f"/animations/{ni}/samplers/{si}"
+            if not (check_index(rep, accs, smp.get("input"), ptr + "/input", "accessor")
+                    and check_index(rep, accs, smp.get("output"), ptr + "/output", "accessor")):
+                continue
+            if not (read.valid[smp["input"]] and read.valid[smp["output"]]):
+                continue  # reported by check_accessors (e.g. count 0)
+            inp, out = accs[smp["input"]], accs[smp["output"]]
+            if inp.get("componentType") != 5126 or inp.get("type") != "SCALAR":
+                rep.error("ANIM_INPUT_TYPE", ptr + "/input", "input must be float SCALAR")
+                continue
+            mult = 3 if smp.get("interpolation") == "CUBICSPLINE" else 1
+            if out.get("count", 0) % (inp.get("count", 1) * mult):
+                rep.error("ANIM_OUTPUT_COUNT", ptr + "/output",
+                          f"output count {out.get('count')} vs input {inp.get('count')} x{mult}")
+            times = read(smp["input"])
+            if times is not None and len(times):
+                t = times[:, 0]
+                if t[0] < 0:
+                    rep.error("ANIM_INPUT_NEGATIVE", ptr + "/input", f"first key time {t[0]}")
+                bad = np.nonzero(np.diff(t) <= 0)[0]
+                if len(bad):
+                    rep.error("ANIM_INPUT_NOT_INCREASING", ptr + "/input",
+                              f"{len(bad)} non-increasing steps, first at key {bad[0] + 1} "
+                              f"({t[bad[0]]} -> {t[bad[0] + 1]})")
+                if not np.isfinite(t).all():
+                    rep.error("ANIM_INPUT_NAN", ptr + "/input", "non-finite key times")
+        for ci, ch in enumerate(anim.get("channels", [])):
+            ptr = f"/animations/{ni}/channels/{ci}"
+            check_index(rep, samplers, ch.get("sampler"), ptr + "/sampler", "sampler")
+            tgt = ch.get("target", {})
+            if tgt.get("path") not in PATHS:
+                rep.error("ANIM_PATH", ptr + "/target/path", f"path {tgt.get('path')!r}")
+            if "node" in tgt:
+                check_index(rep, nodes, tgt["node"], ptr + "/target/node", "node")
+            elif tgt.get("path") != "pointer":
+                rep.warning("ANIM_NO_NODE", ptr + "/target", "channel without target node")
+
+
+def check_skins(gltf, rep):
+    accs, nodes = gltf.get("accessors", []), gltf.get("nodes", [])
+    for si, skin in enumerate(gltf.get("skins", [])):
+        ptr = f"/skins/{si}"
+        joints = skin.get("joints", [])
+        for k, j in enumerate(joints):
+            check_index(rep, nodes, j, f"{ptr}/joints/{k}", "joint node")
+        if len(set(joints)) != len(joints):
+            rep.error("SKIN_DUPLICATE_JOINT", ptr + "/joints", "joint listed twice")
+        if "skeleton" in skin:
+            check_index(rep, nodes, skin["skeleton"], ptr + "/skeleton", "node")
+        if "inverseBindMatrices" in skin and check_index(
+                rep, accs, skin["inverseBindMatrices"], ptr + "/inverseBindMatrices", "accessor"):
+            acc = accs[skin["inverseBindMatrices"]]
+            if acc.get("type") != "MAT4" or acc.get("componentType") != 5126:
+                rep.error("SKIN_IBM_TYPE", ptr + "/inverseBindMatrices", "must be float MAT4")
+            if acc.get("count", 0) < len(joints):
+                rep.error("SKIN_IBM_COUNT", ptr + "/inverseBindMatrices",
+                          f"{acc.get('count')} matrices for {len(joints)} joints")
+
+
+def check_graph(gltf, rep):
+    nodes = gltf.get("nodes", [])
+    parent = {}
+    for ni, node in enumerate(nodes):
+        ptr = f"/nodes/{ni}"
+        for key, arr in (("mesh", "meshes"), ("skin", "skins"), ("camera", "cameras")):
+            if key in node:
+                check_index(rep, gltf.get(arr, []), node[key], f"{ptr}/{key}", key)
+        if "skin" in node and "mesh" not in node:
+            rep.warning("NODE_SKIN_NO_MESH", ptr, "skin on a node without mesh")
+        for c in node.get("children", []):
+            if not check_index(rep, nodes, c, ptr + "/children", "child node"):
+                continue
+            if c in parent:
+                rep.error("NODE_MULTIPLE_PARENTS", f"/nodes/{c}",
+                          f"child of nodes {parent[c]} and {ni}")
+            parent[c] = ni
+    for ni in range(len(nodes)):
+        seen, cur = set(), ni
+        while cur in parent:
+            if cur in seen:
+                rep.error("NODE_CYCLE", f"/nodes/{ni}", "node hierarchy contains a cycle")
+                break
+            seen.add(cur)
+            cur = parent[cur]
+    for si, scene in enumerate(gltf.get("scenes", [])):
+        for k, n in enumerate(scene.get("nodes", [])):
+            if check_index(rep, nodes, n, f"/scenes/{si}/nodes/{k}", "node") and n in parent:
+                rep.error("SCENE_NON_ROOT", f"/scenes/{si}/nodes/{k}", f"node {n} has a parent")
+    if "scene" in gltf:
+        check_index(rep, gltf.get("scenes", []), gltf["scene"], "/scene", "scene")
+    views, images = gltf.get("bufferViews", []), gltf.get("images", [])
+    for ii, img in enumerate(images):
+        if "bufferView" in img:
+            check_index(rep, views, img["bufferView"], f"/images/{ii}/bufferView", "bufferView")
+        elif "uri" not in img:
+            rep.error("IMAGE_NO_DATA", f"/images/{ii}", "image without bufferView or uri")
+    textures = gltf.get("textures", [])
+    for ti, tex in enumerate(textures):
+        if "source" in tex:
+            check_index(rep, images, tex["source"], f"/textures/{ti}/source", "image")
+        if "sampler" in tex:
+            check_index(rep, gltf.get("samplers", []), tex["sampler"],
+                        f"/textures/{ti}/sampler", "sampler")
+
+    def walk(obj, ptr):
+        for k, v in obj.items():
+            if isinstance(v, dict):
+                if k.endswith("Texture") and "index" in v:
+                    check_index(rep, textures, v["index"], f"{ptr}/{k}/index", "texture")
+                walk(v, f"{ptr}/{k}")
+
+    for mi, mat in enumerate(gltf.get("materials", [])):
+        walk(mat, f"/materials/{mi}")
+    mats = gltf.get("materials", [])
+    for mi, mesh in enumerate(gltf.get("meshes", [])):
+        for pi, prim in enumerate(mesh.get("primitives", [])):
+            if "material" in prim:
+                check_index(rep, mats, prim["material"],
+                            f"/meshes/{mi}/primitives/{pi}/material", "material")
+
+
+def validate_bytes(data):
+    """Validate a whole GLB held in any buffer (bytes, mmap) -> list of issues."""
+    rep = Report()
+    gltf, bin_off, bin_len = check_framing(data, rep)
+    if gltf is None:
+        return rep.issues
+    if gltf.get("asset", {}).get("version") != "2.0":
+        rep.warning("ASSET_VERSION", "/asset/version", "asset.version is not '2.0'")
+    lengths = check_buffers(gltf, bin_len, rep)
+    check_views(gltf, lengths, rep)
+    valid = check_accessors(gltf, rep)
+    if any(i["code"] in ("VIEW_OUT_OF_RANGE", "BUFFER_GLB_SHORT") for i in rep.issues):
+        lengths = []  # do not read data through broken views
+    read = Reader(data, gltf, bin_off, lengths, valid)
+    check_meshes(gltf, read, rep)
+    check_animations(gltf, read, rep)
+    check_skins(gltf, rep)
+    check_graph(gltf, rep)
+    return rep.issues
+
+
+def validate_file(path):
+    size = os.path.getsize(path)
+    if size == 0:
+        return [{"severity": "error", "code": "GLB_TRUNCATED", "pointer": "",
+                 "message": "empty file"}]
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return validate_bytes(mm)
+        finally:
+            try:
+                mm.close()
+            except BufferError:  # a traceback still holds a view; GC closes it
+                pass
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("inputs", nargs="+")
+    p.add_argument("--json", metavar="OUT", help="write {file: [issues]} as JSON ('-' = stdout)")
+    p.add_argument("--strict", action="store_true", help="exit 1 on warnings too")
+    a = p.parse_args()
+    results, failed = {}, False
+    for path in a.inputs:
+        t0 = time.perf_counter()
+        issues = validate_file(path)
+        dt = time.perf_counter() - t0
+        results[path] = issues
+        errors = sum(i["severity"] == "error" for i in issues)
+        warns = sum(i["severity"] == "warning" for i in issues)
+        failed |= errors > 0 or (a.strict and warns > 0)
+        if a.json != "-":
+            for i in issues:
+                print(f"  {path}: {i['severity'].upper()} {i['code']} {i['pointer']} {i['message']}")
+            print(f"{path}: {errors} errors, {warns} warnings ({dt * 1000:.1f} ms)")
+    if a.json:
+        text = json.dumps(results if len(a.inputs) > 1 else results[a.inputs[0]], indent=1)
+        if a.json == "-":
+            print(text)
+        else:
+            with open(a.json, "w") as f:
+                f.write(text)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""glb_weld.py — vertex welding / attribute dedup for GLB meshes
+(numpy + stdlib, no Blender).
+
+Image-to-3D meshes (the photogrammetry-style ones rig_transfer.py warns
+about) often arrive fully unwelded: three private vertices per triangle,
+3x the vertex count, a useless post-transform cache. Per TRIANGLES
+primitive this pass quantizes every vertex attribute to a grid:
+  POSITION / morph deltas   --tolerance x the primitive's bbox diagonal
+  NORMAL / TANGENT          1e-3 per component
+  TEXCOORD_n                --uv-tolerance
+  COLOR_n / WEIGHTS_n       1/1024   (JOINTS_n exact; unweighted slots ignored)
+Integer (quantized) attributes are compared exactly. The packed rows go
+through numpy unique, once more with the position grid shifted by half a
+cell so pairs straddling a cell boundary still meet; vertices sharing a row
+in either become one (the lowest-index one's values are kept, vertex order
+preserved), the index buffer is rebuilt and triangles that collapsed to a
+line/point are dropped.
+
+--merge-normals first averages the normals of vertices at the same position
+(and skin) whose normals lie within --angle of the group mean: smooths the
+per-face normals of unwelded scans and removes the lighting seam along UV
+seams, while edges sharper than --angle stay hard. Vertex counts before/
+after are reported. Run before glb_optimize.py / glb_simplify.py.
+
+Vertex buffers shared by several primitives are left alone.
+
+Usage:
+    python3 glb_weld.py in.glb out.glb [--tolerance 1e-6] [--uv-tolerance 1e-5]
+        [--merge-normals [--angle 30]]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from glb_arrays import (ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER, add_accessor,
+                        index_array, read_accessor, replace_accessor, triangles)
+from glb_merge_anims import compact_bin, read_glb, write_glb
+from glb_optimize import attribute_users
+
+NORMAL_STEP = 1e-3
+UNIT_STEP = 1 / 1024
+
+
+def quantize(arr, step):
+    """Float attribute -> int64 grid cells; integer attributes stay exact."""
+    arr = np.asarray(arr).reshape(len(arr), -1)
+    if arr.dtype.kind != "f":
+        return arr.astype(np.int64)
+    return np.round(arr.astype(np.float64) / step).astype(np.int64)
+
+
+def components(*keys):
+    """Label vertices connected by equal rows in any of the key arrays."""
+    groups = [np.unique(k, axis=0, return_inverse=True)[1].reshape(-1) for k in keys]
+    label = np.arange(len(groups[0]))
+    while True:
+        prev = label
+        for g in groups:
+            low = np.full(g.max() + 1, len(label))
+            np.minimum.at(low, g, label)
+            label = low[g]
+        label = label[label]
+        if np.array_equal(label, prev):
+            return label
+
+
+def skin_key(attrs):
+    """(V, k) int64: joint ids with zero weight masked, weights on the unit grid."""
+    cols, n = [], 0
+    while f"JOINTS_{n}" in attrs:
+        j = attrs[f"JOINTS_{n}"].astype(np.int64)
+        w = attrs[f"WEIGHTS_{n}"]
+        wq = quantize(w, UNIT_STEP)
+        cols += [np.where(wq > 0, j, -1), wq]
+        n += 1
+    return np.concatenate(cols, 1) if cols else None
+
+
+def merge_normals(pos_key, skin, normals, angle):
+    """Average normals per welded position whose angle to the mean is < angle."""
+    key = pos_key if skin is None else np.concatenate([pos_key, skin], 1)
+    _, group = np.unique(key, axis=0, return_inverse=True)
+    group = group.reshape(-1)
+    n = normals.astype(np.float64)
+    mean = np.zeros((group.max() + 1, 3))
+    np.add.at(mean, group, n)
+    mean /= np.maximum(np.linalg.norm(mean, axis=1, keepdims=True), 1e-12)
+    close = (n * mean[group]).sum(1) >= np.cos(np.radians(angle))
+    # average only the vertices close to the mean so hard edges stay split
+    smooth = np.zeros_like(mean)
+    np.add.at(smooth, group[close], n[close])
+    smooth /= np.maximum(np.linalg.norm(smooth, axis=1, keepdims=True), 1e-12)
+    out = n.copy()
+    out[close] = smooth[group[close]]
+    return out.astype(normals.dtype), int(close.sum())
+
+
+def weld_primitive(gltf, binc, prim, tolerance, uv_tolerance, angle):
+    tris = triangles(gltf, binc, prim)
+    if tris is None or not len(tris):
+        return None
+    names = dict(prim["attributes"])
+    for ti, tgt in enumerate(prim.get("targets", [])):
+        names.update({f"target{ti}:{k}": v for k, v in tgt.items()})
+    attrs = {k: read_accessor(gltf, binc, a) for k, a in names.items()}
+    pos = attrs["POSITION"]
+    vcount = len(pos)
+    diag = float(np.linalg.norm(np.ptp(pos.astype(np.float64), 0))) or 1.0
+    pos_step = tolerance * diag
+    pos_key = quantize(pos, pos_step)
+    # second grid shifted by half a cell: catches pairs straddling a boundary
+    pos_shift = pos_key
+    if pos.dtype.kind == "f":
+        pos_shift = quantize(pos.astype(np.float64) + pos_step / 2, pos_step)
+    skin = skin_key(attrs)
+    merged = 0
+    if angle is not None and "NORMAL" in attrs and attrs["NORMAL"].dtype.kind == "f":
+        attrs["NORMAL"], merged = merge_normals(pos_key, skin, attrs["NORMAL"], angle)
+
+    cols = [] if skin is None else [skin]
+    for k, arr in sorted(attrs.items()):
+        base = k.split(":")[-1]
+        if k == "POSITION" or base.startswith(("JOINTS_", "WEIGHTS_")):
+            continue
+        if base in ("NORMAL", "TANGENT"):
+            step = NORMAL_STEP
+        elif base.startswith("TEXCOORD_"):
+            step = uv_tolerance
+        elif base.startswith("COLOR_"):
+            step = UNIT_STEP
+        else:
+            step = pos_step  # morph POSITION deltas, custom attributes
+        cols.append(quantize(arr, step))
+    rest = np.concatenate(cols, 1) if cols else np.zeros((vcount, 0), np.int64)
+    label = components(np.concatenate([pos_key, rest], 1),
+                       np.concatenate([pos_shift, rest], 1))
+    keep, remap = np.unique(label, return_inverse=True)  # label = first member
+    remap = remap.reshape(-1)
+
+    new_tris = remap[tris]
+    alive = ((new_tris[:, 0] != new_tris[:, 1]) & (new_tris[:, 1] != new_tris[:, 2])
+             & (new_tris[:, 2] != new_tris[:, 0]))
+    new_tris = new_tris[alive]
+    for k, a in names.items():
+        acc = gltf["accessors"][a]
+        replace_accessor(gltf, binc, a, attrs[k][keep], target=ARRAY_BUFFER,
+                         normalized=acc.get("normalized", False))
+    flat = index_array(new_tris, len(keep))
+    if "indices" in prim:
+        replace_accessor(gltf, binc, prim["indices"], flat,
+                         target=ELEMENT_ARRAY_BUFFER, minmax=False)
+    else:
+        prim["indices"] = add_accessor(gltf, binc, flat, target=ELEMENT_ARRAY_BUFFER)
+    return vcount, len(keep), len(tris), int((~alive).sum()), merged
+
+
+def weld(gltf, binc, tolerance=1e-6, uv_tolerance=1e-5, angle=None):
+    users = attribute_users(gltf)
+    report = []
+    for mi, mesh in enumerate(gltf.get("meshes", [])):
+        for pi, prim in enumerate(mesh.get("primitives", [])):
+            accs = list(prim.get("attributes", {}).values())
+            for tgt in prim.get("targets", []):
+                accs.extend(tgt.values())
+            name = mesh.get("name", f"mesh_{mi}")
+            if any(users[a] > 1 for a in accs):
+                report.append((name, pi, None))
+                continue
+            res = weld_primitive(gltf, binc, prim, tolerance, uv_tolerance, angle)
+            if res:
+                report.append((name, pi, res))
+    return report
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--tolerance", type=float, default=1e-6,
+                   help="position grid as a fraction of the bbox diagonal (default 1e-6)")
+    p.add_argument("--uv-tolerance", type=float, default=1e-5,
+                   help="UV grid step (default 1e-5)")
+    p.add_argument("--merge-normals", action="store_true",
+                   help="average normals at shared positions first (UV seams, flat scans)")
+    p.add_argument("--angle", type=float, default=30.0,
+                   help="--merge-normals: keep edges sharper than this hard (degrees)")
+    a = p.parse_args()
+    gltf, binc = read_glb(a.input)
+    t0 = time.perf_counter()
+    report = weld(gltf, binc, a.tolerance, a.uv_tolerance,
+                  a.angle if a.merge_normals else None)
+    dt = time.perf_counter() - t0
+    before = after = 0
+    for name, pi, res in report:
+        if res is None:
+            print(f"  {name}[{pi}]: shared vertex buffer, skipped")
+            continue
+        vin, vout, ntri, dropped, merged = res
+        before, after = before + vin, after + vout
+        extra = f", {merged} normals merged" if merged else ""
+        print(f"  {name}[{pi}]: {vin} -> {vout} verts ({ntri} tris, "
+              f"{dropped} degenerate dropped{extra})")
+    write_glb(a.output, gltf, compact_bin(gltf, binc))
+    ratio = f" ({after / before:.1%})" if before else ""
+    print(f"done: {a.output} — {before} -> {after} verts{ratio}, {dt:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
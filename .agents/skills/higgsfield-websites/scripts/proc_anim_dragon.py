@@ -15,7 +15,8 @@
 #
 # Other creatures: swap the MOVES tables (gait recipes in
 # references/procedural-animation.md — quadruped diagonal pairs, serpentine
-# traveling wave, slime squash & stretch, etc.).
+# traveling wave, slime squash & stretch, etc.). glb_bake_moves.py bakes the
+# same tables into a GLB without Blender — keep them plain constants.
 
 import math
 import struct
@@ -113,8 +114,8 @@ def bake_action(arm, name, moves, seconds):
     return act
 
 
-def main():
-    out_path = get_args()
+def animate(out_path):
+    """Bake the clips onto the first armature and export out_path (GLB)."""
     armatures = [o for o in bpy.data.objects if o.type == "ARMATURE"]
     if not armatures:
         raise SystemExit("no armature — run proc_rig + proc_weights first")
@@ -174,4 +175,9 @@ def main():
           "(0.0, 0.23, 0.41, 0.68, 0.87) — see references/procedural-animation.md")
 
 
-main()
+def main():
+    animate(get_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# proc_pipeline.py — procedural rig -> weights -> animation in ONE Blender run.
+#
+# Usage:
+#   blender -b -P proc_pipeline.py -- dragon.glb dragon_anim.glb
+#       [--stages rig,weights,anim] [--save-blend work.blend]
+#       [--cache DIR | --no-cache]
+#   blender -b -P proc_pipeline.py -- work.blend dragon_anim.glb --stages anim
+#
+# The three-launch workflow (proc_rig_dragon.py, proc_weights.py,
+# proc_anim_dragon.py) pays Blender start-up plus a work.blend save/reload
+# per stage, which dominates small creatures. This runs the same stage
+# functions back to back on the live scene: build_rig() -> weight_meshes()
+# -> animate(). The three scripts stay runnable on their own.
+#
+# --stages runs a contiguous subset. Without "rig" the input must be a .blend
+# (the handoff file of the standalone scripts); "anim" needs the output GLB.
+# The intermediate .blend (rigged + weighted, before any clip is baked) is
+# written only with --save-blend. The weight cache defaults to
+# $PROC_WEIGHTS_CACHE or .weights_cache/ next to the input.
+
+import os
+import sys
+import time
+
+import bpy
+
+# Blender does not put the script directory on sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from proc_anim_dragon import animate
+from proc_rig_dragon import build_rig
+from proc_weights import weight_meshes
+
+STAGES = ["rig", "weights", "anim"]
+USAGE = ("usage: blender -b -P proc_pipeline.py -- INPUT [OUT.glb] "
+         "[--stages rig,weights,anim] [--save-blend work.blend] [--cache DIR | --no-cache]")
+
+
+def get_args():
+    argv = sys.argv
+    if "--" not in argv:
+        raise SystemExit(USAGE)
+    rest = argv[argv.index("--") + 1:]
+    opts = {"stages": ",".join(STAGES), "save-blend": None, "cache": None}
+    if "--no-cache" in rest:
+        rest.remove("--no-cache")
+        opts["cache"] = ""
+    for key in ("stages", "save-blend", "cache"):
+        if f"--{key}" in rest:
+            i = rest.index(f"--{key}")
+            if i + 1 >= len(rest):
+                raise SystemExit(USAGE)
+            opts[key] = rest[i + 1]
+            del rest[i: i + 2]
+    if not 1 <= len(rest) <= 2 or any(a.startswith("--") for a in rest):
+        raise SystemExit(USAGE)
+    stages = [s.strip() for s in opts["stages"].split(",") if s.strip()]
+    if not stages or any(s not in STAGES for s in stages):
+        raise SystemExit(f"--stages: pick from {','.join(STAGES)}")
+    stages = [s for s in STAGES if s in stages]
+    first, last = STAGES.index(stages[0]), STAGES.index(stages[-1])
+    if stages != STAGES[first: last + 1]:
+        raise SystemExit("--stages must be contiguous (a stage needs the one before it)")
+    src = rest[0]
+    out = rest[1] if len(rest) == 2 else None
+    if "rig" not in stages and not src.endswith(".blend"):
+        raise SystemExit("without the rig stage INPUT must be a .blend (rigged scene)")
+    if "anim" in stages and not out:
+        raise SystemExit("the anim stage needs OUT.glb")
+    return src, out, stages, opts["save-blend"], opts["cache"]
+
+
+def main():
+    src, out, stages, save_blend, cache_dir = get_args()
+    if cache_dir is None:
+        cache_dir = os.environ.get("PROC_WEIGHTS_CACHE",
+                                   os.path.join(os.path.dirname(os.path.abspath(src)),
+                                                ".weights_cache"))
+    t_start = time.perf_counter()
+    if "rig" not in stages:
+        bpy.ops.wm.open_mainfile(filepath=src)
+
+    for stage in stages:
+        if stage == "anim" and save_blend:
+            # the handoff file of the standalone scripts: rigged + weighted, no clips
+            bpy.ops.wm.save_as_mainfile(filepath=save_blend)
+            print(f"saved: {save_blend}")
+        t0 = time.perf_counter()
+        if stage == "rig":
+            build_rig(src)
+        elif stage == "weights":
+            weight_meshes(cache_dir)
+        else:
+            animate(out)
+        print(f"stage {stage}: {time.perf_counter() - t0:.2f}s")
+
+    if save_blend and "anim" not in stages:
+        bpy.ops.wm.save_as_mainfile(filepath=save_blend)
+        print(f"saved: {save_blend}")
+    print(f"pipeline: {' -> '.join(stages)} in {time.perf_counter() - t_start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -34,8 +34,8 @@ def get_args():
     return args
 
 
-def main():
-    src, dst = get_args()
+def build_rig(src):
+    """Fresh scene: import src and add the bbox-derived armature; returns it."""
     bpy.ops.wm.read_factory_settings(use_empty=True)
     bpy.ops.import_scene.gltf(filepath=src)
     meshes = [o for o in bpy.data.objects if o.type == "MESH"]
@@ -112,10 +112,16 @@ def main():
         ebones[name] = eb
     bpy.ops.object.mode_set(mode="OBJECT")
     print(f"skeleton: {len(BONES)} bones")
+    return arm
+
 
+def main():
+    src, dst = get_args()
+    build_rig(src)
     bpy.ops.wm.save_as_mainfile(filepath=dst)
     print(f"saved: {dst}")
     print("next: blender -b " + dst + " -P proc_weights.py -- " + dst)
 
 
-main()
+if __name__ == "__main__":
+    main()